@@ -1,10 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.security import UserContext, get_user_from_token
-from app.db.session import get_db
+from app.db.session import get_async_db
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -23,5 +23,14 @@ def get_current_user(
 	return get_user_from_token(credentials.credentials)
 
 
-def get_db_session(db: Session = Depends(get_db)) -> Session:
+def require_admin(user: UserContext = Depends(get_current_user)) -> UserContext:
+	settings = get_settings()
+	if user.user_id in settings.ADMIN_USER_IDS or settings.ADMIN_GROUP in user.groups:
+		return user
+	raise HTTPException(
+		status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required"
+	)
+
+
+async def get_db_session(db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
 	return db
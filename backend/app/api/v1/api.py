@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import cameras, events, users
+from app.api.v1.endpoints import admin, cameras, events, users
 
 api_router = APIRouter()
 
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(cameras.router, prefix="/cameras", tags=["cameras"])
 api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+from app.api.deps import require_admin
+from app.core import profiling
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+MAX_PROFILE_SECONDS = 120.0
+
+
+def _validate(seconds: float, interval_ms: float) -> None:
+	if not (0 < seconds <= MAX_PROFILE_SECONDS):
+		raise HTTPException(
+			status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}"
+		)
+	if not (1 <= interval_ms <= 1000):
+		raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+
+
+def _profile_response(profiler: profiling.SamplingProfiler, name: str) -> PlainTextResponse:
+	return PlainTextResponse(
+		profiler.collapsed(),
+		headers={
+			"Content-Disposition": f'attachment; filename="{name}.collapsed"',
+			"X-Profile-Samples": str(profiler.samples),
+		},
+	)
+
+
+@router.get("/profile/sessions")
+def list_profile_sessions():
+	return {"sessions": profiling.active_sessions()}
+
+
+@router.post("/profile/sessions/{session_id}")
+async def profile_session(session_id: str, seconds: float = 10.0, interval_ms: float = 5.0):
+	_validate(seconds, interval_ms)
+	if session_id not in profiling.active_sessions():
+		raise HTTPException(status_code=404, detail="Live session not found")
+	profiler = profiling.SamplingProfiler(
+		profiling.session_matcher(session_id), interval=interval_ms / 1000
+	)
+	await profiler.run_in_thread(seconds)
+	return _profile_response(profiler, f"session-{session_id}")
+
+
+@router.post("/profile/routes")
+async def profile_route(
+	request: Request,
+	path: str,
+	method: str = "GET",
+	seconds: float = 10.0,
+	interval_ms: float = 5.0,
+):
+	_validate(seconds, interval_ms)
+	route = next(
+		(
+			r
+			for r in request.app.routes
+			if isinstance(r, APIRoute) and r.path == path and method.upper() in r.methods
+		),
+		None,
+	)
+	if route is None:
+		raise HTTPException(status_code=404, detail="Route not found")
+	profiler = profiling.SamplingProfiler(
+		profiling.route_matcher(path, route.endpoint.__code__), interval=interval_ms / 1000
+	)
+	await profiler.run_in_thread(seconds)
+	return _profile_response(profiler, f"route-{route.name}")
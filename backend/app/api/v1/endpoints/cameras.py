@@ -1,52 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db_session
 from app.schemas.camera import CameraCreate, CameraRead, CameraUpdate
-from app.services.camera_service import CameraService
+from app.core.config import get_settings
+from app.services.camera_service import AsyncCameraService
+from app.services.capture import CAMERA_HEALTH
+from app.services.detection_bus import camera_key
+from app.services.heatmap_service import AsyncHeatmapService
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
-service = CameraService()
+service = AsyncCameraService()
+heatmap_service = AsyncHeatmapService()
 
 
 @router.get("/", response_model=list[CameraRead])
-def list_cameras(
-	db: Session = Depends(get_db_session),
+async def list_cameras(
+	db: AsyncSession = Depends(get_db_session),
 	skip: int = 0,
 	limit: int = 100,
 ):
-	return service.list_cameras(db, skip=skip, limit=limit)
+	return await service.list_cameras(db, skip=skip, limit=limit)
 
 
 @router.post("/", response_model=CameraRead, status_code=status.HTTP_201_CREATED)
-def create_camera(payload: CameraCreate, db: Session = Depends(get_db_session)):
-	return service.create_camera(db, payload)
+async def create_camera(payload: CameraCreate, db: AsyncSession = Depends(get_db_session)):
+	return await service.create_camera(db, payload)
+
+
+@router.get("/health")
+def list_camera_health():
+	return CAMERA_HEALTH.snapshot()
+
+
+@router.get("/{camera_id}/health")
+async def get_camera_health(camera_id: int, db: AsyncSession = Depends(get_db_session)):
+	camera = await service.get_camera(db, camera_id)
+	if not camera:
+		raise HTTPException(status_code=404, detail="Camera not found")
+	records = CAMERA_HEALTH.snapshot(camera_key(camera_id))
+	# No record means nobody is streaming the camera right now.
+	return records[0] if records else {"camera": camera_key(camera_id), "state": "idle"}
+
+
+@router.get("/{camera_id}/heatmap")
+async def get_camera_heatmap(
+	camera_id: int,
+	resolution: int = 32,
+	label: list[str] | None = Query(None),
+	start: datetime | None = None,
+	end: datetime | None = None,
+	db: AsyncSession = Depends(get_db_session),
+):
+	grid_size = get_settings().HEATMAP_GRID_SIZE
+	if resolution < 1 or grid_size % resolution:
+		raise HTTPException(
+			status_code=400, detail=f"resolution must divide the stored grid size {grid_size}"
+		)
+	if start is not None and end is not None and start >= end:
+		raise HTTPException(status_code=400, detail="start must be before end")
+	camera = await service.get_camera(db, camera_id)
+	if not camera:
+		raise HTTPException(status_code=404, detail="Camera not found")
+	return await heatmap_service.get_heatmap(db, camera_id, resolution, label, start, end)
 
 
 @router.get("/{camera_id}", response_model=CameraRead)
-def get_camera(camera_id: int, db: Session = Depends(get_db_session)):
-	camera = service.get_camera(db, camera_id)
+async def get_camera(camera_id: int, db: AsyncSession = Depends(get_db_session)):
+	camera = await service.get_camera(db, camera_id)
 	if not camera:
 		raise HTTPException(status_code=404, detail="Camera not found")
 	return camera
 
 
 @router.put("/{camera_id}", response_model=CameraRead)
-def update_camera(
+async def update_camera(
 	camera_id: int,
 	payload: CameraUpdate,
-	db: Session = Depends(get_db_session),
+	db: AsyncSession = Depends(get_db_session),
 ):
-	camera = service.get_camera(db, camera_id)
+	camera = await service.get_camera(db, camera_id)
 	if not camera:
 		raise HTTPException(status_code=404, detail="Camera not found")
-	return service.update_camera(db, camera, payload)
+	return await service.update_camera(db, camera, payload)
 
 
 @router.delete("/{camera_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_camera(camera_id: int, db: Session = Depends(get_db_session)):
-	camera = service.get_camera(db, camera_id)
+async def delete_camera(camera_id: int, db: AsyncSession = Depends(get_db_session)):
+	camera = await service.get_camera(db, camera_id)
 	if not camera:
 		raise HTTPException(status_code=404, detail="Camera not found")
-	service.delete_camera(db, camera)
+	await service.delete_camera(db, camera)
 	return None
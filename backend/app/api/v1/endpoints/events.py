@@ -1,15 +1,25 @@
-import base64
-from datetime import datetime
+from datetime import datetime, timedelta
 from io import BytesIO
 import json
-from pathlib import Path
 import time
-
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from typing import Callable, Sequence
+
+from fastapi import (
+	APIRouter,
+	Depends,
+	File,
+	HTTPException,
+	Query,
+	Request,
+	Response,
+	UploadFile,
+	status,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from PIL import Image
 import requests
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import numpy as np
 
 try:
@@ -18,26 +28,37 @@ except Exception:  # pragma: no cover - optional dependency
 	cv2 = None
 
 from app.api.deps import get_current_user, get_db_session
-from app.db.session import SessionLocal
+from app.core import profiling
+from app.core.metrics import STAGE_SECONDS
+from app.core.profiling import ServerTiming
 from app.schemas.event import (
 	EventCreate,
 	EventRead,
 	InferenceResponse,
 	InferenceStreamRequest,
 )
-from app.services.camera_service import CameraService
-from app.services.event_service import EventService
+from app.services.admission import PRIORITIES, AdmissionRejected, get_admission_controller
+from app.services.batch_scheduler import get_batch_scheduler
+from app.services.camera_service import AsyncCameraService
+from app.services.detection_bus import build_message, get_detection_bus
+from app.services.event_service import AsyncEventService
+from app.services.heatmap_service import naive_local
+from app.services.image_decode import (
+	DecodedImage,
+	ImageTooLarge,
+	decode_image,
+	scale_detections,
+)
 from app.services.inference_service import get_inference_service
+from app.services.live_pipeline import VIEW_MODES, SessionKey, ViewProfile, get_live_manager
+from app.services.result_cache import CachedResult, cache_key, get_result_cache
 from app.core.config import get_settings
 
 settings = get_settings()
-BASE_DIR = Path(__file__).resolve().parents[4]
-DETECTION_IMAGES_DIR = BASE_DIR / "detection_images"
-DETECTION_IMAGES_DIR.mkdir(exist_ok=True)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
-service = EventService()
-camera_service = CameraService()
+service = AsyncEventService()
+camera_service = AsyncCameraService()
 
 
 def _fetch_snapshot(stream_url: str) -> Image.Image:
@@ -126,61 +147,218 @@ def _fetch_frame_with_opencv(stream_url: str) -> Image.Image | None:
 		cap.release()
 
 
+def _client_key(request: Request, camera_id: int | None) -> str:
+	client_id = request.headers.get("x-client-id")
+	if client_id:
+		return f"client:{client_id}"
+	if camera_id is not None:
+		return f"camera:{camera_id}"
+	return f"host:{request.client.host if request.client else 'unknown'}"
+
+
+def _priority_value(priority: str) -> int:
+	if priority not in PRIORITIES:
+		raise HTTPException(
+			status_code=400, detail=f"priority must be one of {sorted(PRIORITIES)}"
+		)
+	return PRIORITIES[priority]
+
+
+async def _admitted_predict(
+	pipeline: str,
+	client: str,
+	priority: int,
+	prepare: Callable[[], DecodedImage],
+	timing: ServerTiming,
+	prepare_stage: str | None = None,
+) -> tuple[list[dict], float]:
+	# Decoding counts against the admitted slot too, so rejected requests never
+	# pay for it. Detections come back in original image coordinates.
+	admission = get_admission_controller()
+	inference = get_inference_service()
+
+	def work() -> tuple[list[dict], float, float]:
+		started = time.perf_counter()
+		decoded = prepare()
+		prepared = time.perf_counter()
+		detections = inference.predict(decoded.image)
+		inference_seconds = time.perf_counter() - prepared
+		detections = scale_detections(detections, decoded.scale_x, decoded.scale_y)
+		return detections, prepared - started, inference_seconds
+
+	try:
+		(detections, prepare_seconds, inference_seconds), ticket = await admission.run(
+			client, priority, profiling.call_tagged, work
+		)
+	except AdmissionRejected as exc:
+		raise HTTPException(
+			status_code=exc.status_code,
+			detail=exc.detail,
+			headers={"Retry-After": str(exc.retry_after)},
+		) from exc
+	STAGE_SECONDS.labels(pipeline, "queue").observe(ticket.wait_seconds)
+	timing.add("queue", ticket.wait_seconds)
+	if prepare_stage is not None:
+		STAGE_SECONDS.labels(pipeline, prepare_stage).observe(prepare_seconds)
+		timing.add(prepare_stage, prepare_seconds)
+	STAGE_SECONDS.labels(pipeline, "inference").observe(inference_seconds)
+	timing.add("inference", inference_seconds)
+	return detections, inference_seconds * 1000
+
+
+async def _publish_detections(
+	camera_id: int | None, detections: Sequence[dict], track_events: Sequence[dict] = ()
+) -> None:
+	if not detections and not track_events:
+		return
+	await get_detection_bus().publish_async(
+		camera_id, build_message(camera_id, detections, track_events)
+	)
+
+
 @router.get("/", response_model=list[EventRead])
-def list_events(
-	db: Session = Depends(get_db_session),
+async def list_events(
+	db: AsyncSession = Depends(get_db_session),
 	skip: int = 0,
 	limit: int = 100,
 	camera_id: int | None = None,
 ):
 	if camera_id is not None:
-		return service.list_events_by_camera(db, camera_id, skip=skip, limit=limit)
-	return service.list_events(db, skip=skip, limit=limit)
+		return await service.list_events_by_camera(db, camera_id, skip=skip, limit=limit)
+	return await service.list_events(db, skip=skip, limit=limit)
+
+
+@router.get("/counts")
+async def count_events(
+	since: datetime | None = None,
+	until: datetime | None = None,
+	camera_id: int | None = None,
+	label: str | None = None,
+	min_confidence: float = 0.0,
+	db: AsyncSession = Depends(get_db_session),
+):
+	until = naive_local(until) or datetime.now()
+	since = naive_local(since) or until - timedelta(hours=1)
+	if since >= until:
+		raise HTTPException(status_code=400, detail="since must be before until")
+	if not (0.0 <= min_confidence <= 1.0):
+		raise HTTPException(status_code=400, detail="min_confidence must be between 0 and 1")
+	return await service.count_events(db, since, until, camera_id, label, min_confidence)
 
 
 @router.post("/", response_model=EventRead, status_code=status.HTTP_201_CREATED)
-def create_event(payload: EventCreate, db: Session = Depends(get_db_session)):
-	return service.create_event(db, payload)
+async def create_event(payload: EventCreate, db: AsyncSession = Depends(get_db_session)):
+	return await service.create_event(db, payload)
+
+
+@router.get("/inference-stats")
+def get_inference_stats():
+	inference = get_inference_service()
+	cache = get_result_cache()
+	return {
+		"cascade_enabled": inference.cascade_enabled,
+		"cascade": inference.cascade_stats.snapshot(),
+		"result_cache": cache.snapshot() if cache is not None else None,
+		"admission": get_admission_controller().snapshot(),
+		"live_sessions": get_live_manager().snapshot(),
+		"live_batching": (
+			get_batch_scheduler().stats.snapshot() if settings.LIVE_BATCH_ENABLED else None
+		),
+	}
 
 
 @router.post("/infer", response_model=InferenceResponse)
 async def infer_from_image(
+	request: Request,
+	response: Response,
 	camera_id: int | None = None,
+	priority: str = "interactive",
 	image: UploadFile = File(...),
-	db: Session = Depends(get_db_session),
+	db: AsyncSession = Depends(get_db_session),
 ):
+	priority_value = _priority_value(priority)
 	if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
 		raise HTTPException(status_code=400, detail="Unsupported image type")
+	if image.size is not None and image.size > settings.INFER_MAX_UPLOAD_BYTES:
+		raise HTTPException(status_code=413, detail="Image upload too large")
 
 	data = await image.read()
+	if len(data) > settings.INFER_MAX_UPLOAD_BYTES:
+		raise HTTPException(status_code=413, detail="Image upload too large")
+	timing = ServerTiming()
+	inference = get_inference_service()
+	cache = get_result_cache()
+	key = cache_key(
+		data,
+		inference.model_version,
+		inference.allowed_labels,
+		settings.MODEL_INPUT_SIZE,
+		settings.INFER_MAX_IMAGE_PIXELS,
+	)
+	# The cache may be Redis-backed, so lookups stay off the event loop.
+	with timing.measure("cache"):
+		cached = await run_in_threadpool(cache.get, key) if cache is not None else None
+	if cached is not None:
+		timing.add("cache-hit", 0.0, f"saved {cached.inference_ms:.1f}ms")
+		await _publish_detections(camera_id, cached.detections)
+		if cached.detections and settings.INFER_CACHE_EVENTS_ON_HIT:
+			await service.create_events_from_detections(
+				db,
+				camera_id=camera_id,
+				user_id=None,
+				detections=cached.detections,
+			)
+		response.headers["Server-Timing"] = timing.header()
+		return InferenceResponse(detections=cached.detections, cached=True)
+
 	try:
-		pil_image = Image.open(BytesIO(data)).convert("RGB")
+		detections, inference_ms = await _admitted_predict(
+			"infer",
+			_client_key(request, camera_id),
+			priority_value,
+			lambda: decode_image(data, settings.MODEL_INPUT_SIZE, settings.INFER_MAX_IMAGE_PIXELS),
+			timing,
+			prepare_stage="decode",
+		)
+	except ImageTooLarge as exc:
+		raise HTTPException(status_code=413, detail=str(exc)) from exc
 	except OSError as exc:
 		raise HTTPException(status_code=400, detail="Invalid image data") from exc
-
-	inference = get_inference_service()
-	detections = inference.predict(pil_image)
+	if cache is not None:
+		await run_in_threadpool(
+			cache.set, key, CachedResult(detections=detections, inference_ms=inference_ms)
+		)
+	await _publish_detections(camera_id, detections)
 	if detections:
-		service.create_events_from_detections(
+		started = time.perf_counter()
+		await service.create_events_from_detections(
 			db,
 			camera_id=camera_id,
 			user_id=None,
 			detections=detections,
 		)
+		db_seconds = time.perf_counter() - started
+		STAGE_SECONDS.labels("infer", "db_write").observe(db_seconds)
+		timing.add("db", db_seconds)
 
+	response.headers["Server-Timing"] = timing.header()
 	return InferenceResponse(detections=detections)
 
 
 @router.post("/infer-stream", response_model=InferenceResponse)
-def infer_from_stream(
+async def infer_from_stream(
 	payload: InferenceStreamRequest,
-	db: Session = Depends(get_db_session),
+	request: Request,
+	response: Response,
+	priority: str = "interactive",
+	db: AsyncSession = Depends(get_db_session),
 ):
+	priority_value = _priority_value(priority)
 	stream_url = payload.stream_url
 	camera_id = payload.camera_id
 
 	if camera_id is not None:
-		camera = camera_service.get_camera(db, camera_id)
+		camera = await camera_service.get_camera(db, camera_id)
 		if not camera or not camera.stream_url:
 			raise HTTPException(status_code=404, detail="Camera stream not found")
 		stream_url = camera.stream_url
@@ -188,31 +366,61 @@ def infer_from_stream(
 	if not stream_url:
 		raise HTTPException(status_code=400, detail="stream_url or camera_id is required")
 
-	pil_image = _fetch_snapshot(stream_url)
-	inference = get_inference_service()
-	detections = inference.predict(pil_image)
+	timing = ServerTiming()
+	started = time.perf_counter()
+	pil_image = await run_in_threadpool(profiling.call_tagged, _fetch_snapshot, stream_url)
+	fetch_seconds = time.perf_counter() - started
+	STAGE_SECONDS.labels("infer_stream", "fetch").observe(fetch_seconds)
+	timing.add("fetch", fetch_seconds)
+	snapshot = DecodedImage(pil_image, pil_image.size)
+	detections, _ = await _admitted_predict(
+		"infer_stream", _client_key(request, camera_id), priority_value, lambda: snapshot, timing
+	)
+	await _publish_detections(camera_id, detections)
 
 	if detections:
-		service.create_events_from_detections(
+		started = time.perf_counter()
+		await service.create_events_from_detections(
 			db,
 			camera_id=camera_id,
 			user_id=None,
 			detections=detections,
 		)
+		db_seconds = time.perf_counter() - started
+		STAGE_SECONDS.labels("infer_stream", "db_write").observe(db_seconds)
+		timing.add("db", db_seconds)
 
+	response.headers["Server-Timing"] = timing.header()
 	return InferenceResponse(detections=detections)
 
 
+@router.get("/subscribe")
+async def subscribe_detections(camera_ids: list[int] | None = Query(None)):
+	bus = get_detection_bus()
+
+	async def stream_messages():
+		async for message in bus.subscribe(camera_ids):
+			if message is None:
+				yield ": keepalive\n\n"
+				continue
+			yield f"data: {json.dumps(message)}\n\n"
+
+	return StreamingResponse(stream_messages(), media_type="text/event-stream")
+
+
 @router.get("/live-stream")
-def start_live_stream(
+async def start_live_stream(
 	stream_url: str | None = None,
 	camera_id: int | None = None,
 	confidence_threshold: float = 0.8,
 	fps: int = 30,
-	db: Session = Depends(get_db_session),
+	mode: str = "frames",
+	width: int = 0,
+	max_fps: float = 0.0,
+	db: AsyncSession = Depends(get_db_session),
 ):
 	if camera_id is not None:
-		camera = camera_service.get_camera(db, camera_id)
+		camera = await camera_service.get_camera(db, camera_id)
 		if not camera or not camera.stream_url:
 			raise HTTPException(status_code=404, detail="Camera stream not found")
 		stream_url = camera.stream_url
@@ -225,164 +433,27 @@ def start_live_stream(
 	
 	if not (1 <= fps <= 60):
 		raise HTTPException(status_code=400, detail="fps must be between 1 and 60")
-	
-	frame_delay = 1.0 / fps
 
-	def generate_frames():
-		if cv2 is None:
+	if mode not in VIEW_MODES:
+		raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(VIEW_MODES)}")
+
+	if width and not (64 <= width <= 4096):
+		raise HTTPException(status_code=400, detail="width must be between 64 and 4096")
+
+	if max_fps < 0:
+		raise HTTPException(status_code=400, detail="max_fps must not be negative")
+	
+	if cv2 is None:
+		async def unavailable():
 			yield f"data: {{\"error\": \"OpenCV not installed\"}}\n\n"
-			return
-
-		cap = None
-		inference = get_inference_service()
-		frame_count = 0
-		failed_frames = 0
-		max_failed_frames = 30
-		
-		# Detection tracking for debouncing
-		detection_tracker = {}  # {label: {"count": int, "last_saved": float, "detections": []}}
-		confirmation_threshold = 3  # Need 3 consecutive detections to save
-		save_cooldown = 5.0  # Don't save same label within 5 seconds
 
-		try:
-			cap = cv2.VideoCapture(stream_url, cv2.CAP_FFMPEG)
-			if not cap.isOpened():
-				yield f"data: {{\"error\": \"Failed to open stream\"}}\n\n"
-				return
-
-			while True:
-				ok, frame = cap.read()
-				if not ok or frame is None:
-					failed_frames += 1
-					if failed_frames >= max_failed_frames:
-						yield f"data: {{\"error\": \"Camera disconnected - too many failed frames\"}}\n\n"
-						break
-					time.sleep(0.1)
-					continue
-
-				failed_frames = 0
-				frame_count += 1
-				if frame_count % 5 != 0:  # Check every 5th frame instead of 3rd for efficiency
-					time.sleep(frame_delay)
-					continue
-
-				frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-				pil_image = Image.fromarray(frame_rgb)
-
-				detections = inference.predict(pil_image)
-				
-				# Filter by confidence threshold and ensure null-safety
-				filtered_detections = []
-				if detections:
-					filtered_detections = [
-						d for d in detections 
-						if d.get("confidence", 0) >= confidence_threshold
-					]
-
-				# Track current frame's labels
-				current_labels = set()
-				
-				if filtered_detections:
-					for detection in filtered_detections:
-						x1, y1, x2, y2 = map(int, detection.get("bbox", [0, 0, 0, 0]))
-						label = detection.get("label", "unknown")
-						conf = detection.get("confidence", 0.0)
-						current_labels.add(label)
-
-						cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-						cv2.putText(
-							frame,
-							f"{label} {conf:.2f}",
-							(x1, y1 - 10),
-							cv2.FONT_HERSHEY_SIMPLEX,
-							0.6,
-							(0, 0, 255),
-							2,
-						)
-						
-						# Update detection tracker
-						if label not in detection_tracker:
-							detection_tracker[label] = {
-								"count": 1,
-								"last_saved": 0,
-								"detections": [detection]
-							}
-						else:
-							detection_tracker[label]["count"] += 1
-							detection_tracker[label]["detections"].append(detection)
-							# Keep only recent detections
-							if len(detection_tracker[label]["detections"]) > confirmation_threshold:
-								detection_tracker[label]["detections"] = detection_tracker[label]["detections"][-confirmation_threshold:]
-					
-					# Check which detections should be saved to DB
-					current_time = time.time()
-					detections_to_save = []
-					
-					for label in current_labels:
-						tracker = detection_tracker[label]
-						time_since_last_save = current_time - tracker["last_saved"]
-						
-						# Save if: confirmed (3+ consecutive) AND cooldown period has passed
-						if tracker["count"] >= confirmation_threshold and time_since_last_save >= save_cooldown:
-							detections_to_save.extend(tracker["detections"])
-							tracker["last_saved"] = current_time
-							tracker["count"] = 0  # Reset counter after saving
-					
-					# Save confirmed detections to DB
-					if detections_to_save:
-						# Save frame with detections locally
-						timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-						labels_str = "_".join(sorted(set(d.get("label", "unknown") for d in detections_to_save)))
-						cam_str = f"cam{camera_id}" if camera_id else "nocam"
-						filename = f"{timestamp}_{cam_str}_{labels_str}.jpg"
-						image_path = DETECTION_IMAGES_DIR / filename
-						
-						try:
-							cv2.imwrite(str(image_path), frame)
-						except Exception:
-							pass  # Don't fail stream if image save fails
-						
-						db_session = SessionLocal()
-						try:
-							service.create_events_from_detections(
-								db_session, camera_id=camera_id, user_id=None, detections=detections_to_save
-							)
-							db_session.commit()
-						except Exception:
-							db_session.rollback()
-						finally:
-							db_session.close()
-				
-				# Reset counters for labels not detected in current frame
-				labels_to_remove = []
-				for label in detection_tracker:
-					if label not in current_labels:
-						detection_tracker[label]["count"] = 0
-						detection_tracker[label]["detections"] = []
-						# Remove from tracker if not seen for >30 seconds
-						if time.time() - detection_tracker[label]["last_saved"] > 30:
-							labels_to_remove.append(label)
-				
-				for label in labels_to_remove:
-					del detection_tracker[label]
-
-				_, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-				frame_base64 = base64.b64encode(buffer).decode("utf-8")
-
-				detection_data = [
-					{"label": d.get("label", "unknown"), "confidence": d.get("confidence", 0.0)} 
-					for d in (filtered_detections or [])
-				]
-
-				yield f"data: {{\"frame\": \"{frame_base64}\", \"detections\": {json.dumps(detection_data)}}}\n\n"
-
-				time.sleep(frame_delay)
-		except GeneratorExit:
-			pass
-		except Exception as e:
-			yield f"data: {{\"error\": \"Stream error: {str(e)}\"}}\n\n"
-		finally:
-			if cap is not None:
-				cap.release()
-
-	return StreamingResponse(generate_frames(), media_type="text/event-stream")
+		return StreamingResponse(unavailable(), media_type="text/event-stream")
+
+	# Capture and inference run on the session's own thread; this request only
+	# awaits its viewer queue, so it holds no threadpool worker.
+	key = SessionKey(stream_url, camera_id)
+	profile = ViewProfile.build(mode, width, max_fps, confidence_threshold)
+	return StreamingResponse(
+		get_live_manager().stream(key, fps, profile),
+		media_type="text/event-stream",
+	)
@@ -0,0 +1,420 @@
+"""Run the detector over recorded video files and store the detections as events.
+
+Run from the backend directory:
+
+	python -m app.cli.batch /recordings --camera-id 3 --stride 5 --workers 4 \
+		--checkpoint batch.json
+	python -m app.cli.batch clip.mp4 --start-time 2024-05-01T08:00:00 --track
+
+Each file is split into segments that are decoded by parallel readers (seeking to
+the segment start, then grabbing or seeking past skipped frames). Sampled frames
+are batched through InferenceService.predict_batch and events are bulk-written
+with occurred_at set to the frame's media time. With --checkpoint, progress per
+segment is saved after every database commit and a rerun resumes from it.
+
+With --track, each file's segments are read in order by one reader and share a
+tracker, so tracks crossing a segment boundary stay one track; files are still
+read in parallel. A resumed segment is first replayed from its start (without
+writing) so tracks already recorded do not start again.
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+from app.core.logging import configure_logging
+from app.db.base import Base
+from app.db.migrate import add_missing_columns
+from app.db.session import SessionLocal, engine
+from app.models import camera, event, heatmap, user  # noqa: F401
+from app.services.event_service import EventService
+from app.services.inference_service import get_inference_service
+from app.services.tracking_service import MultiObjectTracker
+
+try:
+	import cv2
+except Exception:  # pragma: no cover - optional dependency
+	cv2 = None
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {".mp4", ".m4v", ".mov", ".mkv", ".avi", ".webm", ".ts", ".mpg", ".mpeg"}
+# Skipping more frames than this is done with a seek instead of grab() calls.
+SEEK_THRESHOLD = 30
+
+
+@dataclass(frozen=True)
+class Segment:
+	path: Path
+	start: int
+	end: int
+	fps: float
+	started_at: datetime
+
+	@property
+	def key(self) -> str:
+		return f"{self.path}#{self.start}"
+
+	def occurred_at(self, index: int) -> datetime:
+		return self.started_at + timedelta(seconds=index / self.fps)
+
+
+@dataclass
+class SampledFrame:
+	segment: Segment
+	index: int
+	image: Image.Image
+	# Already written before a resume; only feeds the tracker.
+	replay: bool = False
+
+	@property
+	def media_seconds(self) -> float:
+		return self.index / self.segment.fps
+
+
+@dataclass
+class SegmentDone:
+	segment: Segment
+	last_index: int
+	# False after a read error, early end of file or interrupt: only the frames
+	# actually read count as done.
+	complete: bool = True
+
+
+class Checkpoint:
+	"""Next frame index per segment, written atomically after each commit."""
+
+	def __init__(self, path: Path | None, config: Dict[str, Any]) -> None:
+		self.path = path
+		self.config = config
+		self.segments: Dict[str, int] = {}
+		if path is not None and path.exists():
+			data = json.loads(path.read_text())
+			if data.get("config") != config:
+				raise SystemExit(
+					f"Checkpoint {path} was written with different settings {data.get('config')}; "
+					"use a new checkpoint file or the original options"
+				)
+			self.segments = data.get("segments", {})
+
+	def next_index(self, segment: Segment) -> int:
+		return self.segments.get(segment.key, segment.start)
+
+	def advance(self, segment: Segment, next_index: int) -> None:
+		self.segments[segment.key] = max(self.segments.get(segment.key, segment.start), next_index)
+
+	def save(self) -> None:
+		if self.path is None:
+			return
+		tmp = self.path.with_name(self.path.name + ".tmp")
+		tmp.write_text(json.dumps({"config": self.config, "segments": self.segments}))
+		os.replace(tmp, self.path)
+
+
+def find_videos(inputs: List[str]) -> List[Path]:
+	videos: List[Path] = []
+	for item in inputs:
+		# Resolved so checkpoint keys match whatever cwd or spelling a rerun uses.
+		path = Path(item).resolve()
+		if path.is_dir():
+			videos.extend(
+				sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+			)
+		elif path.is_file():
+			videos.append(path)
+		else:
+			logger.warning("Skipping %s: not a file or directory", item)
+	return videos
+
+
+def plan_segments(
+	path: Path, stride: int, segment_frames: int, start_time: datetime | None
+) -> List[Segment]:
+	cap = cv2.VideoCapture(str(path))
+	try:
+		if not cap.isOpened():
+			logger.warning("Skipping %s: cannot open", path)
+			return []
+		total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+		fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+	finally:
+		cap.release()
+	if total <= 0:
+		logger.warning("Skipping %s: unknown frame count", path)
+		return []
+
+	if start_time is None:
+		# Recorders finish writing the file when the recording ends.
+		start_time = datetime.fromtimestamp(path.stat().st_mtime) - timedelta(seconds=total / fps)
+	# Segment boundaries stay on the stride grid so sampling is identical however
+	# the file is split.
+	size = max(segment_frames // stride, 1) * stride
+	return [
+		Segment(path, start, min(start + size, total), fps, start_time)
+		for start in range(0, total, size)
+	]
+
+
+def read_segment(
+	segment: Segment,
+	first: int,
+	stride: int,
+	out: "queue.Queue[SampledFrame | SegmentDone]",
+	stop: threading.Event,
+	replay_until: int = 0,
+) -> None:
+	cap = cv2.VideoCapture(str(segment.path))
+	index = first
+	last = first - stride
+	complete = False
+	try:
+		if index > 0:
+			cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+		while index < segment.end and not stop.is_set():
+			ok, frame = cap.read()
+			if not ok:
+				break
+			image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+			out.put(SampledFrame(segment, index, image, replay=index < replay_until))
+			last = index
+			index += stride
+			skip = min(stride - 1, segment.end - last - 1)
+			if skip >= SEEK_THRESHOLD:
+				cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+			else:
+				for _ in range(skip):
+					if not cap.grab():
+						break
+		complete = index >= segment.end
+		if not complete and not stop.is_set():
+			logger.warning("%s ended at frame %d, before %d", segment.key, index, segment.end)
+	except Exception as exc:
+		logger.warning("Reader for %s failed at frame %d: %s", segment.key, index, exc)
+	finally:
+		cap.release()
+		out.put(SegmentDone(segment, last, complete))
+
+
+def read_file_segments(
+	jobs: List[Tuple[Segment, int, int]],
+	stride: int,
+	out: "queue.Queue[SampledFrame | SegmentDone]",
+	stop: threading.Event,
+) -> None:
+	# One file's segments in order, so its frames reach the shared tracker in order.
+	for segment, first, resume_at in jobs:
+		read_segment(segment, first, stride, out, stop, resume_at)
+
+
+class Progress:
+	def __init__(self, total_frames: int, interval: float = 2.0) -> None:
+		self.total_frames = total_frames
+		self.interval = interval
+		self.frames = 0
+		self.events = 0
+		self.started = time.perf_counter()
+		self._last_report = self.started
+		self._last_frames = 0
+
+	def update(self, frames: int, events: int) -> None:
+		self.frames += frames
+		self.events += events
+		now = time.perf_counter()
+		if now - self._last_report >= self.interval:
+			self.report(now)
+
+	def report(self, now: float | None = None, final: bool = False) -> None:
+		now = now or time.perf_counter()
+		window = now - self._last_report
+		current = (self.frames - self._last_frames) / window if window > 0 else 0.0
+		overall = self.frames / (now - self.started) if now > self.started else 0.0
+		remaining = max(self.total_frames - self.frames, 0)
+		eta = remaining / overall if overall > 0 and not final else 0.0
+		print(
+			f"{'done' if final else 'progress'}: {self.frames}/{self.total_frames} frames, "
+			f"{current:.1f} fps now, {overall:.1f} fps avg, {self.events} events"
+			+ (f", eta {eta:.0f}s" if eta else ""),
+			file=sys.stderr,
+			flush=True,
+		)
+		self._last_report = now
+		self._last_frames = self.frames
+
+
+def _detection_payload(segment: Segment, index: int, detection: Dict[str, Any]) -> Dict[str, Any]:
+	return {
+		**detection,
+		"source": str(segment.path),
+		"frame_index": index,
+		"media_seconds": round(index / segment.fps, 3),
+	}
+
+
+def run(args: argparse.Namespace) -> int:
+	if cv2 is None:
+		raise SystemExit("OpenCV is required for batch processing")
+	start_time = datetime.fromisoformat(args.start_time) if args.start_time else None
+	videos = find_videos(args.inputs)
+	if not videos:
+		raise SystemExit("No video files found")
+
+	checkpoint = Checkpoint(
+		Path(args.checkpoint) if args.checkpoint else None,
+		{
+			"stride": args.stride,
+			"segment_frames": args.segment_frames,
+			"track": args.track,
+			"camera_id": args.camera_id,
+		},
+	)
+	jobs = []
+	for video in videos:
+		for segment in plan_segments(video, args.stride, args.segment_frames, start_time):
+			resume_at = checkpoint.next_index(segment)
+			if resume_at >= segment.end:
+				continue
+			# Tracker state is not checkpointed: rebuild it by replaying the
+			# segment up to the resume point.
+			first = segment.start if args.track else resume_at
+			jobs.append((segment, first, resume_at))
+	total_frames = sum(-(-(segment.end - first) // args.stride) for segment, first, _ in jobs)
+	logger.info("%d files, %d segments, %d frames to process", len(videos), len(jobs), total_frames)
+
+	Base.metadata.create_all(bind=engine)
+	add_missing_columns(engine)
+	inference = get_inference_service()
+	service = EventService()
+	progress = Progress(total_frames)
+	frames: "queue.Queue[SampledFrame | SegmentDone]" = queue.Queue(
+		maxsize=max(args.batch_size * args.workers * 2, 1)
+	)
+	stop = threading.Event()
+	# One tracker per file, flushed once its last segment is done.
+	trackers: Dict[Path, MultiObjectTracker] = {}
+	segments_left = Counter(segment.path for segment, _, _ in jobs)
+	pending = len(jobs)
+
+	def write(batches: List[tuple[datetime, List[Dict[str, Any]]]], done: Dict[Segment, int]) -> int:
+		# Keep attributes loaded after commit; bulk writes skip per-row refreshes.
+		db = SessionLocal(expire_on_commit=False)
+		try:
+			written = service.bulk_create_events(db, args.camera_id, batches)
+		finally:
+			db.close()
+		for segment, next_index in done.items():
+			checkpoint.advance(segment, next_index)
+		checkpoint.save()
+		return written
+
+	def process(batch: List[SampledFrame], finished: List[SegmentDone]) -> None:
+		results = inference.predict_batch([frame.image for frame in batch])
+		batches = []
+		done: Dict[Segment, int] = {}
+		for frame, detections in zip(batch, results):
+			detections = [d for d in detections if d["confidence"] >= args.confidence]
+			if args.track:
+				tracker = trackers.setdefault(frame.segment.path, MultiObjectTracker(min_hits=3))
+				detections = tracker.update(detections, frame.media_seconds)
+				if frame.replay:
+					continue
+			if detections:
+				batches.append(
+					(
+						frame.segment.occurred_at(frame.index),
+						[_detection_payload(frame.segment, frame.index, d) for d in detections],
+					)
+				)
+			done[frame.segment] = frame.index + args.stride
+		for item in finished:
+			segment = item.segment
+			segments_left[segment.path] -= 1
+			tracker = trackers.pop(segment.path, None) if not segments_left[segment.path] else None
+			flushed = tracker.flush() if tracker is not None else []
+			if flushed:
+				last = max(item.last_index, segment.start)
+				batches.append(
+					(
+						segment.occurred_at(last),
+						[_detection_payload(segment, last, d) for d in flushed],
+					)
+				)
+			if item.complete:
+				done[segment] = segment.end
+		written = write(batches, done)
+		progress.update(len(batch), written)
+
+	with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="reader") as readers:
+		if args.track:
+			by_file: Dict[Path, List[Tuple[Segment, int, int]]] = {}
+			for job in jobs:
+				by_file.setdefault(job[0].path, []).append(job)
+			for file_jobs in by_file.values():
+				readers.submit(read_file_segments, file_jobs, args.stride, frames, stop)
+		else:
+			for segment, first, resume_at in jobs:
+				readers.submit(read_segment, segment, first, args.stride, frames, stop, resume_at)
+		batch: List[SampledFrame] = []
+		finished: List[SegmentDone] = []
+		try:
+			while pending:
+				item = frames.get()
+				if isinstance(item, SegmentDone):
+					pending -= 1
+					finished.append(item)
+				else:
+					batch.append(item)
+				if len(batch) >= args.batch_size or (finished and not batch) or not pending:
+					process(batch, finished)
+					batch, finished = [], []
+			if batch or finished:
+				process(batch, finished)
+		except KeyboardInterrupt:
+			print("interrupted; progress saved to checkpoint", file=sys.stderr)
+			stop.set()
+			# Unblock readers waiting on a full queue.
+			while any(t.is_alive() for t in threading.enumerate() if t.name.startswith("reader")):
+				try:
+					frames.get(timeout=0.1)
+				except queue.Empty:
+					pass
+			return 130
+
+	progress.report(final=True)
+	return 0
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("inputs", nargs="+", help="video files or directories")
+	parser.add_argument("--camera-id", type=int, default=None)
+	parser.add_argument("--start-time", default="", help="ISO time of the first frame (default: file mtime - duration)")
+	parser.add_argument("--stride", type=int, default=5, help="process every Nth frame")
+	parser.add_argument("--batch-size", type=int, default=8)
+	parser.add_argument("--workers", type=int, default=4, help="parallel decoder threads")
+	parser.add_argument("--segment-frames", type=int, default=3000, help="frames per reader segment")
+	parser.add_argument("--confidence", type=float, default=0.0)
+	parser.add_argument("--track", action="store_true", help="write track events instead of every detection")
+	parser.add_argument("--checkpoint", default="", help="JSON file for resuming")
+	args = parser.parse_args()
+	if args.stride < 1 or args.batch_size < 1 or args.workers < 1:
+		parser.error("--stride, --batch-size and --workers must be positive")
+
+	configure_logging()
+	raise SystemExit(run(args))
+
+
+if __name__ == "__main__":
+	main()
@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,8 +26,26 @@ class Settings(BaseSettings):
 	LOG_LEVEL: str = "INFO"
 
 	DATABASE_URL: str = _default_sqlite_url()
+	# Request-path async engine; derived from DATABASE_URL (aiosqlite/asyncpg) when empty.
+	ASYNC_DATABASE_URL: str = ""
+	# SQLite connection pragmas (applied on every new connection).
+	DB_SQLITE_WAL: bool = True
+	DB_SQLITE_SYNCHRONOUS: str = "NORMAL"
+	DB_SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+	DB_SQLITE_BUSY_TIMEOUT_MS: int = 5000
+	# Connection pool for server databases (Postgres etc.).
+	DB_POOL_SIZE: int = 10
+	DB_MAX_OVERFLOW: int = 20
+	DB_POOL_TIMEOUT: float = 30.0
+	DB_POOL_RECYCLE: int = 1800
+	DB_POOL_PRE_PING: bool = True
 
 	MODEL_PATH: str = str(BASE_DIR / "best.pt")
+	# "yolo" for real models, "stub" for the deterministic benchmark model.
+	INFERENCE_BACKEND: str = "yolo"
+	STUB_INFERENCE_MS: float = 20.0
+	# Longest side the model sees; uploads are decoded no larger than needed for it.
+	MODEL_INPUT_SIZE: int = 640
 	DETECTION_LABELS: List[str] = Field(
 		default_factory=lambda: [
 			"person",
@@ -40,7 +58,105 @@ class Settings(BaseSettings):
 		]
 	)
 
+	# Two-stage cascade: a small screener model gates the heavy MODEL_PATH model.
+	# Disabled while CASCADE_SCREEN_MODEL_PATH is empty.
+	CASCADE_SCREEN_MODEL_PATH: str = ""
+	CASCADE_SCREEN_CONFIDENCE: float = 0.25
+	# Screener label -> heavy labels it is allowed to trigger ("*" matches any label).
+	CASCADE_ROUTES: Dict[str, List[str]] = Field(
+		default_factory=lambda: {
+			"person": ["weapon", "fight", "fighting"],
+			"car": ["accident", "fire"],
+		}
+	)
+	# Screener labels reported as detections without running the heavy model.
+	CASCADE_PASSTHROUGH_LABELS: List[str] = Field(
+		default_factory=lambda: ["person", "car"]
+	)
+	CASCADE_USE_CROPS: bool = False
+	CASCADE_CROP_PADDING: float = 0.25
+	# Run the heavy model on the full frame every N frames regardless (0 = never).
+	CASCADE_FULL_FRAME_INTERVAL: int = 0
+
+	# Result cache for /events/infer uploads: "memory", "redis" or "off".
+	INFER_CACHE_BACKEND: str = "memory"
+	INFER_CACHE_MAX_ENTRIES: int = 1024
+	INFER_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+	INFER_CACHE_TTL_SECONDS: float = 300.0
+	# Whether a cache hit writes events again like a fresh inference would.
+	INFER_CACHE_EVENTS_ON_HIT: bool = False
+
+	# Upload limits for /events/infer, checked before the image is decoded.
+	INFER_MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+	INFER_MAX_IMAGE_PIXELS: int = 50_000_000
+
+	# Admission control for /events/infer*: model slots, bounded queue, per-client
+	# concurrency and queueing-delay objectives per priority class.
+	INFER_MAX_CONCURRENCY: int = 1
+	INFER_MAX_QUEUE: int = 32
+	INFER_PER_CLIENT_LIMIT: int = 4
+	INFER_LATENCY_SLO_SECONDS: float = 2.0
+	INFER_BACKGROUND_SLO_SECONDS: float = 10.0
+
+	# Live-stream tracks end (and emit a track_end event) after this long unseen.
+	TRACK_MAX_AGE_SECONDS: float = 2.0
+	# Live detections at or above this are tracked and written as events,
+	# whatever viewers ask for; a viewer's confidence_threshold only filters
+	# what that viewer is shown.
+	LIVE_EVENT_CONFIDENCE: float = 0.8
+
+	# Messages buffered per live-stream viewer; slow viewers drop the oldest.
+	LIVE_VIEWER_QUEUE: int = 8
+
+	# Live sessions share one inference worker that batches the latest frame from
+	# each camera, waiting at most LIVE_BATCH_MAX_WAIT_MS for a fuller batch.
+	LIVE_BATCH_ENABLED: bool = True
+	LIVE_BATCH_MAX_SIZE: int = 8
+	LIVE_BATCH_MAX_WAIT_MS: float = 10.0
+
+	# Live capture: a stream whose timestamps stop advancing for
+	# CAPTURE_STALL_SECONDS is reopened in the background with exponential backoff;
+	# after CAPTURE_OFFLINE_AFTER_SECONDS of failures the camera reports offline.
+	CAPTURE_STALL_SECONDS: float = 5.0
+	CAPTURE_OPEN_TIMEOUT_SECONDS: float = 10.0
+	CAPTURE_BACKOFF_INITIAL_SECONDS: float = 0.5
+	CAPTURE_BACKOFF_MAX_SECONDS: float = 30.0
+	CAPTURE_OFFLINE_AFTER_SECONDS: float = 60.0
+
+	# Per-camera/label/hour box coverage grids (HEATMAP_GRID_SIZE squared cells),
+	# updated on every event write and served by GET /cameras/{id}/heatmap.
+	HEATMAP_ENABLED: bool = True
+	HEATMAP_GRID_SIZE: int = 64
+
+	# In-process column index of recent events behind GET /events/counts: warm
+	# loaded with the last RECENT_EVENTS_WINDOW_HOURS (at most CAPACITY events)
+	# and kept current by this process's writes only. Enable it only when this
+	# API process is the sole writer of events (one worker, no batch CLI on the
+	# same database); events written elsewhere are missing from its counts.
+	RECENT_EVENTS_ENABLED: bool = False
+	RECENT_EVENTS_CAPACITY: int = 500_000
+	RECENT_EVENTS_WINDOW_HOURS: float = 24.0
+
+	# Event clips: live sessions keep the last CLIP_PRE_ROLL_SECONDS of encoded
+	# frames and write pre-roll + post-roll to a Motion-JPEG .avi (frames muxed
+	# as-is, no re-encode) on track start/label change. Pending clips count
+	# against CLIP_BUFFER_MAX_BYTES and end early when it is exhausted.
+	# Any pre-roll means every processed frame is JPEG-encoded (without overlays,
+	# the "clip_encode" stage), so it is off by default: with 0 frames are only
+	# encoded while a clip is collecting.
+	CLIPS_ENABLED: bool = True
+	CLIP_PRE_ROLL_SECONDS: float = 0.0
+	CLIP_POST_ROLL_SECONDS: float = 5.0
+	CLIP_MAX_SECONDS: float = 60.0
+	CLIP_BUFFER_MAX_BYTES_PER_CAMERA: int = 32 * 1024 * 1024
+	CLIP_BUFFER_MAX_BYTES: int = 256 * 1024 * 1024
+	CLIP_ENCODER_QUEUE: int = 8
+
 	AUTH_MODE: str = "stub"
+	# Admin-only endpoints (profiling) accept these user ids or Cognito group.
+	# Empty by default; add "local-user" to reach them under stub auth.
+	ADMIN_USER_IDS: List[str] = Field(default_factory=list)
+	ADMIN_GROUP: str = "admin"
 	COGNITO_REGION: str = ""
 	COGNITO_USER_POOL_ID: str = ""
 	COGNITO_APP_CLIENT_ID: str = ""
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Minimal Prometheus text-format registry. Children are cached per label tuple
+# so recording in the frame loop is a dict lookup plus a locked add.
+
+DEFAULT_BUCKETS = (
+	0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+	if not labels:
+		return ""
+	parts = []
+	for key, value in labels.items():
+		escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+		parts.append(f'{key}="{escaped}"')
+	return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+	if value == float("inf"):
+		return "+Inf"
+	if float(value).is_integer():
+		return str(int(value))
+	return repr(float(value))
+
+
+class _Metric(ABC):
+	kind = ""
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._children: Dict[tuple, object] = {}
+		self._lock = threading.Lock()
+
+	def labels(self, *values: object):
+		key = tuple(str(v) for v in values)
+		child = self._children.get(key)
+		if child is None:
+			with self._lock:
+				child = self._children.get(key)
+				if child is None:
+					child = self._new_child()
+					self._children[key] = child
+		return child
+
+	def remove(self, *values: object) -> None:
+		with self._lock:
+			self._children.pop(tuple(str(v) for v in values), None)
+
+	@abstractmethod
+	def _new_child(self):
+		...
+
+	@abstractmethod
+	def samples(self) -> List[Sample]:
+		...
+
+
+class _Value:
+	__slots__ = ("value", "lock")
+
+	def __init__(self) -> None:
+		self.value = 0.0
+		self.lock = threading.Lock()
+
+	def inc(self, amount: float = 1.0) -> None:
+		with self.lock:
+			self.value += amount
+
+	def dec(self, amount: float = 1.0) -> None:
+		with self.lock:
+			self.value -= amount
+
+	def set(self, value: float) -> None:
+		self.value = value
+
+
+class Counter(_Metric):
+	kind = "counter"
+
+	def _new_child(self) -> _Value:
+		return _Value()
+
+	def inc(self, amount: float = 1.0) -> None:
+		self.labels().inc(amount)
+
+	def samples(self) -> List[Sample]:
+		return [
+			(self.name + "_total", dict(zip(self.labelnames, key)), child.value)
+			for key, child in list(self._children.items())
+		]
+
+
+class Gauge(Counter):
+	kind = "gauge"
+
+	def set(self, value: float) -> None:
+		self.labels().set(value)
+
+	def samples(self) -> List[Sample]:
+		return [
+			(self.name, dict(zip(self.labelnames, key)), child.value)
+			for key, child in list(self._children.items())
+		]
+
+
+class _HistogramValue:
+	__slots__ = ("buckets", "counts", "sum", "count", "lock")
+
+	def __init__(self, buckets: Sequence[float]) -> None:
+		self.buckets = buckets
+		self.counts = [0] * (len(buckets) + 1)
+		self.sum = 0.0
+		self.count = 0
+		self.lock = threading.Lock()
+
+	def observe(self, value: float) -> None:
+		index = bisect_left(self.buckets, value)
+		with self.lock:
+			self.counts[index] += 1
+			self.sum += value
+			self.count += 1
+
+
+class Histogram(_Metric):
+	kind = "histogram"
+
+	def __init__(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = DEFAULT_BUCKETS,
+	) -> None:
+		super().__init__(name, documentation, labelnames)
+		self.buckets = tuple(sorted(buckets))
+
+	def _new_child(self) -> _HistogramValue:
+		return _HistogramValue(self.buckets)
+
+	def observe(self, value: float) -> None:
+		self.labels().observe(value)
+
+	def samples(self) -> List[Sample]:
+		samples: List[Sample] = []
+		for key, child in list(self._children.items()):
+			labels = dict(zip(self.labelnames, key))
+			with child.lock:
+				counts = list(child.counts)
+				total, count = child.sum, child.count
+			cumulative = 0
+			for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+				cumulative += bucket_count
+				samples.append(
+					(self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+				)
+			samples.append((self.name + "_sum", labels, total))
+			samples.append((self.name + "_count", labels, count))
+		return samples
+
+
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+class Registry:
+	def __init__(self) -> None:
+		self.metrics: List[_Metric] = []
+		self.collectors: List[Collector] = []
+
+	def register(self, metric: _Metric) -> _Metric:
+		self.metrics.append(metric)
+		return metric
+
+	def register_collector(self, collector: Collector) -> Collector:
+		self.collectors.append(collector)
+		return collector
+
+	def render(self) -> str:
+		families = [
+			(metric.name, metric.kind, metric.documentation, metric.samples())
+			for metric in self.metrics
+		]
+		for collector in self.collectors:
+			families.extend(collector())
+
+		lines = []
+		for name, kind, documentation, samples in families:
+			lines.append(f"# HELP {name} {documentation}")
+			lines.append(f"# TYPE {name} {kind}")
+			for sample_name, labels, value in samples:
+				lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+		return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+	Histogram(
+		"monkey_pipeline_stage_seconds",
+		"Time spent per pipeline stage.",
+		("pipeline", "stage"),
+	)
+)
+LIVE_FPS = REGISTRY.register(
+	Gauge("monkey_live_fps", "Processed frames per second per live camera.", ("camera",))
+)
+LIVE_FRAME_AGE = REGISTRY.register(
+	Gauge(
+		"monkey_live_frame_age_seconds",
+		"Age of the most recently delivered frame since capture.",
+		("camera",),
+	)
+)
+LIVE_SESSIONS = REGISTRY.register(
+	Gauge("monkey_live_sessions", "Active live-stream sessions (one per shared stream).")
+)
+LIVE_VIEWERS = REGISTRY.register(
+	Gauge("monkey_live_viewers", "Clients attached to live-stream sessions.")
+)
+EVENTS_WRITTEN = REGISTRY.register(
+	Counter("monkey_events_written", "Events written to the database.", ("label",))
+)
+MODEL_LOAD_SECONDS = REGISTRY.register(
+	Gauge("monkey_model_load_seconds", "Time taken to load each model.", ("model",))
+)
+
+
+def render_metrics() -> str:
+	return REGISTRY.render()
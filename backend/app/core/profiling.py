@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+import os
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Iterator, List, TypeVar
+
+# Live-stream sessions tag the thread currently doing their work so a sampler can
+# attribute stacks to a session without touching other threads.
+_session_ids = count(1)
+_sessions: Dict[str, str] = {}
+_thread_tags: Dict[int, str] = {}
+_lock = threading.Lock()
+# ASGI scope of the current HTTP request; copied into threadpool workers. The
+# router adds the matched route to it after the middleware has run.
+_request_scope: ContextVar[Dict[str, Any] | None] = ContextVar("request_scope", default=None)
+
+T = TypeVar("T")
+
+
+def register_session(label: str) -> str:
+	session_id = f"{label}-{next(_session_ids)}"
+	with _lock:
+		_sessions[session_id] = label
+	return session_id
+
+
+def unregister_session(session_id: str) -> None:
+	with _lock:
+		_sessions.pop(session_id, None)
+		for ident in [i for i, tag in _thread_tags.items() if tag == session_id]:
+			del _thread_tags[ident]
+
+
+def active_sessions() -> List[str]:
+	with _lock:
+		return sorted(_sessions)
+
+
+def tag_current_thread(session_id: str) -> None:
+	_thread_tags[threading.get_ident()] = session_id
+
+
+def untag_current_thread() -> None:
+	_thread_tags.pop(threading.get_ident(), None)
+
+
+class RequestPathMiddleware:
+	def __init__(self, app) -> None:
+		self.app = app
+
+	async def __call__(self, scope, receive, send) -> None:
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+		token = _request_scope.set(scope)
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			_request_scope.reset(token)
+
+
+def _route_path(scope: Dict[str, Any]) -> str:
+	# The route template ("/events/{event_id}"), which is what profiles select by.
+	route = scope.get("route")
+	return getattr(route, "path", None) or scope["path"]
+
+
+def call_tagged(fn: Callable[..., T], *args: Any) -> T:
+	# Run in a threadpool worker: tags the worker with the request's route so
+	# route profiles include work offloaded from async handlers.
+	scope = _request_scope.get()
+	if scope is None:
+		return fn(*args)
+	path = _route_path(scope)
+	ident = threading.get_ident()
+	_thread_tags[ident] = f"route:{path}"
+	try:
+		return fn(*args)
+	finally:
+		_thread_tags.pop(ident, None)
+
+
+def _frame_name(frame: FrameType) -> str:
+	code = frame.f_code
+	return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+	def __init__(self, match: Callable[[int, FrameType], bool], interval: float = 0.005) -> None:
+		self.match = match
+		self.interval = interval
+		self.stacks: Counter[str] = Counter()
+		self.samples = 0
+
+	def run(self, seconds: float) -> "SamplingProfiler":
+		own = threading.get_ident()
+		deadline = time.perf_counter() + seconds
+		while time.perf_counter() < deadline:
+			for ident, frame in sys._current_frames().items():
+				if ident == own or not self.match(ident, frame):
+					continue
+				names = []
+				while frame is not None:
+					names.append(_frame_name(frame))
+					frame = frame.f_back
+				self.stacks[";".join(reversed(names))] += 1
+				self.samples += 1
+			time.sleep(self.interval)
+		return self
+
+	async def run_in_thread(self, seconds: float) -> "SamplingProfiler":
+		# Profiles last up to minutes; sample on a dedicated thread rather than
+		# holding a shared threadpool worker for the whole run.
+		loop = asyncio.get_running_loop()
+		done: asyncio.Future = loop.create_future()
+
+		def resolve(error: BaseException | None) -> None:
+			if done.done():
+				return
+			if error is None:
+				done.set_result(self)
+			else:
+				done.set_exception(error)
+
+		def target() -> None:
+			try:
+				self.run(seconds)
+			except BaseException as exc:
+				loop.call_soon_threadsafe(resolve, exc)
+			else:
+				loop.call_soon_threadsafe(resolve, None)
+
+		threading.Thread(target=target, name="profiler", daemon=True).start()
+		return await done
+
+	def collapsed(self) -> str:
+		# Brendan Gregg's collapsed format, accepted by flamegraph.pl and speedscope.
+		return "".join(f"{stack} {hits}\n" for stack, hits in self.stacks.most_common())
+
+
+def session_matcher(session_id: str) -> Callable[[int, FrameType], bool]:
+	def match(ident: int, frame: FrameType) -> bool:
+		return _thread_tags.get(ident) == session_id
+
+	return match
+
+
+def route_matcher(path: str, code: CodeType) -> Callable[[int, FrameType], bool]:
+	tag = f"route:{path}"
+
+	def match(ident: int, frame: FrameType) -> bool:
+		if _thread_tags.get(ident) == tag:
+			return True
+		while frame is not None:
+			if frame.f_code is code:
+				return True
+			frame = frame.f_back
+		return False
+
+	return match
+
+
+class ServerTiming:
+	def __init__(self) -> None:
+		self.entries: List[tuple[str, float, str]] = []
+
+	def add(self, name: str, seconds: float, description: str = "") -> None:
+		self.entries.append((name, seconds, description))
+
+	@contextmanager
+	def measure(self, name: str) -> Iterator[None]:
+		started = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add(name, time.perf_counter() - started)
+
+	def header(self) -> str:
+		parts = []
+		for name, seconds, description in self.entries:
+			part = f"{name};dur={seconds * 1000:.2f}"
+			if description:
+				part += f';desc="{description}"'
+			parts.append(part)
+		return ", ".join(parts)
@@ -1,8 +1,8 @@
 import json
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, Dict
+from typing import Any, Dict, List
 from urllib.request import urlopen
 
 from jose import jwt
@@ -17,6 +17,7 @@ logger = logging.getLogger(__name__)
 class UserContext:
 	user_id: str
 	email: str | None = None
+	groups: List[str] = field(default_factory=list)
 
 
 def _cognito_jwks_url() -> str:
@@ -55,6 +56,7 @@ def _verify_cognito_jwt(token: str) -> UserContext:
 	return UserContext(
 		user_id=claims.get("sub", ""),
 		email=claims.get("email"),
+		groups=list(claims.get("cognito:groups", [])),
 	)
 
 
@@ -0,0 +1,82 @@
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import Settings
+
+
+def is_sqlite(url: str) -> bool:
+	return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+	database = make_url(url).database
+	return not database or database == ":memory:"
+
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url: str) -> str:
+	parsed = make_url(url)
+	backend = parsed.get_backend_name()
+	if backend not in ASYNC_DRIVERS:
+		raise ValueError(
+			f"No async driver known for {backend!r} database URLs; set ASYNC_DATABASE_URL"
+		)
+	parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+	return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str, settings: Settings) -> Dict[str, Any]:
+	if is_sqlite(url):
+		return {
+			"connect_args": {
+				"check_same_thread": False,
+				"timeout": settings.DB_SQLITE_BUSY_TIMEOUT_MS / 1000,
+			}
+		}
+	return {
+		"pool_size": settings.DB_POOL_SIZE,
+		"max_overflow": settings.DB_MAX_OVERFLOW,
+		"pool_timeout": settings.DB_POOL_TIMEOUT,
+		"pool_recycle": settings.DB_POOL_RECYCLE,
+		"pool_pre_ping": settings.DB_POOL_PRE_PING,
+	}
+
+
+def install_sqlite_pragmas(engine: Engine, settings: Settings, memory: bool = False) -> None:
+	pragmas = [
+		f"PRAGMA busy_timeout={int(settings.DB_SQLITE_BUSY_TIMEOUT_MS)}",
+		f"PRAGMA synchronous={settings.DB_SQLITE_SYNCHRONOUS}",
+		f"PRAGMA mmap_size={int(settings.DB_SQLITE_MMAP_SIZE)}",
+	]
+	# WAL lets readers proceed while a writer holds the lock; it does not apply
+	# to in-memory databases.
+	if settings.DB_SQLITE_WAL and not memory:
+		pragmas.insert(0, "PRAGMA journal_mode=WAL")
+
+	@event.listens_for(engine, "connect")
+	def _set_pragmas(dbapi_connection, connection_record) -> None:
+		cursor = dbapi_connection.cursor()
+		try:
+			for pragma in pragmas:
+				cursor.execute(pragma)
+		finally:
+			cursor.close()
+
+
+def build_engine(url: str, settings: Settings) -> Engine:
+	engine = create_engine(url, **engine_options(url, settings))
+	if is_sqlite(url):
+		install_sqlite_pragmas(engine, settings, memory=_is_memory_sqlite(url))
+	return engine
+
+
+def build_async_engine(url: str, settings: Settings) -> AsyncEngine:
+	engine = create_async_engine(url, **engine_options(url, settings))
+	if is_sqlite(url):
+		install_sqlite_pragmas(engine.sync_engine, settings, memory=_is_memory_sqlite(url))
+	return engine
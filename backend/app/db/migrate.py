@@ -0,0 +1,26 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.db.base import Base
+
+# Nullable columns added after their table first shipped. create_all() does not
+# alter existing tables, so these are added in place on startup.
+ADDED_COLUMNS = [
+	("events", "clip_path"),
+]
+
+
+def add_missing_columns(engine: Engine) -> None:
+	inspector = inspect(engine)
+	with engine.begin() as connection:
+		for table_name, column_name in ADDED_COLUMNS:
+			if not inspector.has_table(table_name):
+				continue
+			existing = {column["name"] for column in inspector.get_columns(table_name)}
+			if column_name in existing:
+				continue
+			column = Base.metadata.tables[table_name].columns[column_name]
+			column_type = column.type.compile(dialect=engine.dialect)
+			connection.execute(
+				text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+			)
@@ -1,22 +1,41 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import get_settings
+from app.db.engine import async_url, build_async_engine, build_engine
 
 settings = get_settings()
 
-connect_args = {}
-if settings.DATABASE_URL.startswith("sqlite"):
-	connect_args = {"check_same_thread": False}
-
-engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+engine = build_engine(settings.DATABASE_URL, settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+	# Built on first use so the CLI and sync-only deployments never need an
+	# async driver (aiosqlite/asyncpg) or a derivable ASYNC_DATABASE_URL.
+	url = settings.ASYNC_DATABASE_URL or async_url(settings.DATABASE_URL)
+	try:
+		async_engine = build_async_engine(url, settings)
+	except ImportError as exc:
+		raise RuntimeError(
+			f"Async database driver for {url.split(':', 1)[0]!r} is not installed; "
+			f"install it or set ASYNC_DATABASE_URL ({exc})"
+		) from exc
+	return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
 	db = SessionLocal()
 	try:
 		yield db
 	finally:
 		db.close()
+
+
+async def get_async_db():
+	async with get_async_sessionmaker()() as db:
+		yield db
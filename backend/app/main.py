@@ -1,13 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.v1.api import api_router
 from app.core.config import get_settings
 from app.core.logging import configure_logging
+from app.core.metrics import render_metrics
+from app.core.profiling import RequestPathMiddleware
 from app.db.base import Base
+from app.db.migrate import add_missing_columns
 from app.db.session import engine
 from app.services.inference_service import get_inference_service
-from app.models import camera, event, user  # noqa: F401
+from app.services.recent_events import warm_recent_events
+from app.models import camera, event, heatmap, user  # noqa: F401
 
 
 def create_app() -> FastAPI:
@@ -21,18 +26,28 @@ def create_app() -> FastAPI:
 		allow_credentials=True,
 		allow_methods=["*"],
 		allow_headers=["*"],
+		expose_headers=["Server-Timing"],
 	)
+	app.add_middleware(RequestPathMiddleware)
 
 	app.include_router(api_router, prefix=settings.API_V1_STR)
 
 	@app.on_event("startup")
 	def on_startup() -> None:
 		Base.metadata.create_all(bind=engine)
+		add_missing_columns(engine)
+		warm_recent_events()
 
 	@app.get("/health")
 	def health_check():
 		return {"status": "ok"}
 
+	@app.get("/metrics", response_class=PlainTextResponse)
+	def metrics():
+		return PlainTextResponse(
+			render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+		)
+
 	return app
 
 
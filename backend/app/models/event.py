@@ -12,6 +12,7 @@ class Event(Base):
 	label = Column(String, nullable=False)
 	confidence = Column(Float, nullable=False)
 	image_path = Column(String, nullable=True)
+	clip_path = Column(String, nullable=True)
 	payload = Column(JSON, nullable=True)
 	occurred_at = Column(DateTime(timezone=True), server_default=func.now())
 	created_at = Column(DateTime(timezone=True), server_default=func.now())
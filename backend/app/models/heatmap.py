@@ -0,0 +1,30 @@
+from sqlalchemy import (
+	Column,
+	DateTime,
+	ForeignKey,
+	Integer,
+	LargeBinary,
+	String,
+	UniqueConstraint,
+	func,
+)
+
+from app.db.base import Base
+
+
+class EventHeatmap(Base):
+	"""Box coverage counts for one camera, label and hour on a fixed grid."""
+
+	__tablename__ = "event_heatmaps"
+	__table_args__ = (UniqueConstraint("camera_id", "label", "hour"),)
+
+	id = Column(Integer, primary_key=True, index=True)
+	camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=False, index=True)
+	label = Column(String, nullable=False)
+	hour = Column(DateTime, nullable=False, index=True)
+	rows = Column(Integer, nullable=False)
+	cols = Column(Integer, nullable=False)
+	# int32 array of shape (rows, cols), C order.
+	counts = Column(LargeBinary, nullable=False)
+	events = Column(Integer, nullable=False, default=0)
+	updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,7 @@
 from typing import List
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.camera import Camera
@@ -26,3 +28,29 @@ class CameraRepository:
 	def delete(self, db: Session, camera: Camera) -> None:
 		db.delete(camera)
 		db.commit()
+
+
+class AsyncCameraRepository:
+	async def get(self, db: AsyncSession, camera_id: int) -> Camera | None:
+		return await db.get(Camera, camera_id)
+
+	async def list_all(
+		self, db: AsyncSession, skip: int = 0, limit: int = 100
+	) -> List[Camera]:
+		result = await db.execute(select(Camera).offset(skip).limit(limit))
+		return list(result.scalars().all())
+
+	async def create(self, db: AsyncSession, camera: Camera) -> Camera:
+		db.add(camera)
+		await db.commit()
+		await db.refresh(camera)
+		return camera
+
+	async def update(self, db: AsyncSession, camera: Camera) -> Camera:
+		await db.commit()
+		await db.refresh(camera)
+		return camera
+
+	async def delete(self, db: AsyncSession, camera: Camera) -> None:
+		await db.delete(camera)
+		await db.commit()
@@ -1,5 +1,8 @@
-from typing import List
+from datetime import datetime
+from typing import Iterable, List, Tuple
 
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.event import Event
@@ -35,3 +38,101 @@ class EventRepository:
 		for event in events:
 			db.refresh(event)
 		return events
+
+	def clear_clip_path(self, db: Session, clip_path: str) -> int:
+		result = db.execute(
+			update(Event).where(Event.clip_path == clip_path).values(clip_path=None)
+		)
+		db.commit()
+		return result.rowcount
+
+	def insert_many(self, db: Session, events: List[Event]) -> List[Event]:
+		db.add_all(events)
+		db.commit()
+		return events
+
+	def list_recent_columns(
+		self, db: Session, since: datetime, limit: int
+	) -> List[Tuple[int, datetime, int | None, str, float]]:
+		"""Newest-first (id, occurred_at, camera_id, label, confidence) rows, no ORM objects."""
+		result = db.execute(
+			select(Event.id, Event.occurred_at, Event.camera_id, Event.label, Event.confidence)
+			.where(Event.occurred_at >= since)
+			.order_by(Event.occurred_at.desc())
+			.limit(limit)
+		)
+		return [tuple(row) for row in result.all()]
+
+
+class AsyncEventRepository:
+	async def get(self, db: AsyncSession, event_id: int) -> Event | None:
+		return await db.get(Event, event_id)
+
+	async def list_all(
+		self, db: AsyncSession, skip: int = 0, limit: int = 100
+	) -> List[Event]:
+		result = await db.execute(select(Event).offset(skip).limit(limit))
+		return list(result.scalars().all())
+
+	async def list_by_camera(
+		self, db: AsyncSession, camera_id: int, skip: int = 0, limit: int = 100
+	) -> List[Event]:
+		result = await db.execute(
+			select(Event)
+			.where(Event.camera_id == camera_id)
+			.offset(skip)
+			.limit(limit)
+		)
+		return list(result.scalars().all())
+
+	async def create(self, db: AsyncSession, event: Event) -> Event:
+		db.add(event)
+		await db.commit()
+		await db.refresh(event)
+		return event
+
+	async def create_many(self, db: AsyncSession, events: List[Event]) -> List[Event]:
+		db.add_all(events)
+		await db.commit()
+		for event in events:
+			await db.refresh(event)
+		return events
+
+	async def list_in_range(
+		self,
+		db: AsyncSession,
+		camera_id: int,
+		start: datetime,
+		end: datetime,
+		labels: Iterable[str] | None = None,
+	) -> List[Event]:
+		query = select(Event).where(
+			Event.camera_id == camera_id,
+			Event.occurred_at >= start,
+			Event.occurred_at < end,
+		)
+		if labels:
+			query = query.where(Event.label.in_(list(labels)))
+		result = await db.execute(query)
+		return list(result.scalars().all())
+
+	async def count_in_range(
+		self,
+		db: AsyncSession,
+		start: datetime | None,
+		end: datetime,
+		camera_id: int | None = None,
+		label: str | None = None,
+		min_confidence: float = 0.0,
+	) -> List[Tuple[int | None, str, int]]:
+		query = select(Event.camera_id, Event.label, func.count()).where(Event.occurred_at < end)
+		if start is not None:
+			query = query.where(Event.occurred_at >= start)
+		if camera_id is not None:
+			query = query.where(Event.camera_id == camera_id)
+		if label is not None:
+			query = query.where(Event.label == label)
+		if min_confidence > 0:
+			query = query.where(Event.confidence >= min_confidence)
+		result = await db.execute(query.group_by(Event.camera_id, Event.label))
+		return [tuple(row) for row in result.all()]
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.heatmap import EventHeatmap
+
+
+def _bucket_query(camera_id: int, label: str, hour: datetime):
+	return (
+		select(EventHeatmap)
+		.where(
+			EventHeatmap.camera_id == camera_id,
+			EventHeatmap.label == label,
+			EventHeatmap.hour == hour,
+		)
+		.with_for_update()
+	)
+
+
+class HeatmapRepository:
+	def get_for_update(
+		self, db: Session, camera_id: int, label: str, hour: datetime
+	) -> EventHeatmap | None:
+		return db.execute(_bucket_query(camera_id, label, hour)).scalars().first()
+
+	def add(self, db: Session, bucket: EventHeatmap) -> None:
+		db.add(bucket)
+
+
+class AsyncHeatmapRepository:
+	async def list_buckets(
+		self,
+		db: AsyncSession,
+		camera_id: int,
+		labels: Iterable[str] | None = None,
+		start: datetime | None = None,
+		end: datetime | None = None,
+	) -> List[EventHeatmap]:
+		query = select(EventHeatmap).where(EventHeatmap.camera_id == camera_id)
+		if labels:
+			query = query.where(EventHeatmap.label.in_(list(labels)))
+		if start is not None:
+			query = query.where(EventHeatmap.hour >= start)
+		if end is not None:
+			query = query.where(EventHeatmap.hour < end)
+		result = await db.execute(query)
+		return list(result.scalars().all())
@@ -1,5 +1,7 @@
 from typing import List
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.user import User
@@ -24,3 +26,28 @@ class UserRepository:
 	def delete(self, db: Session, user: User) -> None:
 		db.delete(user)
 		db.commit()
+
+
+class AsyncUserRepository:
+	async def get(self, db: AsyncSession, user_id: int) -> User | None:
+		return await db.get(User, user_id)
+
+	async def get_by_email(self, db: AsyncSession, email: str) -> User | None:
+		result = await db.execute(select(User).where(User.email == email))
+		return result.scalars().first()
+
+	async def list_all(
+		self, db: AsyncSession, skip: int = 0, limit: int = 100
+	) -> List[User]:
+		result = await db.execute(select(User).offset(skip).limit(limit))
+		return list(result.scalars().all())
+
+	async def create(self, db: AsyncSession, user: User) -> User:
+		db.add(user)
+		await db.commit()
+		await db.refresh(user)
+		return user
+
+	async def delete(self, db: AsyncSession, user: User) -> None:
+		await db.delete(user)
+		await db.commit()
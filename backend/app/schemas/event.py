@@ -10,6 +10,7 @@ class EventBase(BaseModel):
 	label: str
 	confidence: float
 	image_path: str | None = None
+	clip_path: str | None = None
 	payload: Dict[str, Any] | None = None
 
 
@@ -32,6 +33,7 @@ class Detection(BaseModel):
 
 class InferenceResponse(BaseModel):
 	detections: List[Detection]
+	cached: bool = False
 
 
 class InferenceStreamRequest(BaseModel):
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+import contextvars
+from dataclasses import dataclass
+from functools import lru_cache
+import heapq
+from itertools import count
+import math
+import time
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+PRIORITIES = {"interactive": 0, "background": 1}
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+	def __init__(self, status_code: int, detail: str, retry_after: float) -> None:
+		super().__init__(detail)
+		self.status_code = status_code
+		self.detail = detail
+		self.retry_after = max(int(math.ceil(retry_after)), 1)
+
+
+@dataclass
+class Ticket:
+	client: str
+	priority: int
+	enqueued_at: float
+	admitted_at: float = 0.0
+
+	@property
+	def wait_seconds(self) -> float:
+		return self.admitted_at - self.enqueued_at
+
+
+class AdmissionController:
+	def __init__(
+		self,
+		max_concurrency: int,
+		max_queue: int,
+		per_client_limit: int,
+		slo_seconds: Dict[int, float],
+		initial_service_seconds: float = 0.2,
+	) -> None:
+		self.max_concurrency = max_concurrency
+		self.max_queue = max_queue
+		self.per_client_limit = per_client_limit
+		self.slo_seconds = slo_seconds
+		self.service_seconds = initial_service_seconds
+		self.in_flight = 0
+		self._waiters: list[tuple[int, int, asyncio.Future]] = []
+		self._sequence = count()
+		self._per_client: Dict[str, int] = defaultdict(int)
+
+		self.admitted = 0
+		self.rejected: Dict[str, int] = defaultdict(int)
+		self.wait_total = 0.0
+		self.wait_max = 0.0
+		self.service_total = 0.0
+
+	@property
+	def queue_depth(self) -> int:
+		return sum(1 for _, _, future in self._waiters if not future.done())
+
+	def _estimate_wait(self, priority: int) -> float:
+		if self.in_flight < self.max_concurrency and not self._waiters:
+			return 0.0
+		ahead = sum(
+			1 for p, _, future in self._waiters if p <= priority and not future.done()
+		)
+		return (ahead + 1) / self.max_concurrency * self.service_seconds
+
+	def _reject(self, reason: str, status_code: int, detail: str, retry_after: float) -> None:
+		self.rejected[reason] += 1
+		raise AdmissionRejected(status_code, detail, retry_after)
+
+	async def acquire(self, client: str, priority: int) -> Ticket:
+		if self._per_client[client] >= self.per_client_limit:
+			self._reject(
+				"client_limit", 429, "Too many concurrent inference requests", self.service_seconds
+			)
+
+		depth = self.queue_depth
+		limit = self.max_queue if priority == 0 else self.max_queue // 2
+		if depth >= limit:
+			self._reject(
+				"queue_full", 503, "Inference queue is full", self._estimate_wait(priority)
+			)
+
+		estimated = self._estimate_wait(priority)
+		if estimated > self.slo_seconds.get(priority, math.inf):
+			self._reject(
+				"slo", 503, "Inference queue delay exceeds latency objective", estimated
+			)
+
+		ticket = Ticket(client=client, priority=priority, enqueued_at=time.perf_counter())
+		self._per_client[client] += 1
+		try:
+			if self.in_flight < self.max_concurrency and not self.queue_depth:
+				self.in_flight += 1
+			else:
+				future = asyncio.get_running_loop().create_future()
+				entry = (priority, next(self._sequence), future)
+				heapq.heappush(self._waiters, entry)
+				try:
+					await future
+				except asyncio.CancelledError:
+					if future.done() and not future.cancelled():
+						# Slot was handed over just as we were cancelled.
+						self._release_slot()
+					raise
+		except BaseException:
+			self._drop_client(client)
+			raise
+
+		ticket.admitted_at = time.perf_counter()
+		self.admitted += 1
+		self.wait_total += ticket.wait_seconds
+		self.wait_max = max(self.wait_max, ticket.wait_seconds)
+		return ticket
+
+	def release(self, ticket: Ticket, service_seconds: float) -> None:
+		self.service_seconds = 0.8 * self.service_seconds + 0.2 * service_seconds
+		self.service_total += service_seconds
+		self._drop_client(ticket.client)
+		self._release_slot()
+
+	def _drop_client(self, client: str) -> None:
+		self._per_client[client] -= 1
+		if self._per_client[client] <= 0:
+			del self._per_client[client]
+
+	def _release_slot(self) -> None:
+		while self._waiters:
+			_, _, future = heapq.heappop(self._waiters)
+			if not future.done():
+				future.set_result(None)
+				return
+		self.in_flight -= 1
+
+	async def run(
+		self, client: str, priority: int, fn: Callable[..., T], *args: Any
+	) -> Tuple[T, Ticket]:
+		"""Once admitted, run `fn(*args)` on a worker thread holding the slot.
+
+		The slot is released when the thread finishes, not when the caller
+		stops waiting: a client that disconnects mid-inference keeps its slot
+		until the model call it started is done.
+		"""
+		ticket = await self.acquire(client, priority)
+		context = contextvars.copy_context()
+		try:
+			future = asyncio.get_running_loop().run_in_executor(None, context.run, fn, *args)
+		except BaseException:
+			self.release(ticket, 0.0)
+			raise
+
+		def finished(done: asyncio.Future) -> None:
+			if not done.cancelled():
+				done.exception()  # retrieved here if the caller has gone
+			self.release(ticket, time.perf_counter() - ticket.admitted_at)
+
+		future.add_done_callback(finished)
+		return await asyncio.shield(future), ticket
+
+	def collect(self):
+		return [
+			(
+				"monkey_inference_queue_depth",
+				"gauge",
+				"Inference requests waiting for a model slot.",
+				[("monkey_inference_queue_depth", {}, self.queue_depth)],
+			),
+			(
+				"monkey_inference_in_flight",
+				"gauge",
+				"Inference requests holding a model slot.",
+				[("monkey_inference_in_flight", {}, self.in_flight)],
+			),
+			(
+				"monkey_inference_rejected",
+				"counter",
+				"Inference requests shed by admission control.",
+				[
+					("monkey_inference_rejected_total", {"reason": reason}, value)
+					for reason, value in list(self.rejected.items())
+				],
+			),
+		]
+
+	def snapshot(self) -> Dict[str, Any]:
+		return {
+			"in_flight": self.in_flight,
+			"queue_depth": self.queue_depth,
+			"admitted": self.admitted,
+			"rejected": dict(self.rejected),
+			"queue_wait_ms_avg": self.wait_total / self.admitted * 1000 if self.admitted else 0.0,
+			"queue_wait_ms_max": self.wait_max * 1000,
+			"service_ms_avg": self.service_total / self.admitted * 1000 if self.admitted else 0.0,
+			"service_ms_ewma": self.service_seconds * 1000,
+		}
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+	settings = get_settings()
+	controller = AdmissionController(
+		max_concurrency=settings.INFER_MAX_CONCURRENCY,
+		max_queue=settings.INFER_MAX_QUEUE,
+		per_client_limit=settings.INFER_PER_CLIENT_LIMIT,
+		slo_seconds={
+			PRIORITIES["interactive"]: settings.INFER_LATENCY_SLO_SECONDS,
+			PRIORITIES["background"]: settings.INFER_BACKGROUND_SLO_SECONDS,
+		},
+	)
+	REGISTRY.register_collector(controller.collect)
+	return controller
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from functools import lru_cache
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, List, Tuple
+
+from PIL import Image
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, STAGE_SECONDS
+from app.services.inference_service import InferenceService, get_inference_service
+
+logger = logging.getLogger(__name__)
+
+LETTERBOX_FILL = (114, 114, 114)
+# Clients that submitted within this window count as active when deciding
+# whether waiting for more frames is worthwhile.
+ACTIVE_SECONDS = 2.0
+STATS_WINDOW_SECONDS = 10.0
+
+
+@dataclass
+class Letterbox:
+	image: Image.Image
+	scale: float
+	pad_x: int
+	pad_y: int
+
+	def unmap(self, detections: List[Dict[str, Any]], size: Tuple[int, int]) -> List[Dict[str, Any]]:
+		width, height = size
+		for detection in detections:
+			x1, y1, x2, y2 = detection["bbox"]
+			detection["bbox"] = [
+				min(max((x1 - self.pad_x) / self.scale, 0.0), width),
+				min(max((y1 - self.pad_y) / self.scale, 0.0), height),
+				min(max((x2 - self.pad_x) / self.scale, 0.0), width),
+				min(max((y2 - self.pad_y) / self.scale, 0.0), height),
+			]
+			detection["frame_size"] = [width, height]
+		return detections
+
+
+def letterbox(image: Image.Image, size: int) -> Letterbox:
+	"""Resize keeping aspect ratio and pad to a size x size square."""
+	width, height = image.size
+	scale = size / max(width, height)
+	resized_w, resized_h = max(round(width * scale), 1), max(round(height * scale), 1)
+	pad_x, pad_y = (size - resized_w) // 2, (size - resized_h) // 2
+	canvas = Image.new("RGB", (size, size), LETTERBOX_FILL)
+	canvas.paste(image.resize((resized_w, resized_h), Image.BILINEAR), (pad_x, pad_y))
+	return Letterbox(canvas, scale, pad_x, pad_y)
+
+
+@dataclass
+class _Request:
+	key: str
+	camera: str
+	image: Image.Image
+	submitted: float
+	future: Future = field(default_factory=Future)
+
+
+@dataclass
+class SchedulerStats:
+	batches: int = 0
+	frames: int = 0
+	detections: int = 0
+	timeouts: int = 0
+	failures: int = 0
+	camera_latency: Dict[str, Tuple[int, float, float]] = field(default_factory=dict)
+	window: Deque[Tuple[float, int, int]] = field(default_factory=deque)
+	lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+	def record(self, batch: List[_Request], detections: List[int], now: float) -> None:
+		with self.lock:
+			self.batches += 1
+			self.frames += len(batch)
+			self.detections += sum(detections)
+			self.window.append((now, len(batch), sum(detections)))
+			while self.window and now - self.window[0][0] > STATS_WINDOW_SECONDS:
+				self.window.popleft()
+			for request in batch:
+				latency = now - request.submitted
+				count, _, ema = self.camera_latency.get(request.camera, (0, 0.0, latency))
+				self.camera_latency[request.camera] = (count + 1, latency, 0.9 * ema + 0.1 * latency)
+
+	def rates(self, now: float) -> Tuple[float, float, float]:
+		with self.lock:
+			window = [entry for entry in self.window if now - entry[0] <= STATS_WINDOW_SECONDS]
+		if not window:
+			return 0.0, 0.0, 0.0
+		frames = sum(entry[1] for entry in window)
+		detections = sum(entry[2] for entry in window)
+		return (
+			frames / STATS_WINDOW_SECONDS,
+			detections / STATS_WINDOW_SECONDS,
+			frames / len(window),
+		)
+
+	def snapshot(self) -> Dict[str, Any]:
+		frames_per_second, detections_per_second, batch_size = self.rates(time.monotonic())
+		with self.lock:
+			return {
+				"batches": self.batches,
+				"frames": self.frames,
+				"detections": self.detections,
+				"timeouts": self.timeouts,
+				"failures": self.failures,
+				"frames_per_second": frames_per_second,
+				"detections_per_second": detections_per_second,
+				"avg_batch_size": batch_size,
+				"camera_latency_ms": {
+					camera: {"frames": count, "last": last * 1000, "avg": ema * 1000}
+					for camera, (count, last, ema) in self.camera_latency.items()
+				},
+			}
+
+	def collect(self):
+		frames_per_second, detections_per_second, batch_size = self.rates(time.monotonic())
+		with self.lock:
+			latency = dict(self.camera_latency)
+			totals = {
+				"batches": self.batches,
+				"frames": self.frames,
+				"detections": self.detections,
+				"timeouts": self.timeouts,
+				"failures": self.failures,
+			}
+		return [
+			(
+				"monkey_live_batch_items",
+				"counter",
+				"Live-pipeline batched inference totals.",
+				[("monkey_live_batch_items_total", {"kind": k}, v) for k, v in totals.items()],
+			),
+			(
+				"monkey_live_batch_rate",
+				"gauge",
+				f"Batched inference throughput over the last {STATS_WINDOW_SECONDS:.0f}s.",
+				[
+					("monkey_live_batch_rate", {"kind": "frames_per_second"}, frames_per_second),
+					("monkey_live_batch_rate", {"kind": "detections_per_second"}, detections_per_second),
+					("monkey_live_batch_rate", {"kind": "avg_batch_size"}, batch_size),
+				],
+			),
+			(
+				"monkey_live_batch_latency_seconds",
+				"gauge",
+				"Smoothed submit-to-result latency per camera.",
+				[
+					("monkey_live_batch_latency_seconds", {"camera": camera}, ema)
+					for camera, (_, _, ema) in latency.items()
+				],
+			),
+		]
+
+
+class BatchInferenceScheduler:
+	"""Runs the current frame from each live session through one batched forward pass.
+
+	A session blocks in `predict`, so it has at most one pending frame. When
+	more sessions are waiting than fit in a batch, the ones served least
+	recently go first, so a fast camera cannot crowd out slow ones. The
+	scheduler waits up to `max_wait` for every recently active session to
+	submit before running a partial batch.
+
+	With the detection cascade enabled, `predict_batch` runs the screen and
+	heavy models one image at a time, so there is no single forward pass and
+	batching only bounds how many frames are in flight.
+	"""
+
+	def __init__(
+		self,
+		inference: InferenceService,
+		input_size: int,
+		max_batch: int,
+		max_wait: float,
+	) -> None:
+		self.inference = inference
+		self.input_size = input_size
+		self.max_batch = max_batch
+		self.max_wait = max_wait
+		self.stats = SchedulerStats()
+		self._pending: Dict[str, _Request] = {}
+		self._last_seen: Dict[str, float] = {}
+		self._last_served: Dict[str, float] = {}
+		self._cond = threading.Condition()
+		self._thread = threading.Thread(target=self._run, name="live-batch", daemon=True)
+		self._thread.start()
+
+	def predict(
+		self, key: str, image: Image.Image, camera: str | None = None, timeout: float = 30.0
+	) -> List[Dict[str, Any]] | None:
+		"""Detections for `image`, or None if the batch failed or none arrived within `timeout`."""
+		request = _Request(key, camera or key, image, time.monotonic())
+		with self._cond:
+			self._pending[key] = request
+			self._last_seen[key] = request.submitted
+			self._cond.notify()
+		try:
+			return request.future.result(timeout)
+		except FutureTimeout:
+			# E.g. model warm-up: the caller skips this frame instead of failing.
+			with self._cond:
+				if self._pending.get(key) is request:
+					del self._pending[key]
+			with self.stats.lock:
+				self.stats.timeouts += 1
+			logger.warning("Batched inference for %s timed out after %.0fs", request.camera, timeout)
+			return None
+
+	def release(self, key: str) -> None:
+		with self._cond:
+			request = self._pending.pop(key, None)
+			self._last_seen.pop(key, None)
+			self._last_served.pop(key, None)
+		if request is not None:
+			request.future.set_result(None)
+
+	def _active(self, now: float) -> int:
+		return sum(1 for seen in self._last_seen.values() if now - seen <= ACTIVE_SECONDS)
+
+	def _take_batch(self) -> List[_Request]:
+		with self._cond:
+			while not self._pending:
+				self._cond.wait()
+			deadline = time.monotonic() + self.max_wait
+			while len(self._pending) < min(self._active(time.monotonic()), self.max_batch):
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					break
+				self._cond.wait(remaining)
+			now = time.monotonic()
+			chosen = sorted(
+				self._pending.values(), key=lambda r: self._last_served.get(r.key, 0.0)
+			)[: self.max_batch]
+			for request in chosen:
+				del self._pending[request.key]
+				self._last_served[request.key] = now
+		return chosen
+
+	def _run(self) -> None:
+		while True:
+			batch = self._take_batch()
+			started = time.monotonic()
+			for request in batch:
+				STAGE_SECONDS.labels("live", "batch_wait").observe(started - request.submitted)
+			try:
+				boxes = [letterbox(request.image, self.input_size) for request in batch]
+				results = self.inference.predict_batch([box.image for box in boxes])
+			except Exception as exc:
+				# One bad batch must not end every session in it: each skips the frame.
+				logger.warning("Batched inference failed for %d frames: %s", len(batch), exc)
+				with self.stats.lock:
+					self.stats.failures += len(batch)
+				for request in batch:
+					request.future.set_result(None)
+				continue
+			STAGE_SECONDS.labels("live", "batch_inference").observe(time.monotonic() - started)
+			counts = []
+			for request, box, found in zip(batch, boxes, results):
+				request.future.set_result(box.unmap(found, request.image.size))
+				counts.append(len(found))
+			self.stats.record(batch, counts, time.monotonic())
+
+
+@lru_cache
+def get_batch_scheduler() -> BatchInferenceScheduler:
+	settings = get_settings()
+	scheduler = BatchInferenceScheduler(
+		get_inference_service(),
+		settings.MODEL_INPUT_SIZE,
+		settings.LIVE_BATCH_MAX_SIZE,
+		settings.LIVE_BATCH_MAX_WAIT_MS / 1000,
+	)
+	REGISTRY.register_collector(scheduler.stats.collect)
+	return scheduler
@@ -1,12 +1,22 @@
 from typing import List
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.camera import Camera
-from app.repositories.camera_repo import CameraRepository
+from app.repositories.camera_repo import AsyncCameraRepository, CameraRepository
 from app.schemas.camera import CameraCreate, CameraUpdate
 
 
+def _camera_from_payload(payload: CameraCreate) -> Camera:
+	return Camera(
+		name=payload.name,
+		stream_url=payload.stream_url,
+		location=payload.location,
+		is_active=payload.is_active,
+	)
+
+
 class CameraService:
 	def __init__(self) -> None:
 		self.repo = CameraRepository()
@@ -18,13 +28,7 @@ class CameraService:
 		return self.repo.get(db, camera_id)
 
 	def create_camera(self, db: Session, payload: CameraCreate) -> Camera:
-		camera = Camera(
-			name=payload.name,
-			stream_url=payload.stream_url,
-			location=payload.location,
-			is_active=payload.is_active,
-		)
-		return self.repo.create(db, camera)
+		return self.repo.create(db, _camera_from_payload(payload))
 
 	def update_camera(
 		self, db: Session, camera: Camera, payload: CameraUpdate
@@ -35,3 +39,29 @@ class CameraService:
 
 	def delete_camera(self, db: Session, camera: Camera) -> None:
 		self.repo.delete(db, camera)
+
+
+class AsyncCameraService:
+	def __init__(self) -> None:
+		self.repo = AsyncCameraRepository()
+
+	async def list_cameras(
+		self, db: AsyncSession, skip: int = 0, limit: int = 100
+	) -> List[Camera]:
+		return await self.repo.list_all(db, skip=skip, limit=limit)
+
+	async def get_camera(self, db: AsyncSession, camera_id: int) -> Camera | None:
+		return await self.repo.get(db, camera_id)
+
+	async def create_camera(self, db: AsyncSession, payload: CameraCreate) -> Camera:
+		return await self.repo.create(db, _camera_from_payload(payload))
+
+	async def update_camera(
+		self, db: AsyncSession, camera: Camera, payload: CameraUpdate
+	) -> Camera:
+		for field, value in payload.model_dump(exclude_unset=True).items():
+			setattr(camera, field, value)
+		return await self.repo.update(db, camera)
+
+	async def delete_camera(self, db: AsyncSession, camera: Camera) -> None:
+		await self.repo.delete(db, camera)
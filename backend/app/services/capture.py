@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+try:
+	import cv2
+except Exception:  # pragma: no cover - optional dependency
+	cv2 = None
+
+logger = logging.getLogger(__name__)
+
+CONNECTING = "connecting"
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+OFFLINE = "offline"
+ENDED = "ended"
+STATES = (CONNECTING, CONNECTED, RECONNECTING, OFFLINE, ENDED)
+
+
+@dataclass
+class CameraHealth:
+	source: str
+	camera: str
+	state: str = CONNECTING
+	since: float = field(default_factory=time.time)
+	reconnects: int = 0
+	last_reconnect_seconds: float | None = None
+	last_frame_at: float | None = None
+	last_error: str | None = None
+
+	def as_dict(self) -> Dict[str, Any]:
+		return {
+			"camera": self.camera,
+			"source": self.source,
+			"state": self.state,
+			"since": self.since,
+			"reconnects": self.reconnects,
+			"last_reconnect_seconds": self.last_reconnect_seconds,
+			"last_frame_at": self.last_frame_at,
+			"last_error": self.last_error,
+		}
+
+
+# Records are keyed by capture source, not camera: ad-hoc URL streams all share
+# one camera key, and a stopping source must not remove another's record.
+class HealthRegistry:
+	def __init__(self) -> None:
+		self._records: Dict[str, CameraHealth] = {}
+		self._lock = threading.Lock()
+
+	def register(self, source: str, camera: str) -> None:
+		with self._lock:
+			self._records[source] = CameraHealth(source, camera)
+
+	def set_state(self, source: str, state: str, error: str | None = None) -> None:
+		with self._lock:
+			health = self._records.get(source)
+			if health is None:
+				return
+			if health.state != state:
+				health.state = state
+				health.since = time.time()
+			if error is not None:
+				health.last_error = error
+
+	def record_frame(self, source: str) -> None:
+		with self._lock:
+			health = self._records.get(source)
+			if health is not None:
+				health.last_frame_at = time.time()
+
+	def record_reconnect(self, source: str, seconds: float) -> None:
+		with self._lock:
+			health = self._records.get(source)
+			if health is not None:
+				health.reconnects += 1
+				health.last_reconnect_seconds = seconds
+
+	def remove(self, source: str) -> None:
+		with self._lock:
+			self._records.pop(source, None)
+
+	def snapshot(self, camera: str | None = None) -> List[Dict[str, Any]]:
+		with self._lock:
+			records = sorted(
+				(h for h in self._records.values() if camera is None or h.camera == camera),
+				key=lambda h: (h.camera, h.source),
+			)
+			return [h.as_dict() for h in records]
+
+	def collect(self):
+		with self._lock:
+			records = list(self._records.values())
+		return [
+			(
+				"monkey_camera_state",
+				"gauge",
+				"Capture state per camera (1 for the current state).",
+				[
+					(
+						"monkey_camera_state",
+						{"camera": h.camera, "source": h.source, "state": state},
+						1 if h.state == state else 0,
+					)
+					for h in records
+					for state in STATES
+				],
+			),
+			(
+				"monkey_camera_reconnects",
+				"counter",
+				"Successful capture reconnects per camera.",
+				[
+					("monkey_camera_reconnects_total", {"camera": h.camera, "source": h.source}, h.reconnects)
+					for h in records
+				],
+			),
+			(
+				"monkey_camera_reconnect_seconds",
+				"gauge",
+				"Time from stall detection to the first frame of the last reconnect.",
+				[
+					(
+						"monkey_camera_reconnect_seconds",
+						{"camera": h.camera, "source": h.source},
+						h.last_reconnect_seconds,
+					)
+					for h in records
+					if h.last_reconnect_seconds is not None
+				],
+			),
+		]
+
+
+CAMERA_HEALTH = HealthRegistry()
+REGISTRY.register_collector(CAMERA_HEALTH.collect)
+_SOURCE_IDS = itertools.count(1)
+
+
+@dataclass
+class CapturedFrame:
+	image: np.ndarray
+	captured_at: float
+	seq: int
+
+
+def open_capture(url: str, open_timeout: float, read_timeout: float):
+	params = [
+		cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+		cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000),
+	]
+	try:
+		return cv2.VideoCapture(url, cv2.CAP_FFMPEG, params)
+	except (TypeError, cv2.error):
+		# OpenCV builds without the params overload.
+		return cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+
+
+class CaptureSource:
+	"""Reads a stream on a background thread and keeps it alive across stalls.
+
+	A stall is declared when the stream timestamp (or, without one, the arrival
+	of frames) stops advancing for `stall_seconds`. The supervisor then opens a
+	new capture with exponential backoff and jitter while the old reader keeps
+	going; once the new capture has produced a frame it replaces the old one
+	(warm handoff) so consumers only ever see a gap, never an error. Files (no
+	URL scheme) end at EOF instead of reconnecting.
+	"""
+
+	def __init__(
+		self,
+		url: str,
+		camera: str,
+		stall_seconds: float | None = None,
+		backoff_initial: float | None = None,
+		backoff_max: float | None = None,
+		offline_after: float | None = None,
+		open_timeout: float | None = None,
+		opener: Callable[[str, float, float], Any] | None = None,
+		health: HealthRegistry = CAMERA_HEALTH,
+	) -> None:
+		settings = get_settings()
+		self.url = url
+		self.camera = camera
+		self.source = f"{camera}-{next(_SOURCE_IDS)}"
+		self.live = "://" in url
+		self.stall_seconds = stall_seconds or settings.CAPTURE_STALL_SECONDS
+		self.backoff_initial = backoff_initial or settings.CAPTURE_BACKOFF_INITIAL_SECONDS
+		self.backoff_max = backoff_max or settings.CAPTURE_BACKOFF_MAX_SECONDS
+		self.offline_after = offline_after or settings.CAPTURE_OFFLINE_AFTER_SECONDS
+		self.open_timeout = open_timeout or settings.CAPTURE_OPEN_TIMEOUT_SECONDS
+		self.opener = opener or open_capture
+		self.health = health
+		self._state = CONNECTING
+
+		self._cond = threading.Condition()
+		self._frame: CapturedFrame | None = None
+		self._seq = 0
+		self._generation = 0
+		self._progress_at = time.monotonic()
+		self._reader_failed = False
+		self._stop = threading.Event()
+		self._supervisor: threading.Thread | None = None
+
+	@property
+	def state(self) -> str:
+		return self._state
+
+	@property
+	def stopped(self) -> bool:
+		return self._stop.is_set()
+
+	def start(self) -> "CaptureSource":
+		self.health.register(self.source, self.camera)
+		self._set_state(CONNECTING)
+		self._supervisor = threading.Thread(
+			target=self._supervise, name=f"capture-{self.camera}", daemon=True
+		)
+		self._supervisor.start()
+		return self
+
+	def stop(self) -> None:
+		self._stop.set()
+		with self._cond:
+			self._cond.notify_all()
+		self.health.remove(self.source)
+
+	def _set_state(self, state: str, error: str | None = None) -> None:
+		self._state = state
+		self.health.set_state(self.source, state, error)
+
+	def read(self, after: int = 0, timeout: float = 1.0) -> CapturedFrame | None:
+		"""Newest frame with seq > after, or None on timeout or once stopped."""
+		deadline = time.monotonic() + timeout
+		with self._cond:
+			while self._frame is None or self._frame.seq <= after:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0 or self._stop.is_set():
+					return None
+				self._cond.wait(remaining)
+			return self._frame
+
+	def _open(self):
+		cap = self.opener(self.url, self.open_timeout, self.stall_seconds)
+		if cap is None or not cap.isOpened():
+			raise ConnectionError("failed to open stream")
+		ok, frame = cap.read()
+		if not ok or frame is None:
+			cap.release()
+			raise ConnectionError("stream opened but produced no frame")
+		return cap, frame
+
+	def _supervise(self) -> None:
+		stalled_at = time.monotonic()
+		attempt = 0
+		while not self._stop.is_set():
+			try:
+				cap, first = self._open()
+			except Exception as exc:
+				failing_for = time.monotonic() - stalled_at
+				state = RECONNECTING if self._generation else CONNECTING
+				if failing_for >= self.offline_after or (not self.live and self._generation == 0):
+					state = OFFLINE
+				self._set_state(state, error=str(exc))
+				if not self.live and self._generation == 0:
+					break
+				delay = min(self.backoff_max, self.backoff_initial * (2 ** attempt))
+				attempt += 1
+				# Equal jitter keeps at least half the delay while spreading retries
+				# from cameras that dropped together.
+				if self._stop.wait(delay / 2 + random.uniform(0, delay / 2)):
+					break
+				if self._generation and not self._stalled():
+					# The old capture recovered on its own while we were backing off.
+					self._set_state(CONNECTED)
+					stalled_at, attempt = self._wait_for_stall(), 0
+				continue
+
+			with self._cond:
+				self._generation += 1
+				generation = self._generation
+				self._reader_failed = False
+			self._publish(generation, first)
+			if generation > 1:
+				self.health.record_reconnect(self.source, time.monotonic() - stalled_at)
+			self._set_state(CONNECTED)
+			threading.Thread(
+				target=self._read_loop,
+				args=(cap, generation),
+				name=f"capture-{self.camera}-{generation}",
+				daemon=True,
+			).start()
+			stalled_at, attempt = self._wait_for_stall(), 0
+			if not self.live:
+				self._set_state(ENDED)
+				break
+		with self._cond:
+			self._generation += 1  # retire the current reader
+			self._cond.notify_all()
+		self._stop.set()
+
+	def _stalled(self) -> bool:
+		return self._reader_failed or time.monotonic() - self._progress_at > self.stall_seconds
+
+	def _wait_for_stall(self) -> float:
+		while not self._stop.wait(min(self.stall_seconds / 4, 0.5)):
+			if self._stalled():
+				if self.live:
+					self._set_state(RECONNECTING, error="stream stalled")
+					logger.warning("Stream for camera %s stalled; reconnecting", self.camera)
+				break
+		return time.monotonic()
+
+	def _read_loop(self, cap, generation: int) -> None:
+		last_pos = None
+		# Files play back at their own frame rate instead of decode speed.
+		fps = cap.get(cv2.CAP_PROP_FPS) if cv2 is not None and not self.live else 0.0
+		started, count = time.monotonic(), 0
+		try:
+			while not self._stop.is_set() and generation == self._generation:
+				ok, frame = cap.read()
+				if generation != self._generation:
+					break
+				if not ok or frame is None:
+					self._reader_failed = True
+					break
+				pos = cap.get(cv2.CAP_PROP_POS_MSEC) if cv2 is not None else 0.0
+				if not self.live:
+					offset = pos / 1000.0 if pos else (count / fps if fps > 0 else 0.0)
+					count += 1
+					delay = started + offset - time.monotonic()
+					if delay > 0 and self._stop.wait(delay):
+						break
+				self._publish(generation, frame, advanced=not pos or pos != last_pos)
+				last_pos = pos
+		except Exception as exc:
+			logger.warning("Capture reader for camera %s failed: %s", self.camera, exc)
+			self._reader_failed = True
+		finally:
+			cap.release()
+
+	def _publish(self, generation: int, image: np.ndarray, advanced: bool = True) -> None:
+		now = time.monotonic()
+		with self._cond:
+			if generation != self._generation:
+				return
+			if advanced:
+				self._progress_at = now
+			self._seq += 1
+			self._frame = CapturedFrame(image, time.perf_counter(), self._seq)
+			self._cond.notify_all()
+		self.health.record_frame(self.source)
@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+import logging
+import os
+from pathlib import Path
+import queue
+import struct
+import threading
+import time
+from typing import Callable, List, Sequence, Tuple
+import weakref
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY, STAGE_SECONDS
+from app.db.session import SessionLocal
+from app.repositories.event_repo import EventRepository
+
+try:
+	import cv2
+except Exception:  # pragma: no cover - optional dependency
+	cv2 = None
+
+logger = logging.getLogger(__name__)
+
+Frame = Tuple[float, bytes]
+
+
+# Global cap on bytes held by all ring buffers and collecting clips. Over
+# budget, the largest buffer gives up its oldest frame, so a busy camera cannot
+# starve a quiet one.
+class MemoryBudget:
+
+	def __init__(self, max_bytes: int) -> None:
+		self.max_bytes = max_bytes
+		self.used = 0
+		self.evictions = 0
+		self._buffers: weakref.WeakSet[FrameRingBuffer] = weakref.WeakSet()
+		self._lock = threading.Lock()
+
+	def attach(self, buffer: "FrameRingBuffer") -> None:
+		with self._lock:
+			self._buffers.add(buffer)
+
+	def add(self, size: int) -> None:
+		with self._lock:
+			self.used += size
+
+	def release(self, size: int) -> None:
+		with self._lock:
+			self.used -= size
+
+	def enforce(self) -> bool:
+		# Takes one buffer lock at a time; never called with a buffer lock held.
+		# False when evicting every buffered frame still leaves it over budget.
+		while self.used > self.max_bytes:
+			with self._lock:
+				buffers = sorted(self._buffers, key=lambda b: b.bytes, reverse=True)
+			if not buffers or not buffers[0].evict_oldest():
+				return False
+			with self._lock:
+				self.evictions += 1
+		return True
+
+	def collect(self):
+		with self._lock:
+			used, evictions = self.used, self.evictions
+			buffers = len(self._buffers)
+		return [
+			(
+				"monkey_clip_buffer_bytes",
+				"gauge",
+				"Encoded frames held in live pre-roll ring buffers and pending clips.",
+				[("monkey_clip_buffer_bytes", {}, used)],
+			),
+			(
+				"monkey_clip_buffers",
+				"gauge",
+				"Live sessions holding a pre-roll ring buffer.",
+				[("monkey_clip_buffers", {}, buffers)],
+			),
+			(
+				"monkey_clip_buffer_evictions",
+				"counter",
+				"Frames dropped to stay within the global ring buffer budget.",
+				[("monkey_clip_buffer_evictions_total", {}, evictions)],
+			),
+		]
+
+
+class FrameRingBuffer:
+
+	def __init__(self, seconds: float, max_bytes: int, budget: MemoryBudget | None = None) -> None:
+		self.seconds = seconds
+		self.max_bytes = max_bytes
+		self.budget = budget
+		self.bytes = 0
+		self._frames: deque[Frame] = deque()
+		self._lock = threading.Lock()
+		if budget is not None:
+			budget.attach(self)
+
+	def push(self, timestamp: float, jpeg: bytes) -> None:
+		with self._lock:
+			self._frames.append((timestamp, jpeg))
+			self._account(len(jpeg))
+			cutoff = timestamp - self.seconds
+			while len(self._frames) > 1 and (
+				self._frames[0][0] < cutoff or self.bytes > self.max_bytes
+			):
+				self._drop_oldest()
+		if self.budget is not None:
+			self.budget.enforce()
+
+	def frames_since(self, since: float) -> List[Frame]:
+		with self._lock:
+			return [frame for frame in self._frames if frame[0] >= since]
+
+	def evict_oldest(self) -> bool:
+		with self._lock:
+			if not self._frames:
+				return False
+			self._drop_oldest()
+			return True
+
+	def clear(self) -> None:
+		with self._lock:
+			while self._frames:
+				self._drop_oldest()
+
+	def __len__(self) -> int:
+		return len(self._frames)
+
+	def _account(self, size: int) -> None:
+		self.bytes += size
+		if self.budget is not None:
+			self.budget.add(size)
+
+	def _drop_oldest(self) -> None:
+		_, jpeg = self._frames.popleft()
+		self._account(-len(jpeg))
+
+
+@dataclass
+class PendingClip:
+	path: Path
+	started: float
+	until: float
+	frames: List[Frame] = field(default_factory=list)
+	budget: MemoryBudget | None = None
+	bytes: int = 0
+
+	def __post_init__(self) -> None:
+		self._account(sum(len(jpeg) for _, jpeg in self.frames))
+
+	def append(self, frame: Frame) -> None:
+		self.frames.append(frame)
+		self._account(len(frame[1]))
+
+	def release(self) -> None:
+		self._account(-self.bytes)
+
+	def _account(self, size: int) -> None:
+		self.bytes += size
+		if self.budget is not None:
+			self.budget.add(size)
+
+
+def jpeg_size(data: bytes) -> Tuple[int, int] | None:
+	# (width, height) from the first start-of-frame segment.
+	if data[:2] != b"\xff\xd8":
+		return None
+	i = 2
+	while i + 9 <= len(data):
+		if data[i] != 0xFF:
+			return None
+		marker = data[i + 1]
+		if marker == 0xFF:
+			i += 1
+			continue
+		if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+			height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+			return width, height
+		i += 2 + struct.unpack(">H", data[i + 2 : i + 4])[0]
+	return None
+
+
+def _chunk(fourcc: bytes, data: bytes) -> bytes:
+	return fourcc + struct.pack("<I", len(data)) + data + b"\0" * (len(data) % 2)
+
+
+def _list(fourcc: bytes, data: bytes) -> bytes:
+	return b"LIST" + struct.pack("<I", len(data) + 4) + fourcc + data
+
+
+def write_mjpeg_avi(path: Path, frames: Sequence[bytes], fps: float, width: int, height: int) -> None:
+	# Motion-JPEG AVI: the JPEGs are stored as-is, one '00dc' chunk per frame.
+	rate, largest = max(round(fps * 1000), 1), max(len(jpeg) for jpeg in frames)
+	avih = struct.pack(
+		"<14I", round(1_000_000 / fps), largest * rate // 1000, 0, 0x10,  # AVIF_HASINDEX
+		len(frames), 0, 1, largest, width, height, 0, 0, 0, 0,
+	)
+	strh = struct.pack(
+		"<4s4sIHHIIIIIIII4h", b"vids", b"MJPG", 0, 0, 0, 0, 1000, rate, 0,
+		len(frames), largest, 0xFFFFFFFF, 0, 0, 0, width, height,
+	)
+	strf = struct.pack("<IiiHH4sIiiII", 40, width, height, 1, 24, b"MJPG", width * height * 3, 0, 0, 0, 0)
+	hdrl = _list(b"hdrl", _chunk(b"avih", avih) + _list(b"strl", _chunk(b"strh", strh) + _chunk(b"strf", strf)))
+
+	index, offset = bytearray(), 4  # idx1 offsets count from the 'movi' fourcc
+	for jpeg in frames:
+		index += struct.pack("<4sIII", b"00dc", 0x10, offset, len(jpeg))  # AVIIF_KEYFRAME
+		offset += 8 + len(jpeg) + len(jpeg) % 2
+	idx1 = _chunk(b"idx1", bytes(index))
+	with open(path, "wb") as out:
+		out.write(b"RIFF" + struct.pack("<I", 4 + len(hdrl) + 8 + offset + len(idx1)) + b"AVI ")
+		out.write(hdrl)
+		out.write(b"LIST" + struct.pack("<I", offset) + b"movi")
+		for jpeg in frames:
+			out.write(_chunk(b"00dc", jpeg))
+		out.write(idx1)
+
+
+def _clear_clip_path(path: Path) -> None:
+	db = SessionLocal()
+	try:
+		EventRepository().clear_clip_path(db, str(path))
+	except Exception as exc:
+		logger.warning("Could not clear clip_path %s: %s", path.name, exc)
+	finally:
+		db.close()
+
+
+class ClipEncoder:
+
+	def __init__(
+		self,
+		queue_size: int = 8,
+		max_fps: float = 30.0,
+		on_lost: Callable[[Path], None] | None = None,
+	) -> None:
+		self.max_fps = max_fps
+		# Called with the path of a clip that will never be written.
+		self.on_lost = on_lost
+		self.written = 0
+		self.failed = 0
+		self.dropped = 0
+		self._queue: queue.Queue[PendingClip] = queue.Queue(maxsize=queue_size)
+		self._thread = threading.Thread(target=self._run, name="clip-encoder", daemon=True)
+		self._thread.start()
+
+	def submit(self, clip: PendingClip) -> bool:
+		if clip.frames:
+			try:
+				self._queue.put_nowait(clip)
+				return True
+			except queue.Full:
+				self.dropped += 1
+				logger.warning("Clip encoder queue full; dropping %s", clip.path.name)
+		clip.release()
+		self._lost(clip)
+		return False
+
+	def _lost(self, clip: PendingClip) -> None:
+		if self.on_lost is not None:
+			self.on_lost(clip.path)
+
+	def _run(self) -> None:
+		while True:
+			clip = self._queue.get()
+			started = time.perf_counter()
+			try:
+				self.write(clip)
+				self.written += 1
+			except Exception as exc:
+				self.failed += 1
+				logger.warning("Failed to write clip %s: %s", clip.path.name, exc)
+				self._lost(clip)
+			finally:
+				clip.release()
+			STAGE_SECONDS.labels("clip", "encode").observe(time.perf_counter() - started)
+
+	def write(self, clip: PendingClip) -> Path:
+		# Frames are muxed without decoding; ones whose size differs from the
+		# first (or that are not JPEGs) are skipped.
+		size = next((s for s in map(jpeg_size, (j for _, j in clip.frames)) if s), None)
+		frames = [(t, jpeg) for t, jpeg in clip.frames if jpeg_size(jpeg) == size]
+		if size is None or not frames:
+			raise ValueError("no decodable frames")
+		span = frames[-1][0] - frames[0][0]
+		fps = (len(frames) - 1) / span if span > 0 else 1.0
+		fps = min(max(fps, 1.0), self.max_fps)
+
+		partial = clip.path.with_name(clip.path.stem + ".partial" + clip.path.suffix)
+		write_mjpeg_avi(partial, [jpeg for _, jpeg in frames], fps, *size)
+		os.replace(partial, clip.path)
+		return clip.path
+
+	def collect(self):
+		return [
+			(
+				"monkey_clips",
+				"counter",
+				"Event clips by outcome.",
+				[
+					("monkey_clips_total", {"result": "written"}, self.written),
+					("monkey_clips_total", {"result": "failed"}, self.failed),
+					("monkey_clips_total", {"result": "dropped"}, self.dropped),
+				],
+			),
+			(
+				"monkey_clip_encoder_queue",
+				"gauge",
+				"Clips waiting for the background encoder.",
+				[("monkey_clip_encoder_queue", {}, self._queue.qsize())],
+			),
+		]
+
+
+class ClipRecorder:
+
+	def __init__(
+		self,
+		buffer: FrameRingBuffer,
+		encoder: ClipEncoder,
+		directory: Path,
+		pre_roll: float,
+		post_roll: float,
+		max_seconds: float,
+	) -> None:
+		self.buffer = buffer
+		self.encoder = encoder
+		self.directory = directory
+		self.pre_roll = pre_roll
+		self.post_roll = post_roll
+		self.max_seconds = max_seconds
+		self.budget = buffer.budget
+		self._pending: List[PendingClip] = []
+
+	def start_clip(self, name: str, now: float) -> Path:
+		# An event while a clip is still collecting extends it (up to max_seconds).
+		for clip in self._pending:
+			if clip.until > now and now - clip.started < self.max_seconds:
+				clip.until = min(now + self.post_roll, clip.started + self.max_seconds)
+				return clip.path
+		clip = PendingClip(
+			path=self.directory / f"{name}.avi",
+			started=now - self.pre_roll,
+			until=now + self.post_roll,
+			frames=self.buffer.frames_since(now - self.pre_roll),
+			budget=self.budget,
+		)
+		self._pending.append(clip)
+		return clip.path
+
+	@property
+	def wants_frames(self) -> bool:
+		# Without pre-roll, frames are only needed while a clip is collecting.
+		return self.pre_roll > 0 or bool(self._pending)
+
+	def push(self, timestamp: float, jpeg: bytes) -> None:
+		if self.pre_roll > 0:
+			self.buffer.push(timestamp, jpeg)
+		if not self._pending:
+			return
+		for clip in self._pending:
+			clip.append((timestamp, jpeg))
+		# Collecting clips cannot give frames back: if evicting pre-roll is not
+		# enough to stay within the budget, they end here.
+		over_budget = self.budget is not None and not self.budget.enforce()
+		remaining = []
+		for clip in self._pending:
+			if over_budget or timestamp >= clip.until:
+				self.encoder.submit(clip)
+			else:
+				remaining.append(clip)
+		self._pending = remaining
+
+	def close(self) -> None:
+		# Clips cut short by the session ending are written with what they have.
+		for clip in self._pending:
+			self.encoder.submit(clip)
+		self._pending = []
+		self.buffer.clear()
+
+
+@lru_cache
+def get_clip_budget() -> MemoryBudget:
+	budget = MemoryBudget(get_settings().CLIP_BUFFER_MAX_BYTES)
+	REGISTRY.register_collector(budget.collect)
+	return budget
+
+
+@lru_cache
+def get_clip_encoder() -> ClipEncoder:
+	encoder = ClipEncoder(get_settings().CLIP_ENCODER_QUEUE, on_lost=_clear_clip_path)
+	REGISTRY.register_collector(encoder.collect)
+	return encoder
+
+
+def create_clip_recorder(directory: Path) -> ClipRecorder | None:
+	settings = get_settings()
+	if not settings.CLIPS_ENABLED or cv2 is None:
+		return None
+	buffer = FrameRingBuffer(
+		settings.CLIP_PRE_ROLL_SECONDS,
+		settings.CLIP_BUFFER_MAX_BYTES_PER_CAMERA,
+		get_clip_budget(),
+	)
+	return ClipRecorder(
+		buffer,
+		get_clip_encoder(),
+		directory,
+		settings.CLIP_PRE_ROLL_SECONDS,
+		settings.CLIP_POST_ROLL_SECONDS,
+		settings.CLIP_MAX_SECONDS,
+	)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+from functools import lru_cache
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable
+
+from app.core.config import get_settings
+
+try:
+	import redis
+	import redis.asyncio as redis_asyncio
+except Exception:  # pragma: no cover - optional dependency
+	redis = None
+	redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "detections:"
+
+
+def camera_key(camera_id: int | None) -> str:
+	return str(camera_id) if camera_id is not None else "adhoc"
+
+
+def build_message(
+	camera_id: int | None,
+	detections: Iterable[Dict[str, Any]],
+	events: Iterable[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+	return {
+		"camera_id": camera_id,
+		"ts": time.time(),
+		"detections": [
+			{
+				"label": d.get("label"),
+				"confidence": round(float(d.get("confidence", 0.0)), 4),
+				"bbox": [round(float(v), 1) for v in d.get("bbox", [])],
+				"track_id": d.get("track_id"),
+			}
+			for d in detections
+		],
+		"events": [
+			{
+				"event": e.get("event"),
+				"label": e.get("label"),
+				"track_id": e.get("track_id"),
+				"dwell_seconds": e.get("dwell_seconds"),
+			}
+			for e in events
+		],
+	}
+
+
+class InMemoryDetectionBus:
+	def __init__(self, queue_size: int = 100) -> None:
+		self.queue_size = queue_size
+		self._subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Queue, set[str] | None]] = []
+		self._lock = threading.Lock()
+
+	def publish(self, camera_id: int | None, message: Dict[str, Any]) -> None:
+		key = camera_key(camera_id)
+		with self._lock:
+			subscribers = list(self._subscribers)
+		for loop, queue, keys in subscribers:
+			if keys is not None and key not in keys:
+				continue
+			try:
+				loop.call_soon_threadsafe(offer_latest, queue, message)
+			except RuntimeError:
+				pass  # Subscriber's loop already closed.
+
+	async def publish_async(self, camera_id: int | None, message: Dict[str, Any]) -> None:
+		self.publish(camera_id, message)
+
+	async def subscribe(
+		self, camera_ids: Iterable[int] | None = None, heartbeat: float = 15.0
+	) -> AsyncIterator[Dict[str, Any] | None]:
+		keys = {camera_key(c) for c in camera_ids} if camera_ids else None
+		queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+		entry = (asyncio.get_running_loop(), queue, keys)
+		with self._lock:
+			self._subscribers.append(entry)
+		try:
+			while True:
+				try:
+					yield await asyncio.wait_for(queue.get(), timeout=heartbeat)
+				except asyncio.TimeoutError:
+					yield None
+		finally:
+			with self._lock:
+				self._subscribers.remove(entry)
+
+
+def offer_latest(queue: asyncio.Queue, message: Any) -> None:
+	# Slow subscribers lose their oldest messages rather than blocking producers.
+	if queue.full():
+		try:
+			queue.get_nowait()
+		except asyncio.QueueEmpty:
+			pass
+	queue.put_nowait(message)
+
+
+class RedisDetectionBus:
+	def __init__(self, url: str = "", client: Any = None, async_client: Any = None) -> None:
+		self.url = url
+		self.client = client if client is not None else redis.Redis.from_url(url)
+		self._async_client = async_client
+
+	def _get_async_client(self) -> Any:
+		if self._async_client is None:
+			self._async_client = redis_asyncio.Redis.from_url(self.url)
+		return self._async_client
+
+	def publish(self, camera_id: int | None, message: Dict[str, Any]) -> None:
+		# Blocking client: for worker threads (live sessions), never the event loop.
+		try:
+			self.client.publish(CHANNEL_PREFIX + camera_key(camera_id), json.dumps(message))
+		except Exception as exc:
+			logger.warning("Failed to publish detections: %s", exc)
+
+	async def publish_async(self, camera_id: int | None, message: Dict[str, Any]) -> None:
+		try:
+			await self._get_async_client().publish(
+				CHANNEL_PREFIX + camera_key(camera_id), json.dumps(message)
+			)
+		except Exception as exc:
+			logger.warning("Failed to publish detections: %s", exc)
+
+	async def subscribe(
+		self, camera_ids: Iterable[int] | None = None, heartbeat: float = 15.0
+	) -> AsyncIterator[Dict[str, Any] | None]:
+		pubsub = self._get_async_client().pubsub(ignore_subscribe_messages=True)
+		if camera_ids:
+			await pubsub.subscribe(*(CHANNEL_PREFIX + camera_key(c) for c in camera_ids))
+		else:
+			await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+		try:
+			idle_since = time.monotonic()
+			while True:
+				message = await pubsub.get_message(timeout=1.0)
+				if message is None or message.get("type") not in ("message", "pmessage"):
+					if time.monotonic() - idle_since >= heartbeat:
+						idle_since = time.monotonic()
+						yield None
+					continue
+				idle_since = time.monotonic()
+				yield json.loads(message["data"])
+		finally:
+			await pubsub.reset()
+
+
+DetectionBus = InMemoryDetectionBus | RedisDetectionBus
+
+
+@lru_cache
+def get_detection_bus() -> DetectionBus:
+	settings = get_settings()
+	if settings.REDIS_URL and redis is not None:
+		return RedisDetectionBus(settings.REDIS_URL)
+	return InMemoryDetectionBus()
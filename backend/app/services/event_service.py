@@ -1,16 +1,80 @@
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Tuple
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
+from app.core.metrics import EVENTS_WRITTEN
 from app.models.event import Event
-from app.repositories.event_repo import EventRepository
+from app.repositories.event_repo import AsyncEventRepository, EventRepository
 from app.schemas.event import EventCreate
+from app.services.heatmap_service import AsyncHeatmapService, HeatmapService, naive_local
+from app.services.recent_events import (
+	counts_from_rows,
+	empty_counts,
+	get_recent_events_index,
+	merge_counts,
+)
+
+
+def _event_from_payload(payload: EventCreate) -> Event:
+	now = datetime.now()
+	return Event(
+		camera_id=payload.camera_id,
+		user_id=payload.user_id,
+		label=payload.label,
+		confidence=payload.confidence,
+		image_path=payload.image_path,
+		clip_path=payload.clip_path,
+		payload=payload.payload,
+		occurred_at=now,
+	)
+
+
+def _events_from_detections(
+	camera_id: int | None,
+	user_id: int | None,
+	detections: List[Dict[str, Any]],
+	occurred_at: datetime | None = None,
+) -> List[Event]:
+	now = occurred_at or datetime.now()
+	return [
+		Event(
+			camera_id=camera_id,
+			user_id=user_id,
+			label=det["label"],
+			confidence=float(det["confidence"]),
+			clip_path=det.get("clip_path"),
+			payload={
+				key: value
+				for key, value in det.items()
+				if key not in ("label", "confidence", "clip_path")
+			},
+			occurred_at=now,
+		)
+		for det in detections
+	]
+
+
+def _metric_label(label: str) -> str:
+	# POST /events accepts any label; only configured DETECTION_LABELS get their
+	# own series (without any, every label counts as "other"). Never loads the model.
+	configured = get_settings().DETECTION_LABELS
+	return label if label in {c.lower() for c in configured} else "other"
+
+
+def _count_written(events: List[Event]) -> List[Event]:
+	for event in events:
+		EVENTS_WRITTEN.labels(_metric_label(event.label)).inc()
+	return events
 
 
 class EventService:
 	def __init__(self) -> None:
 		self.repo = EventRepository()
+		self.heatmaps = HeatmapService()
+		self.recent = get_recent_events_index()
 
 	def list_events(self, db: Session, skip: int = 0, limit: int = 100) -> List[Event]:
 		return self.repo.list_all(db, skip=skip, limit=limit)
@@ -21,17 +85,10 @@ class EventService:
 		return self.repo.list_by_camera(db, camera_id, skip=skip, limit=limit)
 
 	def create_event(self, db: Session, payload: EventCreate) -> Event:
-		now = datetime.now()
-		event = Event(
-			camera_id=payload.camera_id,
-			user_id=payload.user_id,
-			label=payload.label,
-			confidence=payload.confidence,
-			image_path=payload.image_path,
-			payload=payload.payload,
-			occurred_at=now,
-		)
-		return self.repo.create(db, event)
+		event = self.repo.create(db, _event_from_payload(payload))
+		self.recent.add([event])
+		self.heatmaps.record([event])
+		return _count_written([event])[0]
 
 	def create_events_from_detections(
 		self,
@@ -39,17 +96,99 @@ class EventService:
 		camera_id: int | None,
 		user_id: int | None,
 		detections: List[Dict[str, Any]],
+		occurred_at: datetime | None = None,
 	) -> List[Event]:
-		now = datetime.now()
+		events = _events_from_detections(camera_id, user_id, detections, occurred_at)
+		events = self.repo.create_many(db, events)
+		self.recent.add(events)
+		self.heatmaps.record(events)
+		return _count_written(events)
+
+	def bulk_create_events(
+		self,
+		db: Session,
+		camera_id: int | None,
+		batches: Iterable[Tuple[datetime, List[Dict[str, Any]]]],
+	) -> int:
+		# Offline ingestion: one commit, no per-row refresh.
 		events = [
-			Event(
-				camera_id=camera_id,
-				user_id=user_id,
-				label=det["label"],
-				confidence=float(det["confidence"]),
-				payload={"bbox": det["bbox"]},
-				occurred_at=now,
-			)
-			for det in detections
+			event
+			for occurred_at, detections in batches
+			for event in _events_from_detections(camera_id, None, detections, occurred_at)
 		]
-		return self.repo.create_many(db, events)
+		if not events:
+			return 0
+		events = self.repo.insert_many(db, events)
+		self.recent.add(events)
+		self.heatmaps.record(events)
+		return len(_count_written(events))
+
+
+class AsyncEventService:
+	def __init__(self) -> None:
+		self.repo = AsyncEventRepository()
+		self.heatmaps = AsyncHeatmapService()
+		self.recent = get_recent_events_index()
+
+	async def list_events(
+		self, db: AsyncSession, skip: int = 0, limit: int = 100
+	) -> List[Event]:
+		return await self.repo.list_all(db, skip=skip, limit=limit)
+
+	async def list_events_by_camera(
+		self, db: AsyncSession, camera_id: int, skip: int = 0, limit: int = 100
+	) -> List[Event]:
+		return await self.repo.list_by_camera(db, camera_id, skip=skip, limit=limit)
+
+	async def create_event(self, db: AsyncSession, payload: EventCreate) -> Event:
+		event = await self.repo.create(db, _event_from_payload(payload))
+		self.recent.add([event])
+		await self.heatmaps.record([event])
+		return _count_written([event])[0]
+
+	async def create_events_from_detections(
+		self,
+		db: AsyncSession,
+		camera_id: int | None,
+		user_id: int | None,
+		detections: List[Dict[str, Any]],
+		occurred_at: datetime | None = None,
+	) -> List[Event]:
+		events = _events_from_detections(camera_id, user_id, detections, occurred_at)
+		events = await self.repo.create_many(db, events)
+		self.recent.add(events)
+		await self.heatmaps.record(events)
+		return _count_written(events)
+
+	async def count_events(
+		self,
+		db: AsyncSession,
+		since: datetime,
+		until: datetime,
+		camera_id: int | None = None,
+		label: str | None = None,
+		min_confidence: float = 0.0,
+	) -> Dict[str, Any]:
+		since, until = naive_local(since), naive_local(until)
+		# The recent-events index answers from its covered start onwards; the
+		# database only counts the older part of the range.
+		settings = get_settings()
+		split, counts, source = until, None, "db"
+		covered = self.recent.covered_since if settings.RECENT_EVENTS_ENABLED else None
+		if covered is not None and covered < until:
+			split = max(since, covered)
+			counts = self.recent.count(split, until, camera_id, label, min_confidence)
+		if counts is None:
+			split, counts = until, empty_counts()
+		else:
+			source = "index"
+		if since < split:
+			rows = await self.repo.count_in_range(db, since, split, camera_id, label, min_confidence)
+			counts = merge_counts(counts, counts_from_rows(rows))
+			source = "index+db" if source == "index" else "db"
+		return {
+			"since": since,
+			"until": until,
+			"source": source,
+			**counts,
+		}
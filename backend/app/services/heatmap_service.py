@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.event import Event
+from app.models.heatmap import EventHeatmap
+from app.repositories.event_repo import AsyncEventRepository
+from app.repositories.heatmap_repo import AsyncHeatmapRepository, HeatmapRepository
+
+logger = logging.getLogger(__name__)
+
+BucketKey = Tuple[int, str, datetime]
+
+
+def floor_hour(value: datetime) -> datetime:
+	return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+	floored = floor_hour(value)
+	return floored if floored == value else floored + timedelta(hours=1)
+
+
+def naive_local(value: datetime | None) -> datetime | None:
+	# Events are stored with naive local timestamps (datetime.now()).
+	if value is None or value.tzinfo is None:
+		return value
+	return value.astimezone().replace(tzinfo=None)
+
+
+def _numbers(value: Any, count: int) -> List[float] | None:
+	# Payloads are client-supplied JSON: exactly `count` finite numbers or None.
+	if not isinstance(value, (list, tuple)) or len(value) != count:
+		return None
+	if not all(isinstance(n, (int, float)) and not isinstance(n, bool) for n in value):
+		return None
+	if not all(math.isfinite(n) for n in value):
+		return None
+	return [float(n) for n in value]
+
+
+def normalized_boxes(events: Iterable[Event]) -> Tuple[List[Event], np.ndarray]:
+	"""Events whose payload has a valid bbox and frame_size, with boxes scaled to 0..1."""
+	kept: List[Event] = []
+	rows: List[List[float]] = []
+	for event in events:
+		payload = event.payload if isinstance(event.payload, dict) else {}
+		bbox, size = _numbers(payload.get("bbox"), 4), _numbers(payload.get("frame_size"), 2)
+		if bbox is None or size is None or size[0] <= 0 or size[1] <= 0:
+			continue
+		kept.append(event)
+		rows.append([*bbox, *size])
+	if not rows:
+		return kept, np.zeros((0, 4))
+	data = np.asarray(rows, dtype=np.float64)
+	return kept, data[:, :4] / np.concatenate([data[:, 4:6], data[:, 4:6]], axis=1)
+
+
+def accumulate_boxes(
+	boxes: np.ndarray, groups: np.ndarray, group_count: int, rows: int, cols: int
+) -> np.ndarray:
+	"""Per-group count of boxes covering each grid cell.
+
+	Each box adds +1/-1 at its four corners of a 2D difference array (np.add.at,
+	so repeated corners accumulate); two cumulative sums turn that into coverage.
+	Cost is O(boxes + cells) regardless of box size.
+	"""
+	diff = np.zeros((group_count, rows + 1, cols + 1), dtype=np.int32)
+	if len(boxes):
+		b = np.clip(boxes, 0.0, 1.0)
+		x1 = np.minimum(np.floor(b[:, 0] * cols).astype(np.intp), cols - 1)
+		y1 = np.minimum(np.floor(b[:, 1] * rows).astype(np.intp), rows - 1)
+		x2 = np.clip(np.ceil(b[:, 2] * cols).astype(np.intp), x1 + 1, cols)
+		y2 = np.clip(np.ceil(b[:, 3] * rows).astype(np.intp), y1 + 1, rows)
+		np.add.at(diff, (groups, y1, x1), 1)
+		np.add.at(diff, (groups, y1, x2), -1)
+		np.add.at(diff, (groups, y2, x1), -1)
+		np.add.at(diff, (groups, y2, x2), 1)
+	return diff.cumsum(axis=1).cumsum(axis=2)[:, :rows, :cols]
+
+
+def bucket_grids(events: Iterable[Event], size: int) -> Dict[BucketKey, Tuple[np.ndarray, int]]:
+	kept, boxes = normalized_boxes(e for e in events if e.camera_id is not None)
+	keys: Dict[BucketKey, int] = {}
+	groups = np.fromiter(
+		(
+			keys.setdefault(
+				(e.camera_id, e.label, floor_hour(naive_local(e.occurred_at) or datetime.now())),
+				len(keys),
+			)
+			for e in kept
+		),
+		dtype=np.intp,
+		count=len(kept),
+	)
+	grids = accumulate_boxes(boxes, groups, len(keys), size, size)
+	totals = np.bincount(groups, minlength=len(keys))
+	return {key: (grids[index], int(totals[index])) for key, index in keys.items()}
+
+
+def _merge(bucket: EventHeatmap | None, key: BucketKey, grid: np.ndarray, count: int) -> EventHeatmap:
+	if bucket is None:
+		camera_id, label, hour = key
+		return EventHeatmap(
+			camera_id=camera_id,
+			label=label,
+			hour=hour,
+			rows=grid.shape[0],
+			cols=grid.shape[1],
+			counts=grid.astype(np.int32).tobytes(),
+			events=count,
+		)
+	current = np.frombuffer(bucket.counts, dtype=np.int32).reshape(bucket.rows, bucket.cols)
+	bucket.counts = (current + grid).astype(np.int32).tobytes()
+	bucket.events = (bucket.events or 0) + count
+	return bucket
+
+
+# Bucket updates read the stored grid, add to it and write it back. Row locks
+# (FOR UPDATE) are a no-op on SQLite, so updates from this process are
+# serialized here and SQLite transactions start with BEGIN IMMEDIATE to also
+# exclude other processes (the batch CLI) for the read-modify-write.
+_record_lock = threading.Lock()
+
+
+class HeatmapService:
+	"""Folds newly written events into the hourly grids.
+
+	Runs in its own session so a failed or retried update never expires the
+	caller's freshly written events.
+	"""
+
+	def __init__(self) -> None:
+		self.repo = HeatmapRepository()
+
+	def record(self, events: List[Event]) -> None:
+		settings = get_settings()
+		if not settings.HEATMAP_ENABLED:
+			return
+		try:
+			grids = bucket_grids(events, settings.HEATMAP_GRID_SIZE)
+		except Exception as exc:
+			# The events are already committed; a bad payload must not fail the write.
+			logger.warning("Heatmap binning failed: %s", exc)
+			return
+		if not grids:
+			return
+		with _record_lock:
+			db = SessionLocal()
+			try:
+				# A concurrent writer (another process, on servers with real row
+				# locks) creating the same bucket loses the unique-key race once;
+				# the retry then finds and updates its row.
+				for attempt in range(2):
+					try:
+						self._merge_all(db, grids)
+						return
+					except IntegrityError as exc:
+						db.rollback()
+						if attempt:
+							logger.warning("Heatmap update lost %d buckets: %s", len(grids), exc)
+			except Exception as exc:
+				db.rollback()
+				logger.warning("Heatmap update failed: %s", exc)
+			finally:
+				db.close()
+
+	def _merge_all(self, db: Session, grids: Dict[BucketKey, Tuple[np.ndarray, int]]) -> None:
+		if db.get_bind().dialect.name == "sqlite":
+			db.execute(text("BEGIN IMMEDIATE"))
+		for key, (grid, count) in grids.items():
+			bucket = self.repo.get_for_update(db, *key)
+			merged = _merge(bucket, key, grid, count)
+			if bucket is None:
+				self.repo.add(db, merged)
+		db.commit()
+
+
+class AsyncHeatmapService:
+	def __init__(self) -> None:
+		self.repo = AsyncHeatmapRepository()
+		self.event_repo = AsyncEventRepository()
+		self.writer = HeatmapService()
+
+	async def record(self, events: List[Event]) -> None:
+		# Same serialized path as the sync service, off the event loop.
+		await run_in_threadpool(self.writer.record, events)
+
+	async def get_heatmap(
+		self,
+		db: AsyncSession,
+		camera_id: int,
+		resolution: int,
+		labels: List[str] | None = None,
+		start: datetime | None = None,
+		end: datetime | None = None,
+	) -> Dict[str, Any]:
+		size = get_settings().HEATMAP_GRID_SIZE
+		labels = [label.lower() for label in labels] if labels else None
+		start, end = naive_local(start), naive_local(end)
+
+		# Whole hours inside the range come from the stored buckets; the partial
+		# hours at either edge are binned from raw events.
+		full_start = ceil_hour(start) if start is not None else None
+		full_end = floor_hour(end) if end is not None else None
+		raw_ranges: List[Tuple[datetime, datetime]] = []
+		buckets: List[EventHeatmap] = []
+		if full_start is not None and full_end is not None and full_start >= full_end:
+			raw_ranges.append((start, end))
+		else:
+			buckets = await self.repo.list_buckets(db, camera_id, labels, full_start, full_end)
+			if start is not None and start < full_start:
+				raw_ranges.append((start, full_start))
+			if end is not None and full_end < end:
+				raw_ranges.append((full_end, end))
+
+		grid = np.zeros((size, size), dtype=np.int64)
+		events = 0
+		for bucket in buckets:
+			if bucket.rows != size or bucket.cols != size:
+				continue  # written with a different HEATMAP_GRID_SIZE
+			grid += np.frombuffer(bucket.counts, dtype=np.int32).reshape(size, size)
+			events += bucket.events or 0
+		for range_start, range_end in raw_ranges:
+			raw = await self.event_repo.list_in_range(db, camera_id, range_start, range_end, labels)
+			kept, boxes = normalized_boxes(raw)
+			grid += accumulate_boxes(boxes, np.zeros(len(kept), dtype=np.intp), 1, size, size)[0]
+			events += len(kept)
+
+		factor = size // resolution
+		grid = grid.reshape(resolution, factor, resolution, factor).sum(axis=(1, 3))
+		return {
+			"camera_id": camera_id,
+			"rows": resolution,
+			"cols": resolution,
+			"labels": labels,
+			"start": start,
+			"end": end,
+			"events": events,
+			"max": int(grid.max()) if grid.size else 0,
+			"grid": grid.tolist(),
+		}
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from io import BytesIO
+import math
+from typing import Any, Dict, List
+
+from PIL import Image
+
+
+class ImageTooLarge(ValueError):
+	pass
+
+
+@dataclass
+class DecodedImage:
+	image: Image.Image
+	original_size: tuple[int, int]
+	scale_x: float = 1.0
+	scale_y: float = 1.0
+
+
+def decode_image(data: bytes, target_size: int = 0, max_pixels: int = 0) -> DecodedImage:
+	# Image.open only parses the header, so the size check runs before any pixel
+	# data is decoded.
+	try:
+		image = Image.open(BytesIO(data))
+	except Image.DecompressionBombError as exc:
+		raise ImageTooLarge(str(exc)) from exc
+	width, height = image.size
+	if max_pixels and width * height > max_pixels:
+		raise ImageTooLarge(f"Image is {width}x{height}, limit is {max_pixels} pixels")
+
+	if image.format == "JPEG" and target_size:
+		ratio = target_size / max(width, height)
+		if ratio < 1:
+			# JPEG DCT scaling: decode at the smallest 1/2, 1/4 or 1/8 size that is
+			# still at least the model input size.
+			image.draft("RGB", (math.ceil(width * ratio), math.ceil(height * ratio)))
+
+	decoded = image.convert("RGB")
+	return DecodedImage(
+		image=decoded,
+		original_size=(width, height),
+		scale_x=width / decoded.width,
+		scale_y=height / decoded.height,
+	)
+
+
+def scale_detections(
+	detections: List[Dict[str, Any]], scale_x: float, scale_y: float
+) -> List[Dict[str, Any]]:
+	if scale_x == 1.0 and scale_y == 1.0:
+		return detections
+	for detection in detections:
+		x1, y1, x2, y2 = detection["bbox"]
+		detection["bbox"] = [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y]
+		if "frame_size" in detection:
+			width, height = detection["frame_size"]
+			detection["frame_size"] = [round(width * scale_x), round(height * scale_y)]
+	return detections
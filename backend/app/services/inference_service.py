@@ -1,49 +1,350 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from functools import lru_cache
+import hashlib
+import os
+import threading
+import time
 from typing import Any, Dict, List
 
+import numpy as np
 from PIL import Image
-from ultralytics import YOLO
+
+try:
+	from ultralytics import YOLO
+except Exception:  # pragma: no cover - optional with INFERENCE_BACKEND=stub
+	YOLO = None
 
 from app.core.config import get_settings
+from app.core.metrics import MODEL_LOAD_SECONDS, REGISTRY
+
+
+@dataclass
+class CascadeStats:
+	frames: int = 0
+	screen_hits: int = 0
+	heavy_runs: int = 0
+	heavy_hits: int = 0
+	heavy_crops: int = 0
+	screen_seconds: float = 0.0
+	heavy_seconds: float = 0.0
+	saved_seconds: float = 0.0
+	full_heavy_seconds: float = 0.0
+	lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+	def collect(self):
+		with self.lock:
+			values = {
+				"frames": self.frames,
+				"screen_hits": self.screen_hits,
+				"heavy_runs": self.heavy_runs,
+				"heavy_hits": self.heavy_hits,
+			}
+			saved = self.saved_seconds
+		return [
+			(
+				"monkey_cascade_stage",
+				"counter",
+				"Detector cascade frames, screener hits and heavy-model runs.",
+				[
+					("monkey_cascade_stage_total", {"stage": key}, value)
+					for key, value in values.items()
+				],
+			),
+			(
+				"monkey_cascade_saved_seconds",
+				"gauge",
+				"Estimated heavy-model compute saved by the cascade.",
+				[("monkey_cascade_saved_seconds", {}, saved)],
+			),
+		]
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self.lock:
+			frames = self.frames
+			return {
+				"frames": frames,
+				"screen_hits": self.screen_hits,
+				"screen_hit_rate": self.screen_hits / frames if frames else 0.0,
+				"heavy_runs": self.heavy_runs,
+				"heavy_run_rate": self.heavy_runs / frames if frames else 0.0,
+				"heavy_hits": self.heavy_hits,
+				"heavy_hit_rate": self.heavy_hits / self.heavy_runs if self.heavy_runs else 0.0,
+				"heavy_crops": self.heavy_crops,
+				"screen_ms_total": self.screen_seconds * 1000,
+				"heavy_ms_total": self.heavy_seconds * 1000,
+				"full_heavy_ms_estimate": self.full_heavy_seconds * 1000,
+				"saved_ms_total": self.saved_seconds * 1000,
+			}
+
+
+class _StubResult:
+	def __init__(self, names: Dict[int, str], boxes: list) -> None:
+		self.names = names
+		self.boxes = boxes
+
+
+class _StubBox:
+	def __init__(self, cls_id: int, confidence: float, xyxy: List[float]) -> None:
+		self.cls = np.array([cls_id])
+		self.conf = np.array([confidence])
+		self.xyxy = np.array([xyxy])
+
+
+class StubModel:
+	# Deterministic stand-in for a YOLO model so benchmarks don't depend on
+	# best.pt: detections are derived from the image contents and each call
+	# costs a fixed amount of time.
+	def __init__(self, model_path: str, latency_ms: float = 0.0, labels: List[str] | None = None) -> None:
+		self.model_path = model_path
+		self.latency_ms = latency_ms
+		self.names = dict(enumerate(labels or ["person"]))
+
+	def predict(self, source: Any, verbose: bool = False) -> List[_StubResult]:
+		images = source if isinstance(source, list) else [source]
+		results = []
+		for image in images:
+			pixels = np.asarray(image.convert("L").resize((32, 32)), dtype=np.uint32)
+			seed = int(pixels.sum())
+			width, height = image.size
+			boxes = []
+			for index in range(seed % 3):
+				cls_id = (seed + index) % len(self.names)
+				x1 = (seed * (index + 3)) % max(width // 2, 1)
+				y1 = (seed * (index + 7)) % max(height // 2, 1)
+				boxes.append(
+					_StubBox(
+						cls_id,
+						0.5 + (seed % 50) / 100,
+						[float(x1), float(y1), float(x1 + width // 4), float(y1 + height // 4)],
+					)
+				)
+			results.append(_StubResult(self.names, boxes))
+		if self.latency_ms:
+			time.sleep(self.latency_ms * len(images) / 1000)
+		return results
+
+
+def load_model(model_path: str):
+	settings = get_settings()
+	if settings.INFERENCE_BACKEND.lower() == "stub":
+		return StubModel(model_path, settings.STUB_INFERENCE_MS, settings.DETECTION_LABELS)
+	return YOLO(model_path)
+
+
+def _with_frame_size(
+	detections: List[Dict[str, Any]], size: tuple[int, int]
+) -> List[Dict[str, Any]]:
+	# Stored in event payloads so boxes can be normalised (e.g. for heatmaps).
+	for detection in detections:
+		detection["frame_size"] = [size[0], size[1]]
+	return detections
 
 
 class InferenceService:
 	def __init__(self, model_path: str) -> None:
-		self.model = YOLO(model_path)
-		self.allowed_labels = {label.lower() for label in get_settings().DETECTION_LABELS}
+		settings = get_settings()
+		started = time.perf_counter()
+		self.model = load_model(model_path)
+		MODEL_LOAD_SECONDS.labels("heavy").set(time.perf_counter() - started)
+		self.allowed_labels = {label.lower() for label in settings.DETECTION_LABELS}
+
+		self.screen_model = None
+		if settings.CASCADE_SCREEN_MODEL_PATH:
+			started = time.perf_counter()
+			self.screen_model = load_model(settings.CASCADE_SCREEN_MODEL_PATH)
+			MODEL_LOAD_SECONDS.labels("screen").set(time.perf_counter() - started)
+		self.screen_confidence = settings.CASCADE_SCREEN_CONFIDENCE
+		self.routes = {
+			label.lower(): {target.lower() for target in targets}
+			for label, targets in settings.CASCADE_ROUTES.items()
+		}
+		self.passthrough_labels = {
+			label.lower() for label in settings.CASCADE_PASSTHROUGH_LABELS
+		}
+		self.use_crops = settings.CASCADE_USE_CROPS
+		self.crop_padding = settings.CASCADE_CROP_PADDING
+		self.full_frame_interval = settings.CASCADE_FULL_FRAME_INTERVAL
+		self.cascade_stats = CascadeStats()
+		self.model_version = self._model_version(
+			model_path, settings.CASCADE_SCREEN_MODEL_PATH
+		)
+
+	def _model_version(self, *paths: str) -> str:
+		parts = []
+		for path in paths:
+			if not path:
+				continue
+			try:
+				stat = os.stat(path)
+				parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+			except OSError:
+				parts.append(path)
+		parts.append(repr(sorted((k, sorted(v)) for k, v in self.routes.items())))
+		parts.append(repr(sorted(self.passthrough_labels)))
+		parts.append(f"{self.use_crops}:{self.crop_padding}:{self.screen_confidence}")
+		return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+	@property
+	def cascade_enabled(self) -> bool:
+		return self.screen_model is not None
 
 	def predict(self, image: Image.Image) -> List[Dict[str, Any]]:
-		results = self.model.predict(source=image, verbose=False)
-		if not results:
-			return []
+		if self.screen_model is None:
+			detections = self._filter_allowed(self._run_model(self.model, [image])[0])
+		else:
+			detections = self._predict_cascade(image)
+		return _with_frame_size(detections, image.size)
 
-		detections = []
-		result = results[0]
-		names = result.names or {}
-		boxes = result.boxes
-		if boxes is None:
+	def predict_batch(self, images: List[Image.Image]) -> List[List[Dict[str, Any]]]:
+		if not images:
 			return []
+		if self.screen_model is None:
+			batches = [self._filter_allowed(found) for found in self._run_model(self.model, images)]
+		else:
+			# Cascade stages depend on each frame's screen result: one image at a time.
+			batches = [self._predict_cascade(image) for image in images]
+		return [_with_frame_size(found, image.size) for found, image in zip(batches, images)]
 
-		for box in boxes:
-			cls_id = int(box.cls[0])
-			label = str(names.get(cls_id, cls_id)).lower()
-			if self.allowed_labels and label not in self.allowed_labels:
+	def _run_model(
+		self, model: Any, images: List[Image.Image], min_confidence: float = 0.0
+	) -> List[List[Dict[str, Any]]]:
+		results = model.predict(source=images, verbose=False)
+		if not results:
+			return [[] for _ in images]
+
+		batches = []
+		for result in results:
+			detections = []
+			names = result.names or {}
+			boxes = result.boxes
+			if boxes is None:
+				batches.append(detections)
 				continue
-			confidence = float(box.conf[0])
-			xyxy = box.xyxy[0].tolist()
-			detections.append(
-				{
-					"label": label,
-					"confidence": confidence,
-					"bbox": xyxy,
-				}
+
+			for box in boxes:
+				cls_id = int(box.cls[0])
+				label = str(names.get(cls_id, cls_id)).lower()
+				confidence = float(box.conf[0])
+				if confidence < min_confidence:
+					continue
+				xyxy = box.xyxy[0].tolist()
+				detections.append(
+					{
+						"label": label,
+						"confidence": confidence,
+						"bbox": xyxy,
+					}
+				)
+			batches.append(detections)
+		return batches
+
+	def _filter_allowed(self, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		if not self.allowed_labels:
+			return detections
+		return [d for d in detections if d["label"] in self.allowed_labels]
+
+	def _routes_for(self, label: str) -> set[str] | None:
+		if label in self.routes:
+			return self.routes[label]
+		return self.routes.get("*")
+
+	def _predict_cascade(self, image: Image.Image) -> List[Dict[str, Any]]:
+		stats = self.cascade_stats
+		with stats.lock:
+			stats.frames += 1
+			frame_index = stats.frames
+			# The first frame always runs the heavy model on the full image so the
+			# compute-saved figure has a measured baseline to compare against.
+			force_full = frame_index == 1 or (
+				self.full_frame_interval > 0 and frame_index % self.full_frame_interval == 0
+			)
+
+		started = time.perf_counter()
+		screened = self._run_model(
+			self.screen_model, [image], min_confidence=self.screen_confidence
+		)[0]
+		screen_elapsed = time.perf_counter() - started
+
+		output = [d for d in screened if d["label"] in self.passthrough_labels]
+		triggers = []
+		for detection in screened:
+			targets = self._routes_for(detection["label"])
+			if targets:
+				triggers.append((detection, targets))
+
+		heavy_elapsed = 0.0
+		heavy_detections: List[Dict[str, Any]] = []
+		crops = 0
+		full_frame = force_full or bool(triggers and not self.use_crops)
+		if full_frame:
+			allowed = set().union(*(targets for _, targets in triggers)) if triggers else None
+			started = time.perf_counter()
+			found = self._run_model(self.model, [image])[0]
+			heavy_elapsed = time.perf_counter() - started
+			if not force_full and allowed is not None:
+				found = [d for d in found if d["label"] in allowed]
+			heavy_detections = found
+		elif triggers:
+			regions = [self._crop_box(det["bbox"], image.size) for det, _ in triggers]
+			crops = len(regions)
+			started = time.perf_counter()
+			batches = self._run_model(
+				self.model, [image.crop(region) for region in regions]
 			)
-		return detections
+			heavy_elapsed = time.perf_counter() - started
+			for (_, targets), region, found in zip(triggers, regions, batches):
+				x0, y0 = region[0], region[1]
+				for det in found:
+					if det["label"] not in targets:
+						continue
+					x1, y1, x2, y2 = det["bbox"]
+					det["bbox"] = [x1 + x0, y1 + y0, x2 + x0, y2 + y0]
+					heavy_detections.append(det)
+
+		output.extend(heavy_detections)
+
+		with stats.lock:
+			stats.screen_seconds += screen_elapsed
+			if screened:
+				stats.screen_hits += 1
+			if full_frame or crops:
+				stats.heavy_runs += 1
+				stats.heavy_seconds += heavy_elapsed
+				stats.heavy_crops += crops
+				if heavy_detections:
+					stats.heavy_hits += 1
+			if full_frame:
+				if stats.full_heavy_seconds:
+					stats.full_heavy_seconds = 0.9 * stats.full_heavy_seconds + 0.1 * heavy_elapsed
+				else:
+					stats.full_heavy_seconds = heavy_elapsed
+				stats.saved_seconds -= screen_elapsed
+			else:
+				stats.saved_seconds += stats.full_heavy_seconds - heavy_elapsed - screen_elapsed
+
+		return self._filter_allowed(output)
+
+	def _crop_box(
+		self, bbox: List[float], size: tuple[int, int]
+	) -> tuple[int, int, int, int]:
+		width, height = size
+		x1, y1, x2, y2 = bbox
+		pad_x = (x2 - x1) * self.crop_padding
+		pad_y = (y2 - y1) * self.crop_padding
+		return (
+			max(int(x1 - pad_x), 0),
+			max(int(y1 - pad_y), 0),
+			min(int(x2 + pad_x), width),
+			min(int(y2 + pad_y), height),
+		)
 
 
 @lru_cache
 def get_inference_service() -> InferenceService:
 	settings = get_settings()
-	return InferenceService(settings.MODEL_PATH)
+	service = InferenceService(settings.MODEL_PATH)
+	if service.cascade_enabled:
+		REGISTRY.register_collector(service.cascade_stats.collect)
+	return service
@@ -0,0 +1,555 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core import profiling
+from app.core.config import BASE_DIR, get_settings
+from app.core.metrics import LIVE_FPS, LIVE_FRAME_AGE, LIVE_SESSIONS, LIVE_VIEWERS, STAGE_SECONDS
+from app.db.session import SessionLocal
+from app.services.batch_scheduler import get_batch_scheduler
+from app.services.capture import CONNECTED, ENDED, CaptureSource
+from app.services.clip_recorder import create_clip_recorder
+from app.services.detection_bus import build_message, camera_key, get_detection_bus, offer_latest
+from app.services.event_service import EventService
+from app.services.inference_service import get_inference_service
+from app.services.tracking_service import MultiObjectTracker
+
+try:
+	import cv2
+except Exception:  # pragma: no cover - optional dependency
+	cv2 = None
+
+logger = logging.getLogger(__name__)
+
+event_service = EventService()
+
+DETECTION_IMAGES_DIR = BASE_DIR / "detection_images"
+DETECTION_IMAGES_DIR.mkdir(exist_ok=True)
+DETECTION_CLIPS_DIR = BASE_DIR / "detection_clips"
+DETECTION_CLIPS_DIR.mkdir(exist_ok=True)
+
+
+def sse(payload: Dict) -> str:
+	return f"data: {json.dumps(payload)}\n\n"
+
+
+def save_track_events(camera_id: int | None, track_events: List[dict]) -> None:
+	if not track_events:
+		return
+	started = time.perf_counter()
+	db_session = SessionLocal()
+	try:
+		event_service.create_events_from_detections(
+			db_session, camera_id=camera_id, user_id=None, detections=track_events
+		)
+		db_session.commit()
+	except Exception:
+		db_session.rollback()
+	finally:
+		db_session.close()
+	STAGE_SECONDS.labels("live", "db_write").observe(time.perf_counter() - started)
+
+
+DEFAULT_CONFIDENCE = 0.8
+
+# Sessions per camera label (ad-hoc streams share one), so the per-camera
+# gauges are dropped only when the last session for that label ends.
+_label_sessions: Dict[str, int] = {}
+_label_lock = threading.Lock()
+
+
+def _retain_label(label: str) -> None:
+	with _label_lock:
+		_label_sessions[label] = _label_sessions.get(label, 0) + 1
+
+
+def _release_label(label: str) -> None:
+	with _label_lock:
+		remaining = _label_sessions.get(label, 1) - 1
+		if remaining > 0:
+			_label_sessions[label] = remaining
+			return
+		_label_sessions.pop(label, None)
+		LIVE_FPS.remove(label)
+		LIVE_FRAME_AGE.remove(label)
+
+
+@dataclass(frozen=True)
+class SessionKey:
+	stream_url: str
+	camera_id: int | None
+
+
+VIEW_MODES = ("frames", "detections", "changes", "preview")
+
+
+@dataclass(frozen=True)
+class ViewProfile:
+	"""What a viewer receives. Viewers with equal profiles share one rendering.
+
+	frames: every processed frame; detections: metadata only, no image;
+	changes: frame + metadata only when the set of tracked objects changes;
+	preview: frames downscaled to `width`, at most `max_fps`.
+	Only detections at or above `confidence` are shown.
+	"""
+
+	mode: str = "frames"
+	width: int = 0
+	max_fps: float = 0.0
+	confidence: float = DEFAULT_CONFIDENCE
+
+	@classmethod
+	def build(
+		cls,
+		mode: str,
+		width: int = 0,
+		max_fps: float = 0.0,
+		confidence: float = DEFAULT_CONFIDENCE,
+	) -> "ViewProfile":
+		if mode == "preview":
+			width, max_fps = width or 320, max_fps or 2.0
+		if mode == "detections":
+			width = 0
+		return cls(mode, width, max_fps, confidence)
+
+	@property
+	def includes_frame(self) -> bool:
+		return self.mode != "detections"
+
+
+@dataclass
+class _ProfileState:
+	last_sent: float = 0.0
+	signature: tuple | None = None
+
+
+class FrameRender:
+	"""Annotated and encoded variants of one processed frame, each made once."""
+
+	def __init__(self, frame: np.ndarray, detections: List[Dict[str, Any]], stage: Dict) -> None:
+		self.frame = frame
+		self.detections = detections
+		self.stage = stage
+		self._annotated: Dict[float, np.ndarray] = {}
+		self._jpeg: Dict[Tuple[float, int], np.ndarray] = {}
+		self._base64: Dict[Tuple[float, int], str] = {}
+		self._raw_jpeg: bytes | None = None
+
+	def annotated(self, threshold: float) -> np.ndarray:
+		# Viewers with different thresholds see different boxes, so each
+		# threshold draws on its own copy of the frame.
+		image = self._annotated.get(threshold)
+		if image is not None:
+			return image
+		started = time.perf_counter()
+		image = self.frame.copy()
+		for detection in self.detections:
+			conf = detection.get("confidence", 0.0)
+			if conf < threshold:
+				continue
+			x1, y1, x2, y2 = map(int, detection.get("bbox", [0, 0, 0, 0]))
+			label = detection.get("label", "unknown")
+			track_id = detection.get("track_id")
+			caption = f"#{track_id} {label} {conf:.2f}" if track_id else f"{label} {conf:.2f}"
+
+			cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+			cv2.putText(
+				image,
+				caption,
+				(x1, y1 - 10),
+				cv2.FONT_HERSHEY_SIMPLEX,
+				0.6,
+				(0, 0, 255),
+				2,
+			)
+		self._annotated[threshold] = image
+		self.stage["draw"].observe(time.perf_counter() - started)
+		return image
+
+	def _width(self, width: int) -> int:
+		return 0 if width >= self.frame.shape[1] else width
+
+	def jpeg(self, threshold: float, width: int = 0) -> np.ndarray:
+		key = (threshold, self._width(width))
+		if key not in self._jpeg:
+			image = self.annotated(threshold)
+			if key[1]:
+				height, full_width = image.shape[:2]
+				started = time.perf_counter()
+				image = cv2.resize(
+					image, (key[1], max(round(height * key[1] / full_width), 1)),
+					interpolation=cv2.INTER_AREA,
+				)
+				self.stage["resize"].observe(time.perf_counter() - started)
+			started = time.perf_counter()
+			_, self._jpeg[key] = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+			self.stage["encode"].observe(time.perf_counter() - started)
+		return self._jpeg[key]
+
+	def raw_jpeg(self) -> bytes:
+		# Clips are recorded without overlays, so they never force a draw. A
+		# full-size viewer encode with no boxes drawn is the same image.
+		if self._raw_jpeg is None:
+			for (threshold, width), buffer in self._jpeg.items():
+				if not width and not any(
+					d.get("confidence", 0.0) >= threshold for d in self.detections
+				):
+					self._raw_jpeg = buffer.tobytes()
+					break
+		if self._raw_jpeg is None:
+			started = time.perf_counter()
+			_, buffer = cv2.imencode(".jpg", self.frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+			self._raw_jpeg = buffer.tobytes()
+			self.stage["clip_encode"].observe(time.perf_counter() - started)
+		return self._raw_jpeg
+
+	def base64(self, threshold: float, width: int = 0) -> str:
+		key = (threshold, self._width(width))
+		if key not in self._base64:
+			buffer = self.jpeg(*key)
+			started = time.perf_counter()
+			self._base64[key] = base64.b64encode(buffer).decode("utf-8")
+			self.stage["base64"].observe(time.perf_counter() - started)
+		return self._base64[key]
+
+
+class Viewer:
+	"""One SSE client: a bounded queue filled from the session thread."""
+
+	def __init__(
+		self, loop: asyncio.AbstractEventLoop, queue_size: int, profile: ViewProfile
+	) -> None:
+		self.loop = loop
+		self.profile = profile
+		self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+
+	def offer(self, message: str | None) -> None:
+		try:
+			self.loop.call_soon_threadsafe(offer_latest, self.queue, message)
+		except RuntimeError:
+			pass  # Viewer's loop already closed.
+
+	async def messages(self, heartbeat: float = 15.0) -> AsyncIterator[str]:
+		while True:
+			try:
+				message = await asyncio.wait_for(self.queue.get(), timeout=heartbeat)
+			except asyncio.TimeoutError:
+				yield ": keepalive\n\n"
+				continue
+			if message is None:
+				return
+			yield message
+
+
+class LiveSession:
+	"""Capture, inference, tracking and encoding for one stream on its own thread.
+
+	Every viewer of the same stream shares the session; it starts with the first
+	viewer and stops when the last one leaves. Viewers that fall behind lose
+	their oldest frames instead of slowing the session down.
+	"""
+
+	def __init__(self, key: SessionKey, fps: int, image_dir: Path, clip_dir: Path) -> None:
+		self.key = key
+		self.fps = fps
+		self.image_dir = image_dir
+		self.clip_dir = clip_dir
+		self.camera_label = camera_key(key.camera_id)
+		self.state = CONNECTED
+		self.finished = False
+		self._viewers: List[Viewer] = []
+		self._profiles: Dict[ViewProfile, _ProfileState] = {}
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread = threading.Thread(
+			target=self._run, name=f"live-{self.camera_label}", daemon=True
+		)
+
+	def start(self) -> "LiveSession":
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._stop.set()
+
+	@property
+	def viewer_count(self) -> int:
+		with self._lock:
+			return len(self._viewers)
+
+	def attach(self, viewer: Viewer, fps: int) -> None:
+		with self._lock:
+			self._viewers.append(viewer)
+			self.fps = max(self.fps, fps)
+		LIVE_VIEWERS.inc()
+		if self.state != CONNECTED:
+			viewer.offer(sse({"status": self.state}))
+
+	def detach(self, viewer: Viewer) -> int:
+		with self._lock:
+			if viewer in self._viewers:
+				self._viewers.remove(viewer)
+				LIVE_VIEWERS.dec()
+			return len(self._viewers)
+
+	def _broadcast(self, message: str | None) -> None:
+		with self._lock:
+			viewers = list(self._viewers)
+		for viewer in viewers:
+			viewer.offer(message)
+
+	def _deliver(self, render: FrameRender, detection_data: List[Dict[str, Any]]) -> None:
+		with self._lock:
+			viewers = list(self._viewers)
+		groups: Dict[ViewProfile, List[Viewer]] = {}
+		for viewer in viewers:
+			groups.setdefault(viewer.profile, []).append(viewer)
+		self._profiles = {p: self._profiles.get(p) or _ProfileState() for p in groups}
+
+		now = time.monotonic()
+		for profile, members in groups.items():
+			state = self._profiles[profile]
+			if profile.max_fps and now - state.last_sent < 1.0 / profile.max_fps:
+				continue
+			visible = [d for d in detection_data if d["confidence"] >= profile.confidence]
+			signature = tuple(sorted((d["track_id"] or 0, d["label"]) for d in visible))
+			if profile.mode == "changes" and signature == state.signature:
+				continue
+			state.last_sent, state.signature = now, signature
+			if profile.includes_frame:
+				payload = {
+					"frame": render.base64(profile.confidence, profile.width),
+					"detections": visible,
+				}
+			else:
+				height, width = render.frame.shape[:2]
+				payload = {
+					"detections": visible,
+					"frame_size": [width, height],
+					"ts": time.time(),
+				}
+			message = sse(payload)
+			for viewer in members:
+				viewer.offer(message)
+
+	def _run(self) -> None:
+		settings = get_settings()
+		camera_id = self.key.camera_id
+		inference = get_inference_service()
+		scheduler = get_batch_scheduler() if settings.LIVE_BATCH_ENABLED else None
+		# Tracks give each object a stable id; events are written on track
+		# start/end and label changes instead of on every confirmed frame.
+		tracker = MultiObjectTracker(min_hits=3, max_age_seconds=settings.TRACK_MAX_AGE_SECONDS)
+		event_confidence = settings.LIVE_EVENT_CONFIDENCE
+		stage = {
+			name: STAGE_SECONDS.labels("live", name)
+			for name in (
+				"capture", "convert", "inference", "draw", "resize", "encode", "base64", "clip_encode"
+			)
+		}
+		_retain_label(self.camera_label)
+		fps_gauge = LIVE_FPS.labels(self.camera_label)
+		age_gauge = LIVE_FRAME_AGE.labels(self.camera_label)
+		clips = create_clip_recorder(self.clip_dir)
+		frame_count = 0
+		last_seq = 0
+		last_processed = None
+		source = None
+
+		LIVE_SESSIONS.inc()
+		# The session owns this thread for its whole life, so it is tagged once.
+		session_id = profiling.register_session(self.camera_label)
+		profiling.tag_current_thread(session_id)
+		try:
+			# Reads, stall detection and reconnects happen on the capture's own
+			# threads; viewers get status messages instead of a closed stream.
+			source = CaptureSource(self.key.stream_url, self.camera_label).start()
+
+			while not self._stop.is_set():
+				read_started = time.perf_counter()
+				captured = source.read(after=last_seq, timeout=1.0)
+				state = source.state
+				if captured is None and source.stopped:
+					if state == ENDED:
+						self._broadcast(sse({"error": "Stream ended"}))
+					else:
+						self._broadcast(sse({"error": "Failed to open stream"}))
+					break
+				if state != self.state:
+					self.state = state
+					self._broadcast(sse({"status": state}))
+					continue
+				if captured is None:
+					continue
+
+				frame, last_seq = captured.image, captured.seq
+				captured_at = captured.captured_at
+				stage["capture"].observe(time.perf_counter() - read_started)
+				frame_count += 1
+				if frame_count % 5 != 0:  # Check every 5th frame instead of 3rd for efficiency
+					self._stop.wait(1.0 / self.fps)
+					continue
+
+				if last_processed is not None:
+					fps_gauge.set(1.0 / max(captured_at - last_processed, 1e-6))
+				last_processed = captured_at
+
+				started = time.perf_counter()
+				frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+				pil_image = Image.fromarray(frame_rgb)
+				stage["convert"].observe(time.perf_counter() - started)
+
+				started = time.perf_counter()
+				if scheduler is not None:
+					detections = scheduler.predict(session_id, pil_image, self.camera_label)
+					if detections is None:
+						continue
+				else:
+					detections = inference.predict(pil_image)
+				stage["inference"].observe(time.perf_counter() - started)
+
+				# Tracks and events use the fixed LIVE_EVENT_CONFIDENCE, so who is
+				# watching never changes what gets recorded; viewers filter their
+				# own view when rendering.
+				detections = detections or []
+				filtered_detections = [
+					d for d in detections if d.get("confidence", 0) >= event_confidence
+				]
+
+				track_events = tracker.update(filtered_detections, time.time())
+				# Drawing and encoding happen only for outputs someone needs.
+				render = FrameRender(frame, detections, stage)
+
+				started_events = [e for e in track_events if e["event"] != "track_end"]
+				if started_events:
+					# Save frame with detections locally
+					# Milliseconds plus the (process-unique) track id keep two starts in
+					# the same second from overwriting each other's image and clip.
+					timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+					labels_str = "_".join(sorted(set(e["label"] for e in track_events)))
+					cam_str = f"cam{camera_id}" if camera_id else "nocam"
+					track_str = f"t{min(e['track_id'] for e in started_events)}"
+					filename = f"{timestamp}_{cam_str}_{track_str}_{labels_str}.jpg"
+					image_path = self.image_dir / filename
+
+					if clips is not None:
+						# The path is fixed now; the file appears once post-roll is encoded.
+						clip_path = clips.start_clip(Path(filename).stem, captured_at)
+						for event in started_events:
+							event["clip_path"] = str(clip_path)
+
+					try:
+						cv2.imwrite(str(image_path), render.annotated(event_confidence))
+					except Exception:
+						pass  # Don't fail stream if image save fails
+
+				save_track_events(camera_id, track_events)
+				if filtered_detections or track_events:
+					get_detection_bus().publish(
+						camera_id, build_message(camera_id, filtered_detections, track_events)
+					)
+
+				detection_data = [
+					{
+						"label": d.get("label", "unknown"),
+						"confidence": d.get("confidence", 0.0),
+						"track_id": d.get("track_id"),
+						"bbox": d.get("bbox"),
+					}
+					for d in detections
+				]
+
+				age_gauge.set(time.perf_counter() - captured_at)
+				self._deliver(render, detection_data)
+				# After delivery, so a matching viewer encode can be reused.
+				if clips is not None and clips.wants_frames:
+					clips.push(captured_at, render.raw_jpeg())
+
+				self._stop.wait(1.0 / self.fps)
+		except Exception as e:
+			logger.exception("Live session for camera %s failed", self.camera_label)
+			self._broadcast(sse({"error": f"Stream error: {str(e)}"}))
+		finally:
+			self.finished = True
+			if source is not None:
+				source.stop()
+			if clips is not None:
+				clips.close()
+			save_track_events(camera_id, tracker.flush())
+			if scheduler is not None:
+				scheduler.release(session_id)
+			profiling.untag_current_thread()
+			profiling.unregister_session(session_id)
+			_release_label(self.camera_label)
+			LIVE_SESSIONS.dec()
+			self._broadcast(None)
+
+
+class LiveSessionManager:
+	def __init__(self, image_dir: Path, clip_dir: Path, queue_size: int) -> None:
+		self.image_dir = image_dir
+		self.clip_dir = clip_dir
+		self.queue_size = queue_size
+		self._sessions: Dict[SessionKey, LiveSession] = {}
+		self._lock = threading.Lock()
+
+	def acquire(
+		self, key: SessionKey, fps: int, profile: ViewProfile
+	) -> tuple[LiveSession, Viewer]:
+		viewer = Viewer(asyncio.get_running_loop(), self.queue_size, profile)
+		with self._lock:
+			session = self._sessions.get(key)
+			if session is None or session.finished:
+				session = LiveSession(key, fps, self.image_dir, self.clip_dir).start()
+				self._sessions[key] = session
+			session.attach(viewer, fps)
+		return session, viewer
+
+	def release(self, session: LiveSession, viewer: Viewer) -> None:
+		with self._lock:
+			if session.detach(viewer) == 0:
+				session.stop()
+				if self._sessions.get(session.key) is session:
+					del self._sessions[session.key]
+
+	async def stream(
+		self, key: SessionKey, fps: int, profile: ViewProfile = ViewProfile()
+	) -> AsyncIterator[str]:
+		session, viewer = self.acquire(key, fps, profile)
+		try:
+			async for message in viewer.messages():
+				yield message
+		finally:
+			self.release(session, viewer)
+
+	def snapshot(self) -> List[Dict]:
+		with self._lock:
+			sessions = list(self._sessions.values())
+		return [
+			{
+				"camera": session.camera_label,
+				"state": session.state,
+				"viewers": session.viewer_count,
+				"fps": session.fps,
+			}
+			for session in sessions
+		]
+
+
+@lru_cache
+def get_live_manager() -> LiveSessionManager:
+	settings = get_settings()
+	return LiveSessionManager(DETECTION_IMAGES_DIR, DETECTION_CLIPS_DIR, settings.LIVE_VIEWER_QUEUE)
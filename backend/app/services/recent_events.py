@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.db.session import SessionLocal
+from app.models.event import Event
+from app.repositories.event_repo import EventRepository
+from app.services.heatmap_service import naive_local
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+NO_CAMERA = -1
+BLOCK_SIZE = 4096
+INT64_MIN = np.iinfo(np.int64).min
+INT64_MAX = np.iinfo(np.int64).max
+
+Row = Tuple[Optional[int], datetime, Optional[int], str, float]
+
+
+def to_micros(value: datetime) -> int:
+	# Exact integer microseconds on the same naive local clock as occurred_at.
+	return (naive_local(value) - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value: int) -> datetime:
+	return EPOCH + timedelta(microseconds=int(value))
+
+
+def empty_counts() -> Dict[str, Any]:
+	return {"total": 0, "by_label": {}, "by_camera": {}}
+
+
+def camera_name(camera_id: int | None) -> str:
+	return "none" if camera_id is None or camera_id == NO_CAMERA else str(camera_id)
+
+
+def counts_from_rows(rows: Iterable[Tuple[int | None, str, int]]) -> Dict[str, Any]:
+	counts = empty_counts()
+	for camera_id, label, count in rows:
+		counts["total"] += count
+		counts["by_label"][label] = counts["by_label"].get(label, 0) + count
+		name = camera_name(camera_id)
+		counts["by_camera"][name] = counts["by_camera"].get(name, 0) + count
+	return counts
+
+
+def merge_counts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+	merged = {
+		"total": left["total"] + right["total"],
+		"by_label": dict(left["by_label"]),
+		"by_camera": dict(left["by_camera"]),
+	}
+	for group in ("by_label", "by_camera"):
+		for key, count in right[group].items():
+			merged[group][key] = merged[group].get(key, 0) + count
+	return merged
+
+
+class RecentEventsIndex:
+	"""Column arrays of the most recent events for filter-and-count queries.
+
+	Timestamps (naive local microseconds), camera ids, label codes and
+	confidences sit in parallel ring-buffer arrays. Each block of BLOCK_SIZE
+	slots keeps its min/max timestamp, so a query for the last hour only scans
+	the blocks that can hold matching events. The index is authoritative from
+	`covered_since` on; anything older (before the warm load, or overwritten by
+	newer events) has to come from the database. It only sees this process's
+	writes, so it is only correct while this process is the sole event writer
+	(see RECENT_EVENTS_ENABLED).
+	"""
+
+	def __init__(self, capacity: int) -> None:
+		self.capacity = max(capacity, 1)
+		self._ts = np.zeros(self.capacity, dtype=np.int64)
+		self._camera = np.full(self.capacity, NO_CAMERA, dtype=np.int64)
+		self._label = np.zeros(self.capacity, dtype=np.int32)
+		self._confidence = np.zeros(self.capacity, dtype=np.float32)
+		blocks = -(-self.capacity // BLOCK_SIZE)
+		self._block_min = np.full(blocks, INT64_MAX, dtype=np.int64)
+		self._block_max = np.full(blocks, INT64_MIN, dtype=np.int64)
+		self._labels: List[str] = []
+		self._codes: Dict[str, int] = {}
+		self._written = 0
+		# None until loaded: writes are ignored and every query goes to the database.
+		self._covered_since: int | None = None
+		# Rows added while a load is reading the database, replayed after it.
+		self._pending: List[Row] | None = None
+		self._lock = threading.Lock()
+
+	@property
+	def size(self) -> int:
+		return min(self._written, self.capacity)
+
+	@property
+	def covered_since(self) -> datetime | None:
+		covered = self._covered_since
+		return from_micros(covered) if covered is not None else None
+
+	def begin_load(self) -> None:
+		"""Start buffering writes; call before reading the rows for `load`."""
+		with self._lock:
+			self._pending = []
+
+	def load(self, rows: Sequence[Row], since: datetime) -> None:
+		"""Replace the contents with `rows`, newest first, covering `since` onwards.
+
+		Writes added since `begin_load` are replayed unless the read already
+		returned them. If `rows` filled the capacity the oldest timestamp may
+		have been cut short, so coverage starts just after it instead.
+		"""
+		with self._lock:
+			pending, self._pending = self._pending or [], None
+			self._written = 0
+			self._block_min.fill(INT64_MAX)
+			self._block_max.fill(INT64_MIN)
+			self._covered_since = to_micros(since)
+			if rows and len(rows) >= self.capacity:
+				self._covered_since = max(self._covered_since, to_micros(rows[-1][1]) + 1)
+			seen = {row[0] for row in rows}
+			self._append(list(reversed(rows)))
+			self._append([row for row in pending if row[0] is None or row[0] not in seen])
+
+	def abort_load(self) -> None:
+		with self._lock:
+			self._pending = None
+
+	def add(self, events: Iterable[Event]) -> None:
+		rows = [(e.id, e.occurred_at, e.camera_id, e.label, e.confidence) for e in events]
+		with self._lock:
+			if self._pending is not None:
+				self._pending.extend(rows)
+			elif self._covered_since is not None:
+				self._append(rows)
+
+	def _code(self, label: str) -> int:
+		code = self._codes.get(label)
+		if code is None:
+			code = self._codes[label] = len(self._labels)
+			self._labels.append(label)
+		return code
+
+	def _append(self, rows: Sequence[Row]) -> None:
+		rows = [row for row in rows if row[1] is not None]
+		ts = np.array([to_micros(row[1]) for row in rows], dtype=np.int64)
+		# Events older than the covered range would never be counted.
+		keep = ts >= self._covered_since
+		if not keep.all():
+			rows = [row for row, kept in zip(rows, keep) if kept]
+			ts = ts[keep]
+		if not rows:
+			return
+		camera = np.array([NO_CAMERA if r[2] is None else r[2] for r in rows], dtype=np.int64)
+		label = np.array([self._code(r[3]) for r in rows], dtype=np.int32)
+		confidence = np.array([r[4] for r in rows], dtype=np.float32)
+		if len(ts) > self.capacity:
+			self._covered_since = max(self._covered_since, int(ts[: -self.capacity].max()) + 1)
+			ts, camera, label, confidence = (
+				column[-self.capacity :] for column in (ts, camera, label, confidence)
+			)
+
+		absolute = self._written + np.arange(len(ts))
+		slots = absolute % self.capacity
+		overwritten = slots[absolute >= self.capacity]
+		if len(overwritten):
+			self._covered_since = max(self._covered_since, int(self._ts[overwritten].max()) + 1)
+		self._ts[slots] = ts
+		self._camera[slots] = camera
+		self._label[slots] = label
+		self._confidence[slots] = confidence
+		self._written += len(ts)
+
+		size = self.size
+		for block in np.unique(slots // BLOCK_SIZE):
+			segment = self._ts[block * BLOCK_SIZE : min((block + 1) * BLOCK_SIZE, size)]
+			self._block_min[block] = segment.min()
+			self._block_max[block] = segment.max()
+
+	def count(
+		self,
+		since: datetime,
+		until: datetime,
+		camera_id: int | None = None,
+		label: str | None = None,
+		min_confidence: float = 0.0,
+	) -> Dict[str, Any] | None:
+		"""Counts for [since, until), or None if `since` is older than the index."""
+		start, end = to_micros(since), to_micros(until)
+		with self._lock:
+			if self._covered_since is None or start < self._covered_since:
+				return None
+			blocks = np.flatnonzero((self._block_max >= start) & (self._block_min < end))
+			index = (blocks[:, None] * BLOCK_SIZE + np.arange(BLOCK_SIZE)).ravel()
+			index = index[index < self.size]
+			ts = self._ts[index]
+			mask = (ts >= start) & (ts < end)
+			if camera_id is not None:
+				mask &= self._camera[index] == camera_id
+			if label is not None:
+				code = self._codes.get(label)
+				mask &= self._label[index] == (code if code is not None else -1)
+			if min_confidence > 0:
+				mask &= self._confidence[index] >= min_confidence
+			by_label = np.bincount(self._label[index][mask], minlength=len(self._labels))
+			cameras, by_camera = np.unique(self._camera[index][mask], return_counts=True)
+			labels = list(self._labels)
+		return {
+			"total": int(mask.sum()),
+			"by_label": {labels[code]: int(n) for code, n in enumerate(by_label) if n},
+			"by_camera": {camera_name(int(c)): int(n) for c, n in zip(cameras, by_camera)},
+		}
+
+	def collect(self):
+		covered = self._covered_since
+		samples = [
+			("monkey_recent_events_index", {"kind": "size"}, self.size),
+			("monkey_recent_events_index", {"kind": "capacity"}, self.capacity),
+		]
+		if covered is not None:
+			age = (datetime.now() - from_micros(covered)).total_seconds()
+			samples.append(("monkey_recent_events_index", {"kind": "covered_seconds"}, max(age, 0.0)))
+		return [
+			(
+				"monkey_recent_events_index",
+				"gauge",
+				"In-memory recent-events index size and the time span it covers.",
+				samples,
+			)
+		]
+
+
+@lru_cache
+def get_recent_events_index() -> RecentEventsIndex:
+	index = RecentEventsIndex(get_settings().RECENT_EVENTS_CAPACITY)
+	REGISTRY.register_collector(index.collect)
+	return index
+
+
+def warm_recent_events() -> None:
+	"""Load the last RECENT_EVENTS_WINDOW_HOURS of events (up to capacity)."""
+	settings = get_settings()
+	if not settings.RECENT_EVENTS_ENABLED:
+		return
+	index = get_recent_events_index()
+	since = datetime.now() - timedelta(hours=settings.RECENT_EVENTS_WINDOW_HOURS)
+	index.begin_load()
+	db = SessionLocal()
+	try:
+		rows = EventRepository().list_recent_columns(db, since, index.capacity)
+	except Exception as exc:
+		index.abort_load()
+		logger.warning("Recent-events index not loaded: %s", exc)
+		return
+	finally:
+		db.close()
+	index.load(rows, since)
+	logger.info("Recent-events index loaded %d events since %s", index.size, index.covered_since)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+
+try:
+	import redis
+except Exception:  # pragma: no cover - optional dependency
+	redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(
+	data: bytes, model_version: str, labels: Iterable[str], input_size: int, max_pixels: int
+) -> str:
+	# Decode settings are part of the key: the draft-decoded size changes the
+	# detections, and the pixel limit decides whether there are any at all.
+	options = f"{','.join(sorted(labels))}|{input_size}|{max_pixels}"
+	options_digest = hashlib.sha1(options.encode("utf-8")).hexdigest()[:12]
+	return f"{hashlib.sha256(data).hexdigest()}:{model_version}:{options_digest}"
+
+
+@dataclass
+class CachedResult:
+	detections: List[Dict[str, Any]]
+	inference_ms: float
+
+	def encode(self) -> bytes:
+		return json.dumps(
+			{"detections": self.detections, "inference_ms": self.inference_ms}
+		).encode("utf-8")
+
+	@classmethod
+	def decode(cls, raw: bytes) -> "CachedResult":
+		data = json.loads(raw)
+		return cls(detections=data["detections"], inference_ms=data["inference_ms"])
+
+
+@dataclass
+class CacheStats:
+	hits: int = 0
+	misses: int = 0
+	evictions: int = 0
+	saved_ms: float = 0.0
+	lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+	def record_hit(self, result: CachedResult) -> None:
+		with self.lock:
+			self.hits += 1
+			self.saved_ms += result.inference_ms
+
+	def record_miss(self) -> None:
+		with self.lock:
+			self.misses += 1
+
+	def collect(self):
+		with self.lock:
+			values = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+			saved = self.saved_ms / 1000
+		return [
+			(
+				"monkey_result_cache_operations",
+				"counter",
+				"Inference result cache lookups and evictions.",
+				[
+					("monkey_result_cache_operations_total", {"result": key}, value)
+					for key, value in values.items()
+				],
+			),
+			(
+				"monkey_result_cache_saved_seconds",
+				"counter",
+				"Inference time avoided by cache hits.",
+				[("monkey_result_cache_saved_seconds_total", {}, saved)],
+			),
+		]
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self.lock:
+			lookups = self.hits + self.misses
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_ratio": self.hits / lookups if lookups else 0.0,
+				"evictions": self.evictions,
+				"saved_inference_ms": self.saved_ms,
+			}
+
+
+class MemoryResultCache:
+	def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float) -> None:
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.ttl_seconds = ttl_seconds
+		self.stats = CacheStats()
+		self._entries: OrderedDict[str, tuple[float, int, bytes]] = OrderedDict()
+		self._bytes = 0
+		self._lock = threading.Lock()
+
+	def get(self, key: str) -> CachedResult | None:
+		now = time.monotonic()
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry[0] < now:
+				self._remove(key)
+				entry = None
+			if entry is not None:
+				self._entries.move_to_end(key)
+		if entry is None:
+			self.stats.record_miss()
+			return None
+		result = CachedResult.decode(entry[2])
+		self.stats.record_hit(result)
+		return result
+
+	def set(self, key: str, result: CachedResult) -> None:
+		raw = result.encode()
+		if len(raw) > self.max_bytes:
+			return
+		with self._lock:
+			if key in self._entries:
+				self._remove(key)
+			self._entries[key] = (time.monotonic() + self.ttl_seconds, len(raw), raw)
+			self._bytes += len(raw)
+			while self._entries and (
+				len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+			):
+				oldest = next(iter(self._entries))
+				self._remove(oldest)
+				with self.stats.lock:
+					self.stats.evictions += 1
+
+	def _remove(self, key: str) -> None:
+		_, size, _ = self._entries.pop(key)
+		self._bytes -= size
+
+	def snapshot(self) -> Dict[str, Any]:
+		with self._lock:
+			usage = {"entries": len(self._entries), "bytes": self._bytes}
+		return {"backend": "memory", **self.stats.snapshot(), **usage}
+
+
+class RedisResultCache:
+	# Size and LRU limits are left to the server's maxmemory/eviction policy.
+	def __init__(self, url: str = "", ttl_seconds: float = 300.0, client: Any = None) -> None:
+		self.client = client if client is not None else redis.Redis.from_url(url)
+		self.ttl_seconds = ttl_seconds
+		self.stats = CacheStats()
+
+	def get(self, key: str) -> CachedResult | None:
+		try:
+			raw = self.client.get("infer-cache:" + key)
+		except Exception as exc:
+			logger.warning("Result cache lookup failed: %s", exc)
+			raw = None
+		if raw is None:
+			self.stats.record_miss()
+			return None
+		result = CachedResult.decode(raw)
+		self.stats.record_hit(result)
+		return result
+
+	def set(self, key: str, result: CachedResult) -> None:
+		try:
+			self.client.set(
+				"infer-cache:" + key, result.encode(), ex=max(int(self.ttl_seconds), 1)
+			)
+		except Exception as exc:
+			logger.warning("Result cache store failed: %s", exc)
+
+	def snapshot(self) -> Dict[str, Any]:
+		return {"backend": "redis", **self.stats.snapshot()}
+
+
+ResultCache = MemoryResultCache | RedisResultCache
+
+
+@lru_cache
+def get_result_cache() -> ResultCache | None:
+	settings = get_settings()
+	backend = settings.INFER_CACHE_BACKEND.lower()
+	cache: ResultCache | None = None
+	if backend == "redis" and settings.REDIS_URL and redis is not None:
+		cache = RedisResultCache(settings.REDIS_URL, settings.INFER_CACHE_TTL_SECONDS)
+	elif backend in ("memory", "redis"):
+		cache = MemoryResultCache(
+			settings.INFER_CACHE_MAX_ENTRIES,
+			settings.INFER_CACHE_MAX_BYTES,
+			settings.INFER_CACHE_TTL_SECONDS,
+		)
+	if cache is not None:
+		REGISTRY.register_collector(cache.stats.collect)
+	return cache
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Constant-velocity Kalman model over [cx, cy, w, h, vcx, vcy, vw, vh].
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.01, 0.01])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4, 1e4])
+
+_track_ids = count(1)
+
+
+def _xyxy_to_state(boxes: np.ndarray) -> np.ndarray:
+	w = boxes[:, 2] - boxes[:, 0]
+	h = boxes[:, 3] - boxes[:, 1]
+	return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w, h], axis=1)
+
+
+def _state_to_xyxy(states: np.ndarray) -> np.ndarray:
+	cx, cy = states[:, 0], states[:, 1]
+	w = np.maximum(states[:, 2], 0.0)
+	h = np.maximum(states[:, 3], 0.0)
+	return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	if len(a) == 0 or len(b) == 0:
+		return np.zeros((len(a), len(b)))
+	x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+	y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+	x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+	y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+	inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+	area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+	area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+	union = area_a[:, None] + area_b[None, :] - inter
+	return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+@dataclass
+class Track:
+	track_id: int
+	label: str
+	confidence: float
+	x: np.ndarray
+	P: np.ndarray
+	first_seen: float
+	last_seen: float
+	hits: int = 1
+	confirmed: bool = False
+	pending_label: str | None = None
+	pending_hits: int = 0
+	last_detection: Dict[str, Any] = field(default_factory=dict)
+
+	@property
+	def bbox(self) -> List[float]:
+		return _state_to_xyxy(self.x[None, :4])[0].tolist()
+
+
+class MultiObjectTracker:
+	def __init__(
+		self,
+		iou_threshold: float = 0.3,
+		min_hits: int = 3,
+		max_age_seconds: float = 2.0,
+		cross_label_penalty: float = 0.5,
+	) -> None:
+		self.iou_threshold = iou_threshold
+		self.min_hits = min_hits
+		self.max_age_seconds = max_age_seconds
+		self.cross_label_penalty = cross_label_penalty
+		self.tracks: List[Track] = []
+
+	def active_tracks(self) -> List[Track]:
+		return [t for t in self.tracks if t.confirmed]
+
+	def update(self, detections: List[Dict[str, Any]], now: float) -> List[Dict[str, Any]]:
+		self._predict()
+		events: List[Dict[str, Any]] = []
+
+		boxes = np.array([d["bbox"] for d in detections], dtype=float).reshape(-1, 4)
+		matches, unmatched = self._associate(detections, boxes)
+
+		if matches:
+			track_idx = np.array([m[0] for m in matches])
+			det_idx = np.array([m[1] for m in matches])
+			self._correct(track_idx, _xyxy_to_state(boxes[det_idx]))
+			for ti, di in matches:
+				event = self._observe(self.tracks[ti], detections[di], now)
+				if event:
+					events.append(event)
+
+		for di in unmatched:
+			detection = detections[di]
+			state = np.zeros(8)
+			state[:4] = _xyxy_to_state(boxes[di : di + 1])[0]
+			track = Track(
+				track_id=next(_track_ids),
+				label=detection["label"],
+				confidence=float(detection.get("confidence", 0.0)),
+				x=state,
+				P=_P0.copy(),
+				first_seen=now,
+				last_seen=now,
+				last_detection=detection,
+			)
+			self.tracks.append(track)
+			if self.min_hits <= 1:
+				events.append(self._confirm(track, now))
+
+		survivors = []
+		for track in self.tracks:
+			if now - track.last_seen > self.max_age_seconds:
+				if track.confirmed:
+					events.append(self._event(track, "track_end", track.last_seen))
+			else:
+				survivors.append(track)
+		self.tracks = survivors
+		return events
+
+	def flush(self) -> List[Dict[str, Any]]:
+		events = [
+			self._event(track, "track_end", track.last_seen)
+			for track in self.tracks
+			if track.confirmed
+		]
+		self.tracks = []
+		return events
+
+	def _predict(self) -> None:
+		if not self.tracks:
+			return
+		X = np.stack([t.x for t in self.tracks])
+		P = np.stack([t.P for t in self.tracks])
+		X = X @ _F.T
+		P = _F @ P @ _F.T + _Q
+		for track, x, p in zip(self.tracks, X, P):
+			track.x = x
+			track.P = p
+
+	def _correct(self, track_idx: np.ndarray, measurements: np.ndarray) -> None:
+		X = np.stack([self.tracks[i].x for i in track_idx])
+		P = np.stack([self.tracks[i].P for i in track_idx])
+		S = P[:, :4, :4] + _R
+		K = P[:, :, :4] @ np.linalg.inv(S)
+		residual = measurements - X[:, :4]
+		X = X + (K @ residual[:, :, None])[:, :, 0]
+		P = P - K @ P[:, :4, :]
+		for i, x, p in zip(track_idx, X, P):
+			self.tracks[i].x = x
+			self.tracks[i].P = p
+
+	def _associate(
+		self, detections: List[Dict[str, Any]], boxes: np.ndarray
+	) -> tuple[list[tuple[int, int]], list[int]]:
+		if not self.tracks:
+			return [], list(range(len(detections)))
+
+		predicted = _state_to_xyxy(np.stack([t.x[:4] for t in self.tracks]))
+		scores = iou_matrix(predicted, boxes)
+		track_labels = np.array([t.label for t in self.tracks], dtype=object)
+		det_labels = np.array([d["label"] for d in detections], dtype=object)
+		same_label = track_labels[:, None] == det_labels[None, :]
+		scores = np.where(same_label, scores, scores * self.cross_label_penalty)
+
+		matches = []
+		used_tracks: set[int] = set()
+		used_dets: set[int] = set()
+		order = np.argsort(scores, axis=None)[::-1]
+		for flat in order:
+			ti, di = np.unravel_index(flat, scores.shape)
+			if scores[ti, di] < self.iou_threshold:
+				break
+			if ti in used_tracks or di in used_dets:
+				continue
+			used_tracks.add(int(ti))
+			used_dets.add(int(di))
+			matches.append((int(ti), int(di)))
+
+		unmatched = [i for i in range(len(detections)) if i not in used_dets]
+		return matches, unmatched
+
+	def _observe(
+		self, track: Track, detection: Dict[str, Any], now: float
+	) -> Dict[str, Any] | None:
+		track.hits += 1
+		track.last_seen = now
+		track.confidence = float(detection.get("confidence", 0.0))
+		track.last_detection = detection
+
+		label = detection["label"]
+		if label == track.label:
+			track.pending_label = None
+			track.pending_hits = 0
+		elif label == track.pending_label:
+			track.pending_hits += 1
+		else:
+			track.pending_label = label
+			track.pending_hits = 1
+
+		if not track.confirmed:
+			if track.pending_label and track.pending_hits >= self.min_hits:
+				track.label = track.pending_label
+				track.pending_label = None
+				track.pending_hits = 0
+			if track.hits >= self.min_hits:
+				detection["track_id"] = track.track_id
+				return self._confirm(track, now)
+			return None
+
+		detection["track_id"] = track.track_id
+		if track.pending_label and track.pending_hits >= self.min_hits:
+			previous = track.label
+			track.label = track.pending_label
+			track.pending_label = None
+			track.pending_hits = 0
+			event = self._event(track, "label_change", now)
+			event["previous_label"] = previous
+			return event
+		return None
+
+	def _confirm(self, track: Track, now: float) -> Dict[str, Any]:
+		track.confirmed = True
+		track.last_detection["track_id"] = track.track_id
+		return self._event(track, "track_start", now)
+
+	def _event(self, track: Track, kind: str, at: float) -> Dict[str, Any]:
+		event = {
+			"label": track.label,
+			"confidence": track.confidence,
+			"bbox": track.last_detection.get("bbox", track.bbox),
+			"track_id": track.track_id,
+			"event": kind,
+			"dwell_seconds": round(max(at - track.first_seen, 0.0), 3),
+		}
+		if "frame_size" in track.last_detection:
+			event["frame_size"] = track.last_detection["frame_size"]
+		return event
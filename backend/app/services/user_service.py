@@ -1,12 +1,21 @@
 from typing import List
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.user import User
-from app.repositories.user_repo import UserRepository
+from app.repositories.user_repo import AsyncUserRepository, UserRepository
 from app.schemas.user import UserCreate
 
 
+def _user_from_payload(payload: UserCreate) -> User:
+    return User(
+        email=payload.email,
+        full_name=payload.full_name,
+        is_active=payload.is_active,
+    )
+
+
 class UserService:
     def __init__(self) -> None:
         self.repo = UserRepository()
@@ -18,12 +27,26 @@ class UserService:
         return self.repo.get(db, user_id)
 
     def create_user(self, db: Session, payload: UserCreate) -> User:
-        user = User(
-            email=payload.email,
-            full_name=payload.full_name,
-            is_active=payload.is_active,
-        )
-        return self.repo.create(db, user)
+        return self.repo.create(db, _user_from_payload(payload))
 
     def delete_user(self, db: Session, user: User) -> None:
         self.repo.delete(db, user)
+
+
+class AsyncUserService:
+    def __init__(self) -> None:
+        self.repo = AsyncUserRepository()
+
+    async def list_users(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100
+    ) -> List[User]:
+        return await self.repo.list_all(db, skip=skip, limit=limit)
+
+    async def get_user(self, db: AsyncSession, user_id: int) -> User | None:
+        return await self.repo.get(db, user_id)
+
+    async def create_user(self, db: AsyncSession, payload: UserCreate) -> User:
+        return await self.repo.create(db, _user_from_payload(payload))
+
+    async def delete_user(self, db: AsyncSession, user: User) -> None:
+        await self.repo.delete(db, user)
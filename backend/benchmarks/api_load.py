@@ -0,0 +1,255 @@
+"""Load test for DB-bound list endpoints: sync Session handlers vs. AsyncSession handlers.
+
+Run from the backend directory:
+
+	python -m benchmarks.api_load run --concurrency 200 --seconds 15 --held-threads 30
+
+`run` seeds a temporary SQLite database, starts one server per mode and drives
+GET /events at the given concurrency. `--held-threads` parks that many sync
+requests in the server threadpool first, the way long-lived live-stream
+generators do. `--url` drives an already running server instead.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+	if not samples:
+		return 0.0
+	ordered = sorted(samples)
+	return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def build_app(mode: str, database_url: str):
+	from fastapi import Depends, FastAPI
+
+	from app.core.config import get_settings
+	from app.db.engine import async_url, build_async_engine, build_engine
+	from app.schemas.event import EventRead
+	from app.services.event_service import AsyncEventService, EventService
+
+	settings = get_settings()
+	app = FastAPI()
+
+	@app.get("/hold")
+	def hold(seconds: float = 60.0):
+		time.sleep(seconds)
+		return {"held": seconds}
+
+	if mode == "sync":
+		from sqlalchemy.orm import Session, sessionmaker
+
+		engine = build_engine(database_url, settings)
+		session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+		service = EventService()
+
+		def get_db():
+			db = session_factory()
+			try:
+				yield db
+			finally:
+				db.close()
+
+		@app.get("/events/", response_model=list[EventRead])
+		def list_events(db: Session = Depends(get_db), limit: int = 100):
+			return service.list_events(db, limit=limit)
+	else:
+		from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+		engine = build_async_engine(async_url(database_url), settings)
+		session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+		service = AsyncEventService()
+
+		async def get_db():
+			async with session_factory() as db:
+				yield db
+
+		@app.get("/events/", response_model=list[EventRead])
+		async def list_events(db: AsyncSession = Depends(get_db), limit: int = 100):
+			return await service.list_events(db, limit=limit)
+
+	return app
+
+
+def seed(database_url: str, count: int) -> None:
+	from sqlalchemy.orm import sessionmaker
+
+	from app.core.config import get_settings
+	from app.db.base import Base
+	from app.db.engine import build_engine
+	from app.models import camera, event, user  # noqa: F401
+	from app.models.event import Event
+
+	engine = build_engine(database_url, get_settings())
+	Base.metadata.create_all(bind=engine)
+	db = sessionmaker(bind=engine)()
+	now = datetime.now()
+	db.add_all(
+		Event(
+			label="person",
+			confidence=0.9,
+			payload={"bbox": [0, 0, 10, 10]},
+			occurred_at=now,
+		)
+		for _ in range(count)
+	)
+	db.commit()
+	db.close()
+	engine.dispose()
+
+
+async def _get(host: str, port: int, path: str, connection: list) -> int:
+	if not connection:
+		connection.extend(await asyncio.open_connection(host, port))
+	reader, writer = connection
+	writer.write(
+		f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+	)
+	await writer.drain()
+	head = await reader.readuntil(b"\r\n\r\n")
+	lines = head.decode("latin-1").split("\r\n")
+	status = int(lines[0].split()[1])
+	length = 0
+	for line in lines[1:]:
+		if line.lower().startswith("content-length:"):
+			length = int(line.split(":", 1)[1])
+	await reader.readexactly(length)
+	return status
+
+
+async def drive(url: str, concurrency: int, seconds: float, held_threads: int) -> dict:
+	parts = urlsplit(url)
+	host, port = parts.hostname, parts.port or 80
+	base = parts.path.rstrip("/")
+
+	holders = []
+	for _ in range(held_threads):
+		reader, writer = await asyncio.open_connection(host, port)
+		writer.write(
+			f"GET {base}/hold?seconds={seconds + 30} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+		)
+		await writer.drain()
+		holders.append(writer)
+	await asyncio.sleep(0.5)
+
+	latencies: list[float] = []
+	errors = 0
+	deadline = time.perf_counter() + seconds
+
+	async def client() -> None:
+		nonlocal errors
+		connection: list = []
+		while time.perf_counter() < deadline:
+			started = time.perf_counter()
+			try:
+				status = await _get(host, port, f"{base}/events/?limit=100", connection)
+				if status != 200:
+					errors += 1
+				latencies.append((time.perf_counter() - started) * 1000)
+			except (OSError, asyncio.IncompleteReadError):
+				errors += 1
+				connection.clear()
+
+	await asyncio.gather(*(client() for _ in range(concurrency)))
+	for writer in holders:
+		writer.close()
+
+	return {
+		"requests": len(latencies),
+		"rps": len(latencies) / seconds,
+		"p50_ms": _percentile(latencies, 50),
+		"p95_ms": _percentile(latencies, 95),
+		"p99_ms": _percentile(latencies, 99),
+		"errors": errors,
+	}
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30.0) -> None:
+	deadline = time.time() + timeout
+	while time.time() < deadline:
+		try:
+			with socket.create_connection(("127.0.0.1", port), timeout=1):
+				return
+		except OSError:
+			time.sleep(0.2)
+	raise RuntimeError(f"Server on port {port} did not start")
+
+
+def run(args: argparse.Namespace) -> None:
+	if args.url:
+		report = asyncio.run(drive(args.url, args.concurrency, args.seconds, args.held_threads))
+		print(json.dumps({"url": args.url, **report}, indent=2))
+		return
+
+	reports = []
+	with tempfile.TemporaryDirectory() as tmp:
+		database_url = f"sqlite:///{(Path(tmp) / 'load.db').as_posix()}"
+		seed(database_url, args.rows)
+		for mode in ("sync", "async"):
+			port = _free_port()
+			server = subprocess.Popen(
+				[
+					sys.executable, "-m", "benchmarks.api_load", "serve",
+					"--mode", mode, "--port", str(port), "--database-url", database_url,
+				],
+				env=os.environ.copy(),
+			)
+			try:
+				_wait_for(port)
+				report = asyncio.run(
+					drive(f"http://127.0.0.1:{port}", args.concurrency, args.seconds, args.held_threads)
+				)
+				reports.append({"mode": mode, **report})
+			finally:
+				server.terminate()
+				server.wait()
+	print(json.dumps(reports, indent=2))
+
+
+def serve(args: argparse.Namespace) -> None:
+	import uvicorn
+
+	uvicorn.run(build_app(args.mode, args.database_url), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	run_parser = commands.add_parser("run")
+	run_parser.add_argument("--url", default="")
+	run_parser.add_argument("--concurrency", type=int, default=200)
+	run_parser.add_argument("--seconds", type=float, default=15.0)
+	run_parser.add_argument("--held-threads", type=int, default=0)
+	run_parser.add_argument("--rows", type=int, default=2000)
+	run_parser.set_defaults(handler=run)
+
+	serve_parser = commands.add_parser("serve")
+	serve_parser.add_argument("--mode", choices=["sync", "async"], required=True)
+	serve_parser.add_argument("--port", type=int, required=True)
+	serve_parser.add_argument("--database-url", required=True)
+	serve_parser.set_defaults(handler=serve)
+
+	args = parser.parse_args()
+	args.handler(args)
+
+
+if __name__ == "__main__":
+	main()
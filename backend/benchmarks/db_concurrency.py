@@ -0,0 +1,121 @@
+"""Concurrent read/write benchmark: default SQLite engine vs. the tuned profile.
+
+Run from the backend directory:
+
+	python -m benchmarks.db_concurrency --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+from datetime import datetime
+import json
+from pathlib import Path
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.db.base import Base
+from app.db.engine import build_engine
+from app.models import camera, event, user  # noqa: F401
+from app.models.event import Event
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+	if not samples:
+		return 0.0
+	ordered = sorted(samples)
+	index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+	return ordered[index]
+
+
+def _worker(session_factory, stop: threading.Event, write: bool, results: dict) -> None:
+	latencies = []
+	errors = 0
+	while not stop.is_set():
+		db = session_factory()
+		started = time.perf_counter()
+		try:
+			if write:
+				db.add(
+					Event(
+						camera_id=None,
+						label="person",
+						confidence=0.9,
+						payload={"bbox": [0, 0, 10, 10]},
+						occurred_at=datetime.now(),
+					)
+				)
+				db.commit()
+			else:
+				db.query(Event).order_by(Event.id.desc()).limit(100).all()
+			latencies.append((time.perf_counter() - started) * 1000)
+		except Exception:
+			db.rollback()
+			errors += 1
+		finally:
+			db.close()
+	with results["lock"]:
+		key = "write" if write else "read"
+		results[key].extend(latencies)
+		results[f"{key}_errors"] += errors
+
+
+def run_profile(name: str, engine, writers: int, readers: int, seconds: float) -> dict:
+	Base.metadata.create_all(bind=engine)
+	session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+	results = {"lock": threading.Lock(), "write": [], "read": [], "write_errors": 0, "read_errors": 0}
+	stop = threading.Event()
+	threads = [
+		threading.Thread(target=_worker, args=(session_factory, stop, True, results))
+		for _ in range(writers)
+	] + [
+		threading.Thread(target=_worker, args=(session_factory, stop, False, results))
+		for _ in range(readers)
+	]
+	for thread in threads:
+		thread.start()
+	time.sleep(seconds)
+	stop.set()
+	for thread in threads:
+		thread.join()
+	engine.dispose()
+
+	report = {"profile": name}
+	for key in ("write", "read"):
+		samples = results[key]
+		report[key] = {
+			"ops_per_sec": len(samples) / seconds,
+			"p50_ms": statistics.median(samples) if samples else 0.0,
+			"p99_ms": _percentile(samples, 99),
+			"errors": results[f"{key}_errors"],
+		}
+	return report
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--writers", type=int, default=4)
+	parser.add_argument("--readers", type=int, default=8)
+	parser.add_argument("--seconds", type=float, default=10.0)
+	args = parser.parse_args()
+
+	settings = get_settings()
+	reports = []
+	with tempfile.TemporaryDirectory() as tmp:
+		default_url = f"sqlite:///{(Path(tmp) / 'default.db').as_posix()}"
+		default_engine = create_engine(default_url, connect_args={"check_same_thread": False})
+		reports.append(run_profile("default", default_engine, args.writers, args.readers, args.seconds))
+
+		tuned_url = f"sqlite:///{(Path(tmp) / 'tuned.db').as_posix()}"
+		tuned_engine = build_engine(tuned_url, settings)
+		reports.append(run_profile("tuned", tuned_engine, args.writers, args.readers, args.seconds))
+
+	print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+	main()
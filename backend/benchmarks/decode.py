@@ -0,0 +1,99 @@
+"""Upload decode benchmark: full-resolution decode vs. the reduced-size JPEG fast path.
+
+Run from the backend directory:
+
+	python -m benchmarks.decode --width 4032 --height 3024 --iterations 20
+
+Each mode runs in its own process so peak RSS is measured independently.
+"""
+
+import argparse
+from io import BytesIO
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import get_settings
+from app.services.image_decode import decode_image
+
+
+def make_jpeg(width: int, height: int, quality: int = 92) -> bytes:
+	rng = np.random.default_rng(0)
+	x = np.linspace(0, 255, width, dtype=np.float32)
+	y = np.linspace(0, 255, height, dtype=np.float32)
+	base = (x[None, :] + y[:, None]) / 2
+	pixels = np.stack([base, base[::-1], base[:, ::-1]], axis=2)
+	pixels += rng.normal(0, 20, size=pixels.shape).astype(np.float32)
+	buffer = BytesIO()
+	Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(
+		buffer, format="JPEG", quality=quality
+	)
+	return buffer.getvalue()
+
+
+def _peak_rss_mb() -> float:
+	# ru_maxrss is kilobytes on Linux and bytes on macOS.
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(mode: str, path: str, iterations: int) -> dict:
+	data = open(path, "rb").read()
+	target = get_settings().MODEL_INPUT_SIZE if mode == "fast" else 0
+	baseline_rss = _peak_rss_mb()
+	timings = []
+	size = None
+	for _ in range(iterations):
+		started = time.perf_counter()
+		decoded = decode_image(data, target_size=target)
+		timings.append((time.perf_counter() - started) * 1000)
+		size = decoded.image.size
+	return {
+		"mode": mode,
+		"decoded_size": size,
+		"decode_ms_median": statistics.median(timings),
+		"decode_ms_max": max(timings),
+		"peak_rss_mb": _peak_rss_mb(),
+		"peak_rss_delta_mb": _peak_rss_mb() - baseline_rss,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--width", type=int, default=4032)
+	parser.add_argument("--height", type=int, default=3024)
+	parser.add_argument("--iterations", type=int, default=20)
+	parser.add_argument("--measure", choices=["full", "fast"])
+	parser.add_argument("--path")
+	args = parser.parse_args()
+
+	if args.measure:
+		print(json.dumps(measure(args.measure, args.path, args.iterations)))
+		return
+
+	with tempfile.NamedTemporaryFile(suffix=".jpg") as handle:
+		data = make_jpeg(args.width, args.height)
+		handle.write(data)
+		handle.flush()
+		reports = []
+		for mode in ("full", "fast"):
+			output = subprocess.check_output(
+				[
+					sys.executable, "-m", "benchmarks.decode",
+					"--measure", mode, "--path", handle.name,
+					"--iterations", str(args.iterations),
+				]
+			)
+			reports.append(json.loads(output))
+	print(json.dumps({"image": [args.width, args.height], "bytes": len(data), "results": reports}, indent=2))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,320 @@
+"""End-to-end throughput benchmark against fake cameras and a stub model.
+
+Run from the backend directory:
+
+	python -m benchmarks.e2e --concurrency 8 --seconds 20 --output bench.json
+	python -m benchmarks.e2e --baseline bench.json --tolerance 0.1
+
+Starts local fake cameras and an API server (INFERENCE_BACKEND=stub unless
+--real-model), drives /events/infer, /events/infer-stream and
+/events/live-stream, and writes a JSON report. With --baseline, exits non-zero
+if throughput drops or p95 latency rises by more than --tolerance.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+import requests
+
+from benchmarks.fake_cameras import FakeCameraServer, SyntheticFrames, write_video_file
+
+SCENARIOS = ("infer", "infer_stream", "live_stream")
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+	if not samples:
+		return 0.0
+	ordered = sorted(samples)
+	return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+class ResourceSampler:
+	def __init__(self, pid: int, interval: float = 0.5) -> None:
+		self.process = psutil.Process(pid)
+		self.interval = interval
+		self.cpu: list[float] = []
+		self.rss: list[float] = []
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, daemon=True)
+
+	def _processes(self) -> list:
+		return [self.process, *self.process.children(recursive=True)]
+
+	def _run(self) -> None:
+		for proc in self._processes():
+			proc.cpu_percent(None)
+		while not self._stop.wait(self.interval):
+			try:
+				procs = self._processes()
+				self.cpu.append(sum(p.cpu_percent(None) for p in procs))
+				self.rss.append(sum(p.memory_info().rss for p in procs) / (1024 * 1024))
+			except psutil.Error:
+				break
+
+	def __enter__(self) -> "ResourceSampler":
+		self._thread.start()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self._stop.set()
+		self._thread.join()
+
+	def report(self) -> dict:
+		return {
+			"cpu_percent_avg": statistics.fmean(self.cpu) if self.cpu else 0.0,
+			"cpu_percent_max": max(self.cpu, default=0.0),
+			"rss_mb_avg": statistics.fmean(self.rss) if self.rss else 0.0,
+			"rss_mb_max": max(self.rss, default=0.0),
+		}
+
+
+def _run_requests(worker, concurrency: int, seconds: float) -> dict:
+	latencies: list[float] = []
+	statuses: dict[str, int] = {}
+	lock = threading.Lock()
+	deadline = time.perf_counter() + seconds
+
+	def loop(index: int) -> None:
+		session = requests.Session()
+		while time.perf_counter() < deadline:
+			started = time.perf_counter()
+			try:
+				status = str(worker(session, index))
+			except requests.RequestException as exc:
+				status = type(exc).__name__
+			elapsed = (time.perf_counter() - started) * 1000
+			with lock:
+				statuses[status] = statuses.get(status, 0) + 1
+				if status == "200":
+					latencies.append(elapsed)
+
+	with ThreadPoolExecutor(max_workers=concurrency) as pool:
+		list(pool.map(loop, range(concurrency)))
+
+	return {
+		"requests_ok": len(latencies),
+		"throughput_rps": len(latencies) / seconds,
+		"p50_ms": _percentile(latencies, 50),
+		"p95_ms": _percentile(latencies, 95),
+		"p99_ms": _percentile(latencies, 99),
+		"statuses": statuses,
+	}
+
+
+def bench_infer(api: str, frames: SyntheticFrames, concurrency: int, seconds: float) -> dict:
+	images = [frames.jpeg(i) for i in range(16)]
+
+	def worker(session: requests.Session, index: int) -> int:
+		# Vary the image per request so the result cache does not short-circuit.
+		worker.counter += 1
+		body = images[worker.counter % len(images)] + worker.counter.to_bytes(8, "big")
+		response = session.post(
+			f"{api}/events/infer",
+			files={"image": ("frame.jpg", body, "image/jpeg")},
+			headers={"X-Client-Id": f"bench-{index}"},
+			timeout=60,
+		)
+		return response.status_code
+
+	worker.counter = 0
+	return _run_requests(worker, concurrency, seconds)
+
+
+def bench_infer_stream(api: str, snapshot_url: str, concurrency: int, seconds: float) -> dict:
+	def worker(session: requests.Session, index: int) -> int:
+		response = session.post(
+			f"{api}/events/infer-stream",
+			json={"stream_url": snapshot_url},
+			headers={"X-Client-Id": f"bench-{index}"},
+			timeout=60,
+		)
+		return response.status_code
+
+	return _run_requests(worker, concurrency, seconds)
+
+
+def bench_live_stream(api: str, source: str, viewers: int, seconds: float) -> dict:
+	results: list[dict] = []
+	lock = threading.Lock()
+
+	def viewer(_: int) -> None:
+		started = time.perf_counter()
+		first_frame = None
+		frames = 0
+		gaps: list[float] = []
+		last = None
+		try:
+			with requests.get(
+				f"{api}/events/live-stream",
+				params={"stream_url": source, "fps": 30, "confidence_threshold": 0.0},
+				stream=True,
+				timeout=seconds + 30,
+			) as response:
+				for line in response.iter_lines():
+					now = time.perf_counter()
+					if now - started > seconds:
+						break
+					if not line.startswith(b"data:") or b'"frame"' not in line:
+						continue
+					frames += 1
+					if first_frame is None:
+						first_frame = now - started
+					if last is not None:
+						gaps.append((now - last) * 1000)
+					last = now
+		except requests.RequestException:
+			pass
+		with lock:
+			results.append({"frames": frames, "first_frame_s": first_frame, "gaps": gaps})
+
+	with ThreadPoolExecutor(max_workers=viewers) as pool:
+		list(pool.map(viewer, range(viewers)))
+
+	gaps = [gap for result in results for gap in result["gaps"]]
+	first_frames = [r["first_frame_s"] for r in results if r["first_frame_s"] is not None]
+	total_frames = sum(r["frames"] for r in results)
+	return {
+		"viewers": viewers,
+		"frames_total": total_frames,
+		"throughput_fps": total_frames / seconds,
+		"per_viewer_fps": total_frames / seconds / viewers if viewers else 0.0,
+		"time_to_first_frame_s": statistics.median(first_frames) if first_frames else None,
+		"p50_ms": _percentile(gaps, 50),
+		"p95_ms": _percentile(gaps, 95),
+		"p99_ms": _percentile(gaps, 99),
+	}
+
+
+def start_api(port: int, workdir: Path, real_model: bool) -> subprocess.Popen:
+	env = os.environ.copy()
+	env.update(
+		{
+			"DATABASE_URL": f"sqlite:///{(workdir / 'bench.db').as_posix()}",
+			"AUTH_MODE": "stub",
+			"REDIS_URL": "",
+			"INFER_CACHE_BACKEND": "off",
+			"LOG_LEVEL": "WARNING",
+		}
+	)
+	if not real_model:
+		env["INFERENCE_BACKEND"] = "stub"
+	process = subprocess.Popen(
+		[sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+		env=env,
+	)
+	deadline = time.time() + 60
+	while time.time() < deadline:
+		try:
+			if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+				return process
+		except requests.RequestException:
+			time.sleep(0.3)
+	process.terminate()
+	raise RuntimeError("API server did not become healthy")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+	regressions = []
+	for name, current in report["scenarios"].items():
+		previous = baseline.get("scenarios", {}).get(name)
+		if not previous:
+			continue
+		throughput_key = "throughput_fps" if name == "live_stream" else "throughput_rps"
+		if previous[throughput_key] and current[throughput_key] < previous[throughput_key] * (1 - tolerance):
+			regressions.append(
+				f"{name}: {throughput_key} {current[throughput_key]:.2f} < baseline {previous[throughput_key]:.2f}"
+			)
+		if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+			regressions.append(
+				f"{name}: p95_ms {current['p95_ms']:.1f} > baseline {previous['p95_ms']:.1f}"
+			)
+	return regressions
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--concurrency", type=int, default=8)
+	parser.add_argument("--viewers", type=int, default=4)
+	parser.add_argument("--seconds", type=float, default=20.0)
+	parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+	parser.add_argument("--live-source", choices=["file", "mjpeg"], default="file")
+	parser.add_argument("--width", type=int, default=1280)
+	parser.add_argument("--height", type=int, default=720)
+	parser.add_argument("--real-model", action="store_true")
+	parser.add_argument("--output", default="")
+	parser.add_argument("--baseline", default="")
+	parser.add_argument("--tolerance", type=float, default=0.1)
+	args = parser.parse_args()
+
+	scenarios = [s for s in args.scenarios.split(",") if s]
+	frames = SyntheticFrames(args.width, args.height)
+	report = {
+		"config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+		"host": {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()},
+		"scenarios": {},
+	}
+
+	with tempfile.TemporaryDirectory() as tmp:
+		workdir = Path(tmp)
+		snapshot = FakeCameraServer(frames).start()
+		mjpeg = FakeCameraServer(frames, mjpeg=True).start()
+		port = _free_port()
+		api_process = start_api(port, workdir, args.real_model)
+		api = f"http://127.0.0.1:{port}/api/v1"
+		try:
+			for name in scenarios:
+				with ResourceSampler(api_process.pid) as sampler:
+					if name == "infer":
+						result = bench_infer(api, frames, args.concurrency, args.seconds)
+					elif name == "infer_stream":
+						result = bench_infer_stream(api, snapshot.url, args.concurrency, args.seconds)
+					elif name == "live_stream":
+						source = mjpeg.url
+						if args.live_source == "file":
+							video = workdir / "source.mp4"
+							if not video.exists():
+								write_video_file(video, frames, 15, args.seconds + 30)
+							source = str(video)
+						result = bench_live_stream(api, source, args.viewers, args.seconds)
+					else:
+						raise SystemExit(f"Unknown scenario: {name}")
+				report["scenarios"][name] = {**result, "server": sampler.report()}
+		finally:
+			api_process.terminate()
+			api_process.wait()
+			snapshot.stop()
+			mjpeg.stop()
+
+	output = json.dumps(report, indent=2)
+	if args.output:
+		Path(args.output).write_text(output)
+	print(output)
+
+	if args.baseline:
+		regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+		for line in regressions:
+			print(f"REGRESSION {line}", file=sys.stderr)
+		if regressions:
+			raise SystemExit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,159 @@
+"""Local fake cameras for benchmarks: HTTP snapshot, MJPEG multipart and video-file sources.
+
+Run standalone from the backend directory:
+
+	python -m benchmarks.fake_cameras --snapshot-port 8901 --mjpeg-port 8902
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+try:
+	import cv2
+except Exception:  # pragma: no cover - optional dependency
+	cv2 = None
+
+
+class SyntheticFrames:
+	"""Deterministic frames: a gradient background with a box moving across it."""
+
+	def __init__(self, width: int = 1280, height: int = 720, period: int = 120) -> None:
+		self.width = width
+		self.height = height
+		self.period = period
+		x = np.linspace(0, 255, width, dtype=np.uint16)
+		y = np.linspace(0, 255, height, dtype=np.uint16)
+		self._background = ((x[None, :] + y[:, None]) // 2).astype(np.uint8)
+		self._cache: dict[int, bytes] = {}
+
+	def frame(self, index: int) -> np.ndarray:
+		step = index % self.period
+		rgb = np.stack(
+			[self._background, np.roll(self._background, step, axis=1), self._background[::-1]],
+			axis=2,
+		)
+		box_w, box_h = self.width // 6, self.height // 4
+		x = (self.width - box_w) * step // self.period
+		y = (self.height - box_h) // 2
+		rgb[y : y + box_h, x : x + box_w] = (220, 40, 40)
+		return rgb
+
+	def jpeg(self, index: int, quality: int = 85) -> bytes:
+		key = index % self.period
+		if key not in self._cache:
+			buffer = BytesIO()
+			Image.fromarray(self.frame(key)).save(buffer, format="JPEG", quality=quality)
+			self._cache[key] = buffer.getvalue()
+		return self._cache[key]
+
+
+def write_video_file(path: Path, frames: SyntheticFrames, fps: int, seconds: float) -> Path:
+	if cv2 is None:
+		raise RuntimeError("OpenCV is required to write the fake video source")
+	writer = cv2.VideoWriter(
+		str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (frames.width, frames.height)
+	)
+	try:
+		for index in range(int(fps * seconds)):
+			writer.write(cv2.cvtColor(frames.frame(index), cv2.COLOR_RGB2BGR))
+	finally:
+		writer.release()
+	return path
+
+
+def _handler(frames: SyntheticFrames, fps: int, mjpeg: bool):
+	class Handler(BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+
+		def log_message(self, format, *args) -> None:
+			pass
+
+		def do_GET(self) -> None:
+			index = int(time.monotonic() * fps)
+			if not mjpeg:
+				body = frames.jpeg(index)
+				self.send_response(200)
+				self.send_header("Content-Type", "image/jpeg")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+				return
+
+			self.send_response(200)
+			self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+			self.send_header("Connection", "close")
+			self.end_headers()
+			try:
+				while True:
+					body = frames.jpeg(index)
+					self.wfile.write(
+						b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+						+ str(len(body)).encode()
+						+ b"\r\n\r\n"
+						+ body
+						+ b"\r\n"
+					)
+					index += 1
+					time.sleep(1.0 / fps)
+			except (BrokenPipeError, ConnectionResetError):
+				pass
+
+	return Handler
+
+
+class FakeCameraServer:
+	def __init__(self, frames: SyntheticFrames, port: int = 0, fps: int = 15, mjpeg: bool = False) -> None:
+		self.server = ThreadingHTTPServer(("127.0.0.1", port), _handler(frames, fps, mjpeg))
+		self.server.daemon_threads = True
+		self.path = "/video" if mjpeg else "/shot.jpg"
+		self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+	@property
+	def url(self) -> str:
+		host, port = self.server.server_address[:2]
+		return f"http://{host}:{port}{self.path}"
+
+	def start(self) -> "FakeCameraServer":
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self.server.shutdown()
+		self.server.server_close()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--width", type=int, default=1280)
+	parser.add_argument("--height", type=int, default=720)
+	parser.add_argument("--fps", type=int, default=15)
+	parser.add_argument("--snapshot-port", type=int, default=8901)
+	parser.add_argument("--mjpeg-port", type=int, default=8902)
+	parser.add_argument("--video-file", default="")
+	parser.add_argument("--video-seconds", type=float, default=60.0)
+	args = parser.parse_args()
+
+	frames = SyntheticFrames(args.width, args.height)
+	if args.video_file:
+		write_video_file(Path(args.video_file), frames, args.fps, args.video_seconds)
+		print(f"video file: {args.video_file}")
+	snapshot = FakeCameraServer(frames, args.snapshot_port, args.fps).start()
+	mjpeg = FakeCameraServer(frames, args.mjpeg_port, args.fps, mjpeg=True).start()
+	print(f"snapshot: {snapshot.url}\nmjpeg: {mjpeg.url}")
+	try:
+		while True:
+			time.sleep(3600)
+	except KeyboardInterrupt:
+		snapshot.stop()
+		mjpeg.stop()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**overrides):
+	options = {
+		"max_concurrency": 1,
+		"max_queue": 4,
+		"per_client_limit": 4,
+		"slo_seconds": {0: 100.0, 1: 100.0},
+	}
+	options.update(overrides)
+	return AdmissionController(**options)
+
+
+def test_run_returns_the_result_and_releases_the_slot():
+	async def scenario():
+		admission = controller()
+		result, ticket = await admission.run("client", 0, lambda x: x * 2, 21)
+		return admission, result, ticket
+
+	admission, result, ticket = asyncio.run(scenario())
+	assert result == 42
+	assert ticket.wait_seconds >= 0
+	assert admission.in_flight == 0
+	assert admission.admitted == 1
+
+
+def test_exceptions_propagate_and_release_the_slot():
+	def fail():
+		raise ValueError("bad image")
+
+	async def scenario():
+		admission = controller()
+		with pytest.raises(ValueError):
+			await admission.run("client", 0, fail)
+		await asyncio.sleep(0)  # done-callbacks run on the next loop iteration
+		return admission
+
+	assert asyncio.run(scenario()).in_flight == 0
+
+
+def test_per_client_limit_rejects_with_429():
+	async def scenario():
+		admission = controller(max_concurrency=4, per_client_limit=1)
+		release = threading.Event()
+		first = asyncio.ensure_future(admission.run("client", 0, release.wait, 5))
+		await asyncio.sleep(0.01)
+		try:
+			with pytest.raises(AdmissionRejected) as rejected:
+				await admission.run("client", 0, lambda: None)
+		finally:
+			release.set()
+			await first
+		return admission, rejected.value
+
+	admission, rejected = asyncio.run(scenario())
+	assert rejected.status_code == 429
+	assert admission.rejected == {"client_limit": 1}
+
+
+def test_slot_is_held_until_the_work_finishes_after_the_caller_is_cancelled():
+	async def scenario():
+		admission = controller()
+		release = threading.Event()
+		caller = asyncio.ensure_future(admission.run("client", 0, release.wait, 5))
+		await asyncio.sleep(0.01)
+		caller.cancel()
+		await asyncio.sleep(0.01)
+		held = admission.in_flight
+		release.set()
+		for _ in range(100):
+			if not admission.in_flight:
+				break
+			await asyncio.sleep(0.01)
+		return held, admission.in_flight
+
+	held, after = asyncio.run(scenario())
+	assert held == 1
+	assert after == 0
+
+
+def test_waiters_are_admitted_by_priority():
+	async def scenario():
+		admission = controller()
+		release = threading.Event()
+		order = []
+		running = asyncio.ensure_future(admission.run("a", 0, release.wait, 5))
+		await asyncio.sleep(0.01)
+		background = asyncio.ensure_future(admission.run("b", 1, order.append, "background"))
+		interactive = asyncio.ensure_future(admission.run("c", 0, order.append, "interactive"))
+		await asyncio.sleep(0.01)
+		assert admission.queue_depth == 2
+		release.set()
+		await asyncio.gather(running, background, interactive)
+		return order
+
+	assert asyncio.run(scenario()) == ["interactive", "background"]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+from app.services.detection_bus import (
+	CHANNEL_PREFIX,
+	InMemoryDetectionBus,
+	RedisDetectionBus,
+	build_message,
+)
+
+
+class FakeRedis:
+	def __init__(self, fail: bool = False) -> None:
+		self.fail = fail
+		self.published = []
+
+	def publish(self, channel, data):
+		if self.fail:
+			raise ConnectionError("redis down")
+		self.published.append((channel, json.loads(data)))
+
+
+class FakePubSub:
+	def __init__(self, messages) -> None:
+		self.messages = list(messages)
+		self.channels = []
+		self.patterns = []
+		self.closed = False
+
+	async def subscribe(self, *channels):
+		self.channels.extend(channels)
+
+	async def psubscribe(self, *patterns):
+		self.patterns.extend(patterns)
+
+	async def get_message(self, timeout=0.0):
+		if self.messages:
+			return self.messages.pop(0)
+		await asyncio.sleep(0.01)
+		return None
+
+	async def reset(self):
+		self.closed = True
+
+
+class FakeAsyncRedis(FakeRedis):
+	def __init__(self, fail: bool = False, messages=()) -> None:
+		super().__init__(fail)
+		self.pubsubs = []
+		self.messages = messages
+
+	async def publish(self, channel, data):
+		FakeRedis.publish(self, channel, data)
+
+	def pubsub(self, ignore_subscribe_messages=False):
+		pubsub = FakePubSub(self.messages)
+		self.pubsubs.append(pubsub)
+		return pubsub
+
+
+def test_build_message_rounds_and_keeps_track_ids():
+	message = build_message(
+		3,
+		[{"label": "cat", "confidence": 0.912345, "bbox": [1.04, 2.0, 3.0, 4.0], "track_id": 7}],
+		[{"event": "track_start", "label": "cat", "track_id": 7, "dwell_seconds": 0.0}],
+	)
+	assert message["camera_id"] == 3
+	assert message["detections"] == [
+		{"label": "cat", "confidence": 0.9123, "bbox": [1.0, 2.0, 3.0, 4.0], "track_id": 7}
+	]
+	assert message["events"][0]["event"] == "track_start"
+
+
+def test_in_memory_bus_filters_by_camera():
+	async def scenario():
+		bus = InMemoryDetectionBus()
+		camera_one = bus.subscribe([1], heartbeat=0.5)
+		everything = bus.subscribe(None, heartbeat=0.5)
+		first = asyncio.ensure_future(camera_one.__anext__())
+		any_camera = asyncio.ensure_future(everything.__anext__())
+		await asyncio.sleep(0)  # let both subscriptions register
+		await bus.publish_async(2, {"camera_id": 2})
+		await bus.publish_async(1, {"camera_id": 1})
+		received = await first, await any_camera
+		await camera_one.aclose()
+		await everything.aclose()
+		return received
+
+	one, anything = asyncio.run(scenario())
+	assert one == {"camera_id": 1}
+	assert anything == {"camera_id": 2}
+
+
+def test_redis_bus_publishes_to_camera_channel():
+	sync_client, async_client = FakeRedis(), FakeAsyncRedis()
+	bus = RedisDetectionBus(client=sync_client, async_client=async_client)
+	bus.publish(4, {"camera_id": 4})
+	asyncio.run(bus.publish_async(None, {"camera_id": None}))
+	assert sync_client.published == [(CHANNEL_PREFIX + "4", {"camera_id": 4})]
+	assert async_client.published == [(CHANNEL_PREFIX + "adhoc", {"camera_id": None})]
+
+
+def test_redis_bus_swallows_publish_errors():
+	bus = RedisDetectionBus(client=FakeRedis(fail=True), async_client=FakeAsyncRedis(fail=True))
+	bus.publish(1, {})
+	asyncio.run(bus.publish_async(1, {}))
+
+
+def test_redis_subscribe_yields_messages_and_heartbeats():
+	async_client = FakeAsyncRedis(
+		messages=[
+			{"type": "subscribe", "data": 1},
+			{"type": "message", "data": json.dumps({"camera_id": 5})},
+		]
+	)
+	bus = RedisDetectionBus(client=FakeRedis(), async_client=async_client)
+
+	async def scenario():
+		stream = bus.subscribe([5], heartbeat=0.02)
+		received = [await stream.__anext__(), await stream.__anext__()]
+		await stream.aclose()
+		return received
+
+	assert asyncio.run(scenario()) == [{"camera_id": 5}, None]
+	pubsub = async_client.pubsubs[0]
+	assert pubsub.channels == [CHANNEL_PREFIX + "5"]
+	assert pubsub.closed
+
+
+def test_redis_subscribe_without_cameras_uses_a_pattern():
+	async_client = FakeAsyncRedis(
+		messages=[{"type": "pmessage", "data": json.dumps({"camera_id": None})}]
+	)
+	bus = RedisDetectionBus(client=FakeRedis(), async_client=async_client)
+
+	async def scenario():
+		stream = bus.subscribe(None)
+		received = await stream.__anext__()
+		await stream.aclose()
+		return received
+
+	assert asyncio.run(scenario()) == {"camera_id": None}
+	assert async_client.pubsubs[0].patterns == [CHANNEL_PREFIX + "*"]
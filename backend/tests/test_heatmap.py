@@ -0,0 +1,81 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import heatmap_service
+from app.services.heatmap_service import (
+	HeatmapService,
+	accumulate_boxes,
+	bucket_grids,
+	normalized_boxes,
+)
+
+AT = datetime(2024, 5, 1, 12, 30)
+
+
+def event(payload, camera_id=1, label="cat", occurred_at=AT):
+	return SimpleNamespace(
+		camera_id=camera_id, label=label, occurred_at=occurred_at, payload=payload
+	)
+
+
+def test_normalized_boxes_skips_malformed_payloads():
+	good = event({"bbox": [0, 0, 50, 25], "frame_size": [100, 50]})
+	events = [
+		good,
+		event(None),
+		event("not a dict"),
+		event({"bbox": [0, 0, 50], "frame_size": [100, 50]}),
+		event({"bbox": ["0", 0, 50, 25], "frame_size": [100, 50]}),
+		event({"bbox": [0, 0, 50, float("nan")], "frame_size": [100, 50]}),
+		event({"bbox": [0, 0, 50, 25], "frame_size": [0, 50]}),
+		event({"bbox": [0, 0, 50, 25], "frame_size": [100]}),
+		event({"bbox": [0, 0, 50, 25], "frame_size": {"w": 100}}),
+		event({"bbox": [True, 0, 50, 25], "frame_size": [100, 50]}),
+	]
+	kept, boxes = normalized_boxes(events)
+	assert kept == [good]
+	np.testing.assert_allclose(boxes, [[0.0, 0.0, 0.5, 0.5]])
+
+
+def test_accumulate_boxes_counts_covered_cells():
+	boxes = np.array([[0.0, 0.0, 0.5, 0.5], [0.0, 0.0, 1.0, 1.0]])
+	grid = accumulate_boxes(boxes, np.array([0, 0]), 1, 2, 2)[0]
+	assert grid.tolist() == [[2, 1], [1, 1]]
+
+
+def test_bucket_grids_groups_by_camera_label_and_hour():
+	payload = {"bbox": [0, 0, 10, 10], "frame_size": [10, 10]}
+	grids = bucket_grids(
+		[
+			event(payload),
+			event(payload),
+			event(payload, label="dog"),
+			event(payload, camera_id=None),
+			event({"bbox": "bad", "frame_size": [10, 10]}),
+		],
+		4,
+	)
+	hour = datetime(2024, 5, 1, 12)
+	assert set(grids) == {(1, "cat", hour), (1, "dog", hour)}
+	grid, count = grids[(1, "cat", hour)]
+	assert count == 2
+	assert grid.shape == (4, 4)
+	assert (grid == 2).all()
+
+
+def test_record_does_not_raise_when_binning_fails(monkeypatch):
+	def broken(events, size):
+		raise ValueError("boom")
+
+	monkeypatch.setattr(heatmap_service, "bucket_grids", broken)
+	HeatmapService().record([event({"bbox": [0, 0, 1, 1], "frame_size": [1, 1]})])
+
+
+def test_record_skips_the_database_without_valid_boxes(monkeypatch):
+	def no_session():
+		raise AssertionError("no buckets to write")
+
+	monkeypatch.setattr(heatmap_service, "SessionLocal", no_session)
+	HeatmapService().record([event({"bbox": [0, 0, 1], "frame_size": [1, 1]})])
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services.recent_events import RecentEventsIndex
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def row(event_id, minutes_ago, camera_id=1, label="cat", confidence=0.9):
+	return (event_id, NOW - timedelta(minutes=minutes_ago), camera_id, label, confidence)
+
+
+def event(event_id, minutes_ago, camera_id=1, label="cat", confidence=0.9):
+	return SimpleNamespace(
+		id=event_id,
+		occurred_at=NOW - timedelta(minutes=minutes_ago),
+		camera_id=camera_id,
+		label=label,
+		confidence=confidence,
+	)
+
+
+def loaded(rows, capacity=100, hours=24):
+	index = RecentEventsIndex(capacity)
+	index.begin_load()
+	index.load(rows, NOW - timedelta(hours=hours))
+	return index
+
+
+def test_counts_filter_by_range_camera_label_and_confidence():
+	index = loaded(
+		[
+			row(4, 5, camera_id=2, label="dog", confidence=0.5),
+			row(3, 10, camera_id=1, label="cat"),
+			row(2, 30, camera_id=None, label="cat"),
+			row(1, 120, camera_id=1, label="cat"),
+		]
+	)
+	last_hour = index.count(NOW - timedelta(hours=1), NOW)
+	assert last_hour == {
+		"total": 3,
+		"by_label": {"cat": 2, "dog": 1},
+		"by_camera": {"none": 1, "1": 1, "2": 1},
+	}
+	assert index.count(NOW - timedelta(hours=3), NOW, camera_id=1)["total"] == 2
+	assert index.count(NOW - timedelta(hours=3), NOW, label="dog")["total"] == 1
+	assert index.count(NOW - timedelta(hours=3), NOW, label="bird")["total"] == 0
+	assert index.count(NOW - timedelta(hours=3), NOW, min_confidence=0.8)["total"] == 3
+
+
+def test_queries_older_than_the_covered_range_return_none():
+	index = loaded([row(1, 10)], hours=1)
+	assert index.count(NOW - timedelta(hours=2), NOW) is None
+	assert RecentEventsIndex(10).count(NOW - timedelta(minutes=1), NOW) is None
+
+
+def test_writes_before_a_load_are_ignored():
+	index = RecentEventsIndex(10)
+	index.add([event(1, 1)])
+	assert index.size == 0
+
+
+def test_writes_during_a_load_are_replayed_without_duplicates():
+	index = RecentEventsIndex(100)
+	index.begin_load()
+	# Event 2 was committed before the rows were read, event 3 after.
+	index.add([event(2, 1), event(3, 0)])
+	index.load([row(2, 1), row(1, 5)], NOW - timedelta(hours=1))
+	assert index.size == 3
+	assert index.count(NOW - timedelta(hours=1), NOW + timedelta(seconds=1))["total"] == 3
+
+	index.add([event(4, 0)])
+	assert index.size == 4
+
+
+def test_failed_load_stops_buffering():
+	index = RecentEventsIndex(10)
+	index.begin_load()
+	index.abort_load()
+	index.add([event(1, 0)])
+	assert index.size == 0
+
+
+def test_overwritten_events_move_coverage_forward():
+	index = loaded([row(2, 20), row(1, 30)], capacity=2)
+	# A full load cuts coverage to just after its oldest row.
+	assert index.covered_since > NOW - timedelta(minutes=30)
+	index.add([event(3, 10)])
+	assert index.count(NOW - timedelta(minutes=25), NOW)["total"] == 2
+	index.add([event(4, 5)])
+	# The 20-minute-old event was overwritten, so the index no longer covers it.
+	assert index.count(NOW - timedelta(minutes=25), NOW) is None
+	assert index.count(NOW - timedelta(minutes=15), NOW)["total"] == 2
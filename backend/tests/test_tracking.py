@@ -0,0 +1,67 @@
+from app.services.tracking_service import MultiObjectTracker
+
+
+def detection(label="cat", bbox=(10.0, 10.0, 50.0, 50.0), confidence=0.9):
+	return {"label": label, "confidence": confidence, "bbox": list(bbox)}
+
+
+def test_track_starts_once_after_min_hits():
+	tracker = MultiObjectTracker(min_hits=3)
+	events = []
+	for frame in range(5):
+		events += tracker.update([detection()], now=frame * 0.1)
+
+	starts = [e for e in events if e["event"] == "track_start"]
+	assert len(starts) == 1
+	assert starts[0]["label"] == "cat"
+	assert len(tracker.active_tracks()) == 1
+
+
+def test_matched_detections_get_the_track_id():
+	tracker = MultiObjectTracker(min_hits=1)
+	first = detection()
+	tracker.update([first], now=0.0)
+	second = detection(bbox=(12.0, 11.0, 52.0, 51.0))
+	tracker.update([second], now=0.1)
+	assert second["track_id"] == first["track_id"]
+
+
+def test_track_ends_after_max_age():
+	tracker = MultiObjectTracker(min_hits=1, max_age_seconds=1.0)
+	start = tracker.update([detection()], now=0.0)
+	assert tracker.update([], now=0.5) == []
+	ended = tracker.update([], now=2.0)
+	assert [e["event"] for e in ended] == ["track_end"]
+	assert ended[0]["track_id"] == start[0]["track_id"]
+	assert ended[0]["dwell_seconds"] == 0.0
+	assert tracker.tracks == []
+
+
+def test_label_change_needs_min_hits_of_the_new_label():
+	tracker = MultiObjectTracker(min_hits=2, cross_label_penalty=1.0)
+	events = []
+	for frame, label in enumerate(["cat", "cat", "dog", "dog"]):
+		events += tracker.update([detection(label)], now=frame * 0.1)
+	changes = [e for e in events if e["event"] == "label_change"]
+	assert len(changes) == 1
+	assert changes[0]["previous_label"] == "cat"
+	assert changes[0]["label"] == "dog"
+
+
+def test_flush_ends_only_confirmed_tracks():
+	tracker = MultiObjectTracker(min_hits=3)
+	tracker.update([detection()], now=0.0)
+	tracker.update([detection()], now=0.1)
+	tracker.update([detection()], now=0.2)
+	tracker.update([detection(bbox=(200.0, 200.0, 240.0, 240.0))], now=0.3)
+	flushed = tracker.flush()
+	assert [e["event"] for e in flushed] == ["track_end"]
+	assert tracker.tracks == []
+
+
+def test_separate_objects_get_separate_tracks():
+	tracker = MultiObjectTracker(min_hits=1)
+	left, right = detection(), detection(bbox=(200.0, 200.0, 240.0, 240.0))
+	events = tracker.update([left, right], now=0.0)
+	assert len(events) == 2
+	assert left["track_id"] != right["track_id"]
@@ -261,6 +261,14 @@ export default function App() {
           setLiveStream({ active: false, frame: null, detections: [] });
           return;
         }
+        if (data.status) {
+          // Capture is reconnecting in the background; keep the last frame on screen.
+          setStatus({
+            type: data.status === "connected" ? "success" : "error",
+            message: `Camera ${data.status}`,
+          });
+          return;
+        }
         setLiveStream({ active: true, frame: data.frame, detections: data.detections || [] });
         if (data.detections && data.detections.length > 0) {
           refresh();